@@ -6,6 +6,26 @@ import uuid
 # Erstelle die SQLAlchemy-Instanz
 db = SQLAlchemy()
 
+def create_schema(engine):
+    """Legt fehlende Tabellen und Indizes an, Indizes in fester Reihenfolge
+
+    ``create_all`` legt Indizes in der Reihenfolge eines Sets an, die von Lauf
+    zu Lauf wechselt. SQLite wählt ohne ANALYZE-Statistik unter gleichwertigen
+    Indizes den zuletzt angelegten, daher hier Tabellen ohne Indizes anlegen
+    und die Indizes nach Namen sortiert nachziehen (auch für bestehende
+    Datenbanken, denen neue Indizes fehlen).
+    """
+    from sqlalchemy import inspect
+    from sqlalchemy.schema import CreateTable
+
+    with engine.begin() as connection:
+        existing = set(inspect(connection).get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing:
+                connection.execute(CreateTable(table))
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                index.create(bind=connection, checkfirst=True)
+
 def create_app():
     app = Flask(__name__,
                 template_folder='templates',  # app/templates
@@ -15,21 +35,61 @@ def create_app():
 
     # Initialisiere die Datenbank mit der App
     db.init_app(app)
+
+    # Datenversion für serverseitige Caches
+    from .cache import register_cache_events, timeline_cache
+    register_cache_events()
+    timeline_cache.maxsize = app.config.get('TIMELINE_CACHE_SIZE', 32)
+
+    # SQL-Statements pro Request zählen (Budgets im Testmodus)
+    from .querycount import init_query_budget
+    init_query_budget(app)
+
+    # Lehrplan-Kennzahlen bei Kursänderungen nachführen
+    from .curricula import register_curriculum_events, rebuild_curricula
+    register_curriculum_events()
+
+    # Statistik-Rollups bei Kurs- und Abwesenheitsänderungen nachführen
+    from .rollups import register_rollup_events, rebuild_rollups
+    register_rollup_events()
     
     # Registriere die Blueprints
     from .routes import main
     app.register_blueprint(main)
 
+    # Frontend-Bibliotheken mit Inhalts-Hash unter /assets
+    from .assets import init_assets
+    init_assets(app)
+
     # Erstelle die Datenbanktabellen, falls sie nicht existieren
     with app.app_context():
         # Importiere models, damit die Tabellen erstellt werden können
         from . import models
         
-        # Lösche und erstelle die Tabellen neu (nur beim ersten Start)
+        # Erstelle fehlende Tabellen (bestehende bleiben unverändert)
         import os
-        if not os.path.exists('app.db'):
-            db.create_all()
-            
+        first_start = not os.path.exists('app.db')
+        create_schema(db.engine)
+        
+        # Bestehende Datenbanken ohne befüllte Lehrplan-Tabelle nachziehen
+        if not db.session.query(models.Curriculum.id).first() and db.session.query(models.Course.id).first():
+            rebuild_curricula(db.session)
+            db.session.commit()
+
+        # Statistik-Rollups für bestehende Datenbanken einmalig aufbauen
+        if not db.session.query(models.LecturerMonthRollup.month).first() and (
+                db.session.query(models.Course.id).filter(models.Course.active == True).first()
+                or db.session.query(models.Availability.id).first()):
+            rebuild_rollups(db.session)
+            db.session.commit()
+        
+        # Importe und Berichte, deren Prozess beendet wurde, abschließen
+        from .importer import recover_import_jobs
+        from .report_jobs import recover_report_jobs
+        recover_import_jobs()
+        recover_report_jobs()
+
+        if first_start:
             # Füge Test-Kurs nur hinzu, wenn die Datenbank leer ist
             if not db.session.query(models.Course).first():
                 from datetime import datetime, timedelta
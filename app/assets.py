@@ -0,0 +1,233 @@
+"""Frontend-Bibliotheken als lange cachebare, vorkomprimierte Dateien
+
+Bootstrap, Font Awesome usw. liegen unter ``app/static/vendor`` (Pfade wie auf
+dem CDN, inkl. Version), plotly.js kommt direkt aus dem installierten
+plotly-Paket und passt damit immer zum Figure-JSON von plotly.py. Ausgeliefert
+werden sie unter ``/assets/<pfad>/<name>.<hash>.<ext>``: der Hash (SHA-256
+über den Inhalt) ändert sich mit jeder neuen Version, daher dürfen Browser und
+Proxies die Dateien ein Jahr lang ohne Rückfrage cachen. Relative URLs in CSS
+(Webfonts) werden auf die gehashten Namen umgeschrieben.
+
+``flask build-assets`` legt gzip- und Brotli-Varianten in ``ASSETS_BUILD_DIR``
+ab, die je nach ``Accept-Encoding`` statt der Originaldatei gesendet werden.
+Bibliotheken, die nicht eingebunden sind, verlinkt ``asset_url()`` weiter auf
+das CDN; ``flask vendor-assets`` lädt sie nach ``app/static/vendor``.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from io import BytesIO
+
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+
+# Logischer Name -> CDN-URL (Quelle für ``vendor-assets`` und Fallback)
+LIBRARIES = {
+    'bootstrap/5.1.3/css/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+    'bootstrap/5.1.3/js/bootstrap.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.min.js',
+    # Popper in der Version aus dem Bootstrap-5.1.3-Bundle, auch für Tippy
+    'popperjs/2.10.2/popper.min.js':
+        'https://cdn.jsdelivr.net/npm/@popperjs/core@2.10.2/dist/umd/popper.min.js',
+    'fontawesome/5.15.4/css/all.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/css/all.min.css',
+    'chartjs/3.7.1/chart.min.js':
+        'https://cdn.jsdelivr.net/npm/chart.js@3.7.1/dist/chart.min.js',
+    'fullcalendar/5.10.1/main.min.css':
+        'https://cdn.jsdelivr.net/npm/fullcalendar@5.10.1/main.min.css',
+    'fullcalendar/5.10.1/main.min.js':
+        'https://cdn.jsdelivr.net/npm/fullcalendar@5.10.1/main.min.js',
+    'fullcalendar/5.10.1/locales/de.js':
+        'https://cdn.jsdelivr.net/npm/fullcalendar@5.10.1/locales/de.js',
+    'tippy/6.3.7/tippy-bundle.umd.min.js':
+        'https://cdn.jsdelivr.net/npm/tippy.js@6.3.7/dist/tippy-bundle.umd.min.js',
+}
+# Nur woff2/woff: eot, ttf und svg brauchen nur sehr alte Browser
+for _font in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900'):
+    for _ext in ('woff2', 'woff'):
+        LIBRARIES[f'fontawesome/5.15.4/webfonts/{_font}.{_ext}'] = \
+            f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/webfonts/{_font}.{_ext}'
+
+PLOTLY_JS = 'plotly/plotly.min.js'
+
+# Ein Jahr, ändert sich nie (neuer Inhalt = neuer Name)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Vorkomprimierte Varianten in Reihenfolge der Präferenz; Webfonts sind
+# bereits komprimiert
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = ('.js', '.css')
+
+HASH_LENGTH = 12
+
+_CSS_URL = re.compile(r'url\(([\'"]?)([^\'")?#]+)([^\'")]*)\1\)')
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('font/woff', '.woff')
+
+assets = Blueprint('assets', __name__)
+
+
+def _hashed_name(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{digest}{ext}'
+
+
+def plotly_js_path():
+    """plotly.min.js aus dem installierten plotly-Paket"""
+    import plotly
+    return os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+
+
+class AssetManifest:
+    """Gehashte Namen und Inhalte der eingebundenen Dateien
+
+    Parameters:
+    -----------
+    sources : dict
+        Logischer Name -> Pfad der Datei
+    build_dir : str
+        Verzeichnis der vorkomprimierten Varianten
+    """
+
+    def __init__(self, sources, build_dir):
+        self.build_dir = build_dir
+        self.urls = {}    # logischer Name -> gehashter Name
+        self.files = {}   # gehashter Name -> (Pfad, umgeschriebener Inhalt oder None)
+        # CSS zuletzt, damit die referenzierten Dateien schon gehasht sind
+        for name in sorted(sources, key=lambda name: name.endswith('.css')):
+            path = sources[name]
+            with open(path, 'rb') as f:
+                content = f.read()
+            rewritten = None
+            if name.endswith('.css'):
+                rewritten = self._rewrite_css(name, content)
+                content = rewritten
+            hashed = _hashed_name(name, content)
+            self.urls[name] = hashed
+            self.files[hashed] = (path, rewritten)
+
+    @classmethod
+    def load(cls, static_folder, build_dir):
+        """Alle Dateien unter ``static/vendor`` plus plotly.js aus dem Paket"""
+        vendor_dir = os.path.join(static_folder, 'vendor')
+        sources = {}
+        for root, _, filenames in os.walk(vendor_dir):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                sources[os.path.relpath(path, vendor_dir).replace(os.sep, '/')] = path
+        if os.path.exists(plotly_js_path()):
+            sources[PLOTLY_JS] = plotly_js_path()
+        return cls(sources, build_dir)
+
+    def _rewrite_css(self, name, content):
+        """Relative ``url()``-Verweise auf bekannte Dateien durch gehashte Namen ersetzen"""
+        base = posixpath.dirname(name)
+
+        def replace(match):
+            quote, target, suffix = match.groups()
+            if '://' in target or target.startswith(('/', 'data:')):
+                return match.group(0)
+            hashed = self.urls.get(posixpath.normpath(posixpath.join(base, target)))
+            if hashed is None:
+                return match.group(0)
+            return f'url({quote}{posixpath.relpath(hashed, base)}{suffix}{quote})'
+
+        return _CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+    def read(self, hashed):
+        path, content = self.files[hashed]
+        if content is not None:
+            return content
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def compressed_path(self, hashed, suffix):
+        return os.path.join(self.build_dir, *hashed.split('/')) + suffix
+
+    def build(self):
+        """Schreibt fehlende gzip-/Brotli-Varianten (Brotli nur mit ``brotli``-Paket)
+
+        Returns:
+        --------
+        list
+            ``(gehashter Name, Originalgröße, gzip-Größe, Brotli-Größe oder None)``
+        """
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+
+        result = []
+        for hashed in sorted(self.files):
+            if not hashed.endswith(COMPRESSIBLE):
+                continue
+            content = self.read(hashed)
+            sizes = [hashed, len(content)]
+            compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                compressors.append(('.br', lambda data: brotli.compress(data, quality=11)))
+            for suffix, compress in compressors:
+                path = self.compressed_path(hashed, suffix)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # Erst vollständig schreiben, dann umbenennen (parallele Worker)
+                    tmp_path = f'{path}.{os.getpid()}.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(compress(content))
+                    os.replace(tmp_path, path)
+                sizes.append(os.path.getsize(path))
+            if brotli is None:
+                sizes.append(None)
+            result.append(tuple(sizes))
+        return result
+
+
+def init_assets(app):
+    """Manifest laden, Blueprint und ``asset_url()`` für Templates registrieren"""
+    app.extensions['assets'] = AssetManifest.load(app.static_folder, app.config['ASSETS_BUILD_DIR'])
+    app.register_blueprint(assets)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+
+def get_manifest():
+    return current_app.extensions['assets']
+
+
+def asset_url(name):
+    """URL einer Bibliothek: gehashter Name, sonst das CDN"""
+    hashed = get_manifest().urls.get(name)
+    if hashed is not None:
+        return url_for('assets.serve_asset', filename=hashed)
+    return LIBRARIES[name]
+
+
+@assets.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Gehashte Datei, vorkomprimiert wenn vorhanden und akzeptiert"""
+    manifest = get_manifest()
+    if filename not in manifest.files:
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = None
+    for encoding, suffix in ENCODINGS:
+        path = manifest.compressed_path(filename, suffix)
+        if encoding in request.accept_encodings and os.path.exists(path):
+            response = send_file(path, mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        path, content = manifest.files[filename]
+        if content is not None:
+            response = send_file(BytesIO(content), mimetype=mimetype)
+        else:
+            response = send_file(path, mimetype=mimetype, conditional=True)
+
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,108 @@
+"""Sammelzuweisung von Dozenten zu Kursen
+
+Lädt alle betroffenen Kurse und alle bestehenden Buchungen der beteiligten
+Dozenten mit zwei Abfragen, prüft jede Zuweisung gegen die Datenbank und gegen
+die bereits akzeptierten Zuweisungen desselben Stapels und committet einmal.
+"""
+from . import db
+from .models import Course
+from .conflicts import IntervalIndex
+
+
+def parse_assignment_pairs(values):
+    """Wandelt ``"course_id:lecturer_id"``-Strings bzw. Dicts in ``(int, int|None)``-Paare um
+
+    ``lecturer_id`` 0 oder leer bedeutet "Dozent entfernen" und wird zu ``None``.
+    """
+    pairs = []
+    for value in values:
+        if not value:  # Überspringe leere Zuweisungen
+            continue
+        if isinstance(value, dict):
+            course_id, lecturer_id = value.get('course_id'), value.get('lecturer_id')
+        else:
+            course_id, lecturer_id = value.split(':')
+        lecturer_id = int(lecturer_id) if lecturer_id not in (None, '', '0', 0) else None
+        pairs.append((int(course_id), lecturer_id))
+    return pairs
+
+
+def _course_summary(course):
+    return {
+        'course_id': course.id,
+        'topic': course.topic,
+        'start_date': course.start_date.strftime('%Y-%m-%d'),
+        'end_date': course.end_date.strftime('%Y-%m-%d'),
+    }
+
+
+def bulk_assign(pairs):
+    """Wendet alle Zuweisungen eines Stapels an und liefert ein Ergebnis pro Eintrag
+
+    Parameters:
+    -----------
+    pairs : list
+        Liste von ``(course_id, lecturer_id)``; ``lecturer_id=None`` entfernt den Dozenten
+
+    Returns:
+    --------
+    list
+        Pro Eintrag ein Dict mit ``status`` ``'accepted'``, ``'conflict'`` oder
+        ``'not_found'`` sowie ggf. den kollidierenden Kursen unter ``conflicts``.
+    """
+    if not pairs:
+        return []
+
+    course_ids = {course_id for course_id, _ in pairs}
+    courses = {
+        course.id: course
+        for course in db.session.query(Course).filter(Course.id.in_(course_ids)).all()
+    }
+
+    lecturer_ids = {lecturer_id for _, lecturer_id in pairs if lecturer_id}
+    lecturer_ids.update(course.lecturer_id for course in courses.values() if course.lecturer_id)
+
+    # Alle bestehenden Buchungen der beteiligten Dozenten; dank Identity-Map sind
+    # Kurse aus dem Stapel hier dieselben Objekte wie in ``courses``
+    bookings = []
+    if lecturer_ids:
+        bookings = db.session.query(Course).filter(Course.lecturer_id.in_(lecturer_ids)).all()
+    index = IntervalIndex.from_courses(bookings)
+
+    results = []
+    for course_id, lecturer_id in pairs:
+        course = courses.get(course_id)
+        if course is None:
+            results.append({'course_id': course_id, 'lecturer_id': lecturer_id, 'status': 'not_found'})
+            continue
+
+        if lecturer_id is not None:
+            conflicting = index.query(lecturer_id, course.start_date, course.end_date, exclude=course)
+            if conflicting:
+                result = _course_summary(course)
+                result.update({
+                    'lecturer_id': lecturer_id,
+                    'status': 'conflict',
+                    'conflicts': [_course_summary(other) for other in conflicting]
+                })
+                results.append(result)
+                continue
+
+        # Buchung im Index verschieben, damit spätere Einträge sie sehen
+        if course.lecturer_id:
+            index.discard(course.lecturer_id, course)
+        if lecturer_id is not None:
+            index.add(lecturer_id, course.start_date, course.end_date, course)
+        course.lecturer_id = lecturer_id
+
+        result = _course_summary(course)
+        result.update({'lecturer_id': lecturer_id, 'status': 'accepted'})
+        results.append(result)
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return results
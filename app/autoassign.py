@@ -0,0 +1,152 @@
+"""Automatische Dozentenzuweisung für Lehrpläne und Zeiträume
+
+Greedy-Verfahren in Startreihenfolge (Interval Partitioning): die offenen
+Kurse werden nach Startdatum abgearbeitet. Für jeden Kurs kommen nur Dozenten
+in Frage, die im Zeitraum weder gebucht sind (bestehende Kurse wie bei
+``bulk_assign()`` und bereits vorgeschlagene) noch Urlaub oder eine
+Abwesenheit eingetragen haben. Unter ihnen erhält der Dozent mit der
+geringsten Last den Kurs; Last sind die gebuchten Tage im Planungszeitraum
+einschließlich der Vorschläge. Bei Gleichstand gewinnt, wer das Thema schon
+unterrichtet.
+
+Das Ergebnis ist nur ein Vorschlag und wird nicht gespeichert; übernommen wird
+er über ``bulk_assign()``, das jede Zuweisung erneut gegen die Datenbank prüft.
+"""
+from . import db
+from .models import Course, Lecturer, Availability
+from .conflicts import IntervalIndex
+
+
+def _days_within(start, end, horizon_start, horizon_end):
+    """Tage von ``[start, end]`` innerhalb des Planungszeitraums"""
+    first = max(start, horizon_start)
+    last = min(end, horizon_end)
+    return max((last - first).days + 1, 0)
+
+
+def open_courses(curriculum_id=None, start_date=None, end_date=None):
+    """Kurse ohne Dozent im Lehrplan bzw. Zeitraum, nach Startdatum
+
+    Ohne Lehrplan werden nur aktive (in der Timeline sichtbare) Kurse geplant.
+    """
+    query = db.session.query(Course).filter(Course.lecturer_id.is_(None))
+    if curriculum_id:
+        query = query.filter(Course.curriculum_id == curriculum_id)
+    else:
+        query = query.filter(Course.active == True)
+    if start_date is not None and end_date is not None:
+        query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
+    return query.order_by(Course.start_date, Course.id).all()
+
+
+def propose_assignments(curriculum_id=None, start_date=None, end_date=None, lecturer_ids=None):
+    """Schlägt für jeden offenen Kurs einen Dozenten vor
+
+    Parameters:
+    -----------
+    curriculum_id : str, optional
+        Nur Kurse dieses Lehrplans
+    start_date, end_date : datetime, optional
+        Nur Kurse, die diesen Zeitraum berühren
+    lecturer_ids : iterable, optional
+        In Frage kommende Dozenten (Standard: alle)
+
+    Returns:
+    --------
+    dict
+        ``proposals`` (pro Kurs ``lecturer_id`` oder None), ``assignments``
+        im Format ``"course_id:lecturer_id"`` für ``bulk_assign()`` sowie
+        ``assigned``, ``unassigned`` und die Last pro Dozent in ``load``
+
+    Raises:
+    -------
+    ValueError
+        Wenn weder Lehrplan noch Zeitraum angegeben ist
+    """
+    if not curriculum_id and (start_date is None or end_date is None):
+        raise ValueError('Bitte einen Lehrplan oder einen Zeitraum angeben')
+
+    courses = open_courses(curriculum_id, start_date, end_date)
+    lecturers = db.session.query(Lecturer.id, Lecturer.name)
+    if lecturer_ids is not None:
+        lecturers = lecturers.filter(Lecturer.id.in_(lecturer_ids))
+    lecturers = lecturers.order_by(Lecturer.id).all()
+    if not courses or not lecturers:
+        return _result(courses, {}, lecturers, {})
+
+    candidate_ids = [lecturer_id for lecturer_id, _ in lecturers]
+    horizon_start = min(course.start_date for course in courses)
+    horizon_end = max(course.end_date for course in courses)
+
+    # Bestehende Buchungen: gleiche Überschneidungsregel wie bulk_assign()
+    bookings = db.session.query(Course.id, Course.lecturer_id, Course.start_date, Course.end_date)\
+        .filter(Course.lecturer_id.in_(candidate_ids))\
+        .filter(Course.end_date >= horizon_start, Course.start_date <= horizon_end)\
+        .all()
+    booked = IntervalIndex.from_courses(bookings)
+    load = {lecturer_id: 0 for lecturer_id in candidate_ids}
+    for booking in bookings:
+        load[booking.lecturer_id] += _days_within(booking.start_date, booking.end_date,
+                                                  horizon_start, horizon_end)
+
+    # Abwesenheiten blockieren auch, wenn sie den Kurs nur am Rand berühren
+    absent = IntervalIndex(inclusive=True)
+    for row in db.session.query(Availability.lecturer_id, Availability.start_date, Availability.end_date)\
+            .filter(Availability.lecturer_id.in_(candidate_ids))\
+            .filter(Availability.end_date >= horizon_start, Availability.start_date <= horizon_end):
+        absent.add(row.lecturer_id, row.start_date, row.end_date, row)
+
+    topics = {course.topic for course in courses}
+    familiar = {
+        tuple(row) for row in db.session.query(Course.lecturer_id, Course.topic)
+            .filter(Course.lecturer_id.in_(candidate_ids))
+            .filter(Course.topic.in_(topics))
+            .distinct()
+    }
+
+    planned = IntervalIndex()
+    proposals = {}
+    for course in courses:
+        ranking = sorted(
+            candidate_ids,
+            key=lambda lecturer_id: (load[lecturer_id], (lecturer_id, course.topic) not in familiar, lecturer_id)
+        )
+        for lecturer_id in ranking:
+            if booked.query(lecturer_id, course.start_date, course.end_date):
+                continue
+            if planned.query(lecturer_id, course.start_date, course.end_date):
+                continue
+            if absent.query(lecturer_id, course.start_date, course.end_date):
+                continue
+            proposals[course.id] = lecturer_id
+            planned.add(lecturer_id, course.start_date, course.end_date, course)
+            load[lecturer_id] += _days_within(course.start_date, course.end_date, horizon_start, horizon_end)
+            break
+
+    return _result(courses, proposals, lecturers, load)
+
+
+def _result(courses, proposals, lecturers, load):
+    names = dict(lecturers)
+    rows = []
+    for course in courses:
+        lecturer_id = proposals.get(course.id)
+        rows.append({
+            'course_id': course.id,
+            'topic': course.topic,
+            'curriculum_id': course.curriculum_id,
+            'start_date': course.start_date.strftime('%Y-%m-%d'),
+            'end_date': course.end_date.strftime('%Y-%m-%d'),
+            'lecturer_id': lecturer_id,
+            'lecturer_name': names.get(lecturer_id),
+        })
+    return {
+        'proposals': rows,
+        'assignments': [f'{course_id}:{lecturer_id}' for course_id, lecturer_id in proposals.items()],
+        'assigned': len(proposals),
+        'unassigned': len(courses) - len(proposals),
+        'load': [
+            {'lecturer_id': lecturer_id, 'name': name, 'days': load.get(lecturer_id, 0)}
+            for lecturer_id, name in lecturers
+        ],
+    }
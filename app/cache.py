@@ -0,0 +1,281 @@
+"""Serverseitige Caches und Datenversion
+
+Jeder Flush, der ``Course``, ``Assignment``, ``Lecturer`` oder ``Availability``
+verändert, erhöht in derselben Transaktion einen Zähler in ``change_counter``.
+Für Kurse wird zusätzlich pro Lehrplan gezählt (``curriculum:<uuid>``), bei
+Bulk-Updates ohne bekannte Lehrpläne der Sammelzähler ``curriculum:*``.
+Kurse, Verfügbarkeiten und Dozenten zählen außerdem pro Dozent
+(``lecturer:<id>``, Sammelzähler ``lecturer:*``) für die iCal-Feeds.
+
+Caches nehmen die Versionen in ihren Schlüssel auf und müssen deshalb nie
+explizit geleert werden: veraltete Einträge werden nicht mehr getroffen und
+fallen per LRU heraus. Da die Zähler in der Datenbank liegen, sehen alle
+Gunicorn-Worker dieselbe Version; zurückgerollte Transaktionen zählen nicht.
+"""
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+import threading
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import ChangeCounter, Course, Availability, Lecturer, Curriculum
+
+# Tabellen, deren Änderungen die Timeline-Darstellung beeinflussen
+TRACKED_TABLES = ('course', 'assignment', 'lecturer', 'availability')
+
+ALL_CURRICULA = 'curriculum:*'
+ALL_LECTURERS = 'lecturer:*'
+
+# Änderungszeitpunkt für Datenbanken ohne gezählte Änderung
+UNCHANGED_SINCE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# Losgelöste Kopie eines Kurses, unabhängig von Session und ORM-Zustand
+CourseSnapshot = namedtuple('CourseSnapshot', [
+    'id', 'topic', 'start_date', 'end_date', 'lecturer_id', 'curriculum_id', 'active'
+])
+
+
+class LRUCache:
+    """Threadsicherer LRU-Cache mit fester Größe und Treffer-/Fehlzählern"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
+
+
+# Gerendertes Timeline-HTML, Schlüssel: (Filter, Datenversion, Tag)
+timeline_cache = LRUCache(maxsize=32)
+
+# Sortierte Kurs-Snapshots pro Lehrplan, Schlüssel: (curriculum_id, Versionen)
+curriculum_cache = LRUCache(maxsize=128)
+
+
+def filter_cache_key(filter_options):
+    """Hashbarer Schlüssel für ein Filter-Dict (Listen werden zu Tupeln)"""
+    return tuple(sorted(
+        (key, tuple(value) if isinstance(value, list) else value)
+        for key, value in (filter_options or {}).items()
+    ))
+
+
+def curriculum_counter(curriculum_id):
+    return f'curriculum:{curriculum_id}'
+
+
+def lecturer_counter(lecturer_id):
+    return f'lecturer:{lecturer_id}'
+
+
+def read_versions(*names):
+    """Liest die Zählerstände für die angegebenen Namen (fehlende = 0)"""
+    rows = db.session.query(ChangeCounter.name, ChangeCounter.version)\
+        .filter(ChangeCounter.name.in_(names))\
+        .all()
+    versions = dict(rows)
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def data_version():
+    """Gemeinsame Datenversion der Timeline-relevanten Tabellen"""
+    return db.session.query(func.coalesce(func.sum(ChangeCounter.version), 0))\
+        .filter(ChangeCounter.name.in_(TRACKED_TABLES))\
+        .scalar()
+
+
+def data_version_modified():
+    """Datenversion und Zeitpunkt ihrer letzten Änderung (eine Abfrage)
+
+    Der Zeitpunkt steht wie die Zähler in der Datenbank und ist damit in allen
+    Workern und nach Neustarts für dieselbe Version gleich.
+
+    Returns:
+    --------
+    tuple
+        ``(version, modified)`` mit ``modified`` sekundengenau in UTC
+        (``UNCHANGED_SINCE``, solange nie etwas geändert wurde)
+    """
+    version, updated_at = db.session.query(
+            func.coalesce(func.sum(ChangeCounter.version), 0), func.max(ChangeCounter.updated_at))\
+        .filter(ChangeCounter.name.in_(TRACKED_TABLES))\
+        .one()
+    if updated_at is None:
+        return version, UNCHANGED_SINCE
+    return version, updated_at.replace(tzinfo=timezone.utc)
+
+
+def has_uncommitted_changes(session=None):
+    """True, solange die Session gezählte, aber noch nicht committete Änderungen hat
+
+    Solche Stände dürfen nicht gecacht werden: nach einem Rollback würde die
+    Versionsnummer erneut für andere Daten vergeben.
+    """
+    session = session if session is not None else db.session
+    return bool(session.info.get('uncommitted_changes'))
+
+
+def _bump(session, names):
+    if not names:
+        return
+    session.info['uncommitted_changes'] = True
+    table = ChangeCounter.__table__
+    now = datetime.utcnow().replace(microsecond=0)
+    stmt = sqlite_insert(table).values([
+        {'name': name, 'version': 1, 'updated_at': now} for name in sorted(names)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+    )
+    session.connection().execute(stmt)
+
+
+def mark_changed(session, tables=(), curriculum_ids=(), lecturer_ids=()):
+    """Erhöht Zähler für Änderungen, die keine Flush-Events auslösen
+
+    Z.B. nach ``bulk_insert_mappings`` oder Core-Updates; läuft in der
+    Transaktion der Session und wird mit ihr committet oder verworfen.
+    """
+    names = set(tables) | {curriculum_counter(cid) for cid in curriculum_ids}
+    names |= {lecturer_counter(lid) for lid in lecturer_ids if lid is not None}
+    _bump(session, names)
+
+
+def _changed_values(instance, attribute, deleted=False):
+    """Alle Werte, die ein Attribut vor und nach der Änderung hatte (ohne None)"""
+    current = getattr(instance, attribute)
+    if deleted:
+        return {current} - {None}
+    history = getattr(inspect(instance).attrs, attribute).history
+    values = set(history.added or ()) | set(history.deleted or ())
+    values.add(current)
+    values.discard(None)
+    return values
+
+
+def changed_curricula(instance, deleted=False):
+    """Alle Lehrpläne, die ein geänderter Kurs vorher oder nachher berührt"""
+    return _changed_values(instance, 'curriculum_id', deleted)
+
+
+def changed_lecturers(instance, deleted=False):
+    """Alle Dozenten, deren Feed ein geänderter Kurs, eine Verfügbarkeit oder ein Dozent berührt"""
+    if isinstance(instance, Lecturer):
+        return {instance.id} - {None}
+    return _changed_values(instance, 'lecturer_id', deleted)
+
+
+def _after_flush(session, flush_context):
+    names = set()
+    candidates = [(instance, False) for instance in session.new]
+    candidates += [(instance, False) for instance in session.dirty
+                   if session.is_modified(instance, include_collections=False)]
+    candidates += [(instance, True) for instance in session.deleted]
+
+    for instance, deleted in candidates:
+        if isinstance(instance, Curriculum):
+            # Umbenennung: Name steht im Lehrplan-Feed
+            names.add(curriculum_counter(instance.id))
+            continue
+        table = getattr(instance, '__tablename__', None)
+        if table not in TRACKED_TABLES:
+            continue
+        names.add(table)
+        if isinstance(instance, Course):
+            names.update(curriculum_counter(cid) for cid in changed_curricula(instance, deleted))
+        if isinstance(instance, (Course, Availability, Lecturer)):
+            names.update(lecturer_counter(lid) for lid in changed_lecturers(instance, deleted))
+
+    _bump(session, names)
+
+
+def _after_bulk(update_context):
+    table = getattr(update_context.mapper.class_, '__tablename__', None)
+    if table not in TRACKED_TABLES:
+        return
+    names = {table}
+    if table == 'course':
+        # Welche Lehrpläne betroffen sind, ist hier nicht bekannt
+        names.add(ALL_CURRICULA)
+    if table in ('course', 'availability'):
+        names.add(ALL_LECTURERS)
+    _bump(update_context.session, names)
+
+
+def _end_transaction(session):
+    session.info.pop('uncommitted_changes', None)
+
+
+def register_cache_events():
+    """Registriert die Session-Events einmalig für alle Sessions"""
+    listeners = [
+        ('after_flush', _after_flush),
+        ('after_bulk_update', _after_bulk),
+        ('after_bulk_delete', _after_bulk),
+        ('after_commit', _end_transaction),
+        ('after_rollback', _end_transaction),
+    ]
+    for name, listener in listeners:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def get_curriculum_snapshot(curriculum_id):
+    """Aktive Kurse eines Lehrplans nach Startdatum, als losgelöste Snapshots
+
+    Kostet bei einem Treffer eine Abfrage auf ``change_counter``; die Kurse
+    werden nur nach einer Änderung an diesem Lehrplan neu geladen.
+    """
+    versions = read_versions(curriculum_counter(curriculum_id), ALL_CURRICULA)
+    key = (curriculum_id, versions)
+    snapshot = curriculum_cache.get(key)
+    if snapshot is None:
+        rows = db.session.query(
+            Course.id, Course.topic, Course.start_date, Course.end_date,
+            Course.lecturer_id, Course.curriculum_id, Course.active
+        ).filter(Course.curriculum_id == curriculum_id)\
+         .filter(Course.active == True)\
+         .order_by(Course.start_date)\
+         .all()
+        snapshot = tuple(CourseSnapshot(*row) for row in rows)
+        if not has_uncommitted_changes():
+            curriculum_cache.set(key, snapshot)
+    return snapshot
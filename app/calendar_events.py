@@ -0,0 +1,108 @@
+"""Ereignisse für die Kalenderansicht (FullCalendar-Format)
+
+Die Seite enthält keine Ereignisse mehr; FullCalendar lädt über
+``/api/events`` nur das sichtbare Zeitfenster. Die Abfragen laufen über die
+Datumsindizes (``ix_course_active_dates`` bzw. ``ix_course_lecturer_active_dates``
+und die entsprechenden Indizes auf ``availability``).
+"""
+from datetime import datetime, timedelta
+
+from .queries import course_rows, availability_rows
+
+EVENT_TYPES = ('course', 'availability')
+
+
+def parse_window(start, end):
+    """Zeitfenster aus den FullCalendar-Parametern (ISO-Datum, ggf. mit Uhrzeit und Zone)
+
+    Returns:
+    --------
+    tuple
+        ``(start, end)`` als Tagesanfang; ``end`` ist exklusiv
+
+    Raises:
+    -------
+    ValueError
+        Wenn ein Datum fehlt, ungültig ist oder das Ende vor dem Start liegt
+    """
+    if not start or not end:
+        raise ValueError('start und end sind erforderlich')
+    start_date = datetime.strptime(start[:10], '%Y-%m-%d')
+    end_date = datetime.strptime(end[:10], '%Y-%m-%d')
+    if end_date < start_date:
+        raise ValueError('end liegt vor start')
+    return start_date, end_date
+
+
+def _course_event(row):
+    lecturer_name = row.lecturer_name or 'Nicht zugewiesen'
+    return {
+        'id': f'course_{row.id}',
+        'title': f'{row.topic} ({lecturer_name})',
+        'start': row.start_date.strftime('%Y-%m-%d'),
+        'end': (row.end_date + timedelta(days=1)).strftime('%Y-%m-%d'),  # FullCalendar verwendet nicht-inklusive Enddaten
+        'color': row.lecturer_color or '#808080',
+        'textColor': '#fff',
+        'type': 'course',
+        'url': f'/manage#course-{row.id}',
+        'extendedProps': {
+            'course_id': row.id,
+            'lecturer_id': row.lecturer_id,
+            'lecturer_name': lecturer_name,
+            'topic': row.topic
+        }
+    }
+
+
+def _availability_event(row):
+    lecturer_name = row.lecturer_name or 'Unbekannt'
+    if row.type == 'vacation':
+        color = 'rgba(255,165,0,0.5)'
+        title = f'{lecturer_name}: Urlaub'
+        icon = 'fas fa-umbrella-beach'
+    else:
+        color = 'rgba(255,0,0,0.5)'
+        title = f'{lecturer_name}: Nicht verfügbar'
+        icon = 'fas fa-ban'
+
+    if row.note:
+        title += f' - {row.note}'
+
+    return {
+        'id': f'availability_{row.id}',
+        'title': title,
+        'start': row.start_date.strftime('%Y-%m-%d'),
+        'end': (row.end_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+        'color': color,
+        'textColor': '#000',
+        'type': 'availability',
+        'classNames': ['availability-event'],
+        'extendedProps': {
+            'availability_id': row.id,
+            'lecturer_id': row.lecturer_id,
+            'lecturer_name': lecturer_name,
+            'icon': icon,
+            'note': row.note
+        }
+    }
+
+
+def calendar_events(start_date, end_date, lecturer_id=None, types=EVENT_TYPES):
+    """Kurse und Abwesenheiten, die das Fenster ``[start_date, end_date)`` schneiden
+
+    Parameters:
+    -----------
+    start_date, end_date : datetime
+        Sichtbares Fenster, ``end_date`` exklusiv
+    lecturer_id : int, optional
+        Nur Ereignisse dieses Dozenten
+    types : iterable
+        Teilmenge von ``EVENT_TYPES``
+    """
+    # Kurse, die genau am Fensterende beginnen, kommen mit; FullCalendar blendet sie aus
+    events = []
+    if 'course' in types:
+        events.extend(_course_event(row) for row in course_rows(lecturer_id, None, start_date, end_date))
+    if 'availability' in types:
+        events.extend(_availability_event(row) for row in availability_rows(lecturer_id, start_date, end_date))
+    return events
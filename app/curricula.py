@@ -0,0 +1,178 @@
+"""Pflege der Tabelle ``curriculum``
+
+Die Kennzahlen eines Lehrplans (Start, Ende, Kursanzahl, Aktiv-Flag) werden
+nicht bei jedem Seitenaufruf per ``GROUP BY curriculum_id`` aus den Kursen
+abgeleitet, sondern in derselben Transaktion wie die Kursänderung für genau
+die betroffenen Lehrpläne neu berechnet. Listen von Lehrplänen sind damit ein
+einfacher, indizierter Lesezugriff auf ``curriculum``.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import Course, Curriculum, Settings
+from .cache import changed_curricula, mark_changed
+from .rollups import refresh_rollups_for_curricula, NO_LECTURER
+
+# Spalten, deren Änderung die Kennzahlen eines Lehrplans beeinflusst
+AGGREGATE_COLUMNS = {'start_date', 'end_date', 'active', 'curriculum_id'}
+
+
+def refresh_curricula(session, curriculum_ids=None):
+    """Berechnet die Kennzahlen der angegebenen Lehrpläne neu (ohne Commit)
+
+    Parameters:
+    -----------
+    session : Session
+        Die Session, in deren Transaktion geschrieben wird
+    curriculum_ids : iterable, optional
+        Betroffene Lehrpläne; ``None`` baut die ganze Tabelle neu auf.
+        Lehrpläne ohne Kurse werden entfernt, Namen bleiben erhalten.
+    """
+    if curriculum_ids is not None:
+        curriculum_ids = set(curriculum_ids) - {None}
+        if not curriculum_ids:
+            return
+
+    stats = select(
+        Course.curriculum_id,
+        func.min(Course.start_date),
+        func.max(Course.end_date),
+        func.count(Course.id),
+        func.max(Course.active)
+    ).group_by(Course.curriculum_id)
+    if curriculum_ids is not None:
+        stats = stats.where(Course.curriculum_id.in_(curriculum_ids))
+
+    connection = session.connection()
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': curriculum_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'course_count': course_count,
+            'active': bool(active),
+            'updated_at': now
+        }
+        for curriculum_id, start_date, end_date, course_count, active in connection.execute(stats)
+    ]
+
+    table = Curriculum.__table__
+    if rows:
+        stmt = sqlite_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                'start_date': stmt.excluded.start_date,
+                'end_date': stmt.excluded.end_date,
+                'course_count': stmt.excluded.course_count,
+                'active': stmt.excluded.active,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        connection.execute(stmt)
+
+    remaining = {row['id'] for row in rows}
+    if curriculum_ids is not None:
+        emptied = curriculum_ids - remaining
+        if emptied:
+            connection.execute(table.delete().where(table.c.id.in_(emptied)))
+    else:
+        connection.execute(table.delete().where(table.c.id.notin_(remaining)))
+
+
+def set_curriculum_active(session, curriculum_id, active):
+    """Blendet alle Kurse eines Lehrplans in der Timeline ein oder aus (ohne Commit)
+
+    Ein Core-``UPDATE`` statt ``Query.update()``: dessen Bulk-Events kennen
+    den Lehrplan nicht und würden Kennzahlen und Statistik-Rollups komplett
+    neu berechnen. Hier werden nur dieser Lehrplan, seine Rollups und seine
+    Dozenten nachgeführt.
+    """
+    table = Course.__table__
+    session.connection().execute(
+        table.update().where(table.c.curriculum_id == curriculum_id).values(active=active)
+    )
+    refresh_curricula(session, [curriculum_id])
+    lecturer_ids = refresh_rollups_for_curricula(session, [curriculum_id]) - {NO_LECTURER}
+    mark_changed(session, tables=('course',), curriculum_ids=[curriculum_id], lecturer_ids=lecturer_ids)
+
+
+def rebuild_curricula(session):
+    """Baut ``curriculum`` komplett neu auf und übernimmt alte Namen aus ``Settings``"""
+    refresh_curricula(session)
+    prefix = 'curriculum_name_'
+    names = session.query(Settings.key, Settings.value)\
+        .filter(Settings.key.like(prefix + '%'))\
+        .all()
+    table = Curriculum.__table__
+    for key, value in names:
+        session.connection().execute(
+            table.update()
+                .where(table.c.id == key[len(prefix):])
+                .where(table.c.name.is_(None))
+                .values(name=value)
+        )
+
+
+def _aggregates_modified(course):
+    """True, wenn sich eine für die Kennzahlen relevante Spalte geändert hat"""
+    attrs = inspect(course).attrs
+    return any(attrs[name].history.has_changes() for name in AGGREGATE_COLUMNS)
+
+
+def _after_flush(session, flush_context):
+    curriculum_ids = set()
+    for instance in session.new:
+        if isinstance(instance, Course):
+            curriculum_ids.update(changed_curricula(instance))
+    for instance in session.dirty:
+        if isinstance(instance, Course) and _aggregates_modified(instance):
+            curriculum_ids.update(changed_curricula(instance))
+    for instance in session.deleted:
+        if isinstance(instance, Course):
+            curriculum_ids.update(changed_curricula(instance, deleted=True))
+    refresh_curricula(session, curriculum_ids)
+
+
+def _after_bulk_update(update_context):
+    if update_context.mapper.class_ is not Course:
+        return
+    columns = {getattr(key, 'key', key) for key in update_context.values}
+    # Z.B. das Entfernen eines Dozenten ändert keine Kennzahlen
+    if columns & AGGREGATE_COLUMNS:
+        refresh_curricula(update_context.session)
+
+
+def _after_bulk_delete(delete_context):
+    if delete_context.mapper.class_ is Course:
+        refresh_curricula(delete_context.session)
+
+
+def register_curriculum_events():
+    """Registriert die Session-Events einmalig für alle Sessions
+
+    Bulk-Updates und -Deletes verraten die betroffenen Lehrpläne nicht und
+    bauen deshalb die ganze Tabelle neu auf; Aufrufer, die sie kennen, rufen
+    besser ``refresh_curricula()`` mit den IDs auf.
+    """
+    listeners = [
+        ('after_flush', _after_flush),
+        ('after_bulk_update', _after_bulk_update),
+        ('after_bulk_delete', _after_bulk_delete),
+    ]
+    for name, listener in listeners:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def list_curricula(active_only=False):
+    """Alle Lehrpläne nach Startdatum, optional nur die in der Timeline sichtbaren"""
+    query = db.session.query(Curriculum)
+    if active_only:
+        query = query.filter(Curriculum.active == True)
+    return query.order_by(Curriculum.start_date).all()
@@ -0,0 +1,134 @@
+"""Vorberechnete iCal-Feeds pro Dozent und pro Lehrplan
+
+Kalender-Apps fragen Abonnements alle paar Minuten ab. Statt jeden Abruf aus
+der Datenbank neu zu erzeugen, liegt jeder Feed als fertige ``.ics``-Datei in
+``ICAL_FEED_DIR``. Der Dateiname enthält die Zählerstände aus
+``change_counter``, von denen der Feed abhängt:
+
+* Dozent: ``lecturer:<id>`` und ``lecturer:*``
+* Lehrplan: ``curriculum:<uuid>``, ``curriculum:*`` und ``lecturer`` (Namen
+  und Farben der Dozenten stehen in den Ereignissen)
+
+Ein Schreibzugriff erhöht nur die Zähler der berührten Dozenten bzw.
+Lehrpläne; nur deren Feeds werden beim nächsten Abruf einmal neu geschrieben,
+alle anderen bleiben reine Dateiauslieferungen mit starkem ETag.
+"""
+import glob
+import os
+import re
+import tempfile
+import threading
+
+from . import db
+from .models import Lecturer, Curriculum
+from .cache import (read_versions, lecturer_counter, curriculum_counter,
+                    ALL_LECTURERS, ALL_CURRICULA)
+from .ical import iter_calendar
+from .queries import course_rows, availability_rows
+
+# Lehrplan-IDs sind UUIDs; alles andere wird nicht als Dateiname verwendet
+_FEED_ID = re.compile(r'^[0-9A-Za-z-]{1,64}$')
+
+# Pro Feed schreibt im Prozess nur ein Thread gleichzeitig
+_feed_locks = {}
+_feed_locks_lock = threading.Lock()
+
+
+def _feed_lock(kind, feed_id):
+    with _feed_locks_lock:
+        return _feed_locks.setdefault((kind, feed_id), threading.Lock())
+
+
+def feed_versions(kind, feed_id):
+    """Zählerstände, von denen der Feed abhängt (eine Abfrage)"""
+    if kind == 'lecturer':
+        return read_versions(lecturer_counter(feed_id), ALL_LECTURERS)
+    return read_versions(curriculum_counter(feed_id), ALL_CURRICULA, 'lecturer')
+
+
+def _feed_etag(kind, feed_id, versions):
+    return f'{kind}-{feed_id}-' + '-'.join(str(v) for v in versions)
+
+
+def _feed_dir(app, kind, feed_id):
+    return os.path.join(app.config['ICAL_FEED_DIR'], kind, str(feed_id))
+
+
+def _write_feed(path, chunks):
+    """Schreibt den Feed atomar und entfernt ältere Stände desselben Feeds"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    for old_path in glob.glob(os.path.join(directory, '*.ics')):
+        if old_path != path:
+            try:
+                os.unlink(old_path)
+            except OSError:
+                pass
+
+
+def _feed_chunks(kind, feed_id):
+    """VCALENDAR-Blöcke eines Feeds, oder None, wenn Dozent/Lehrplan nicht existiert"""
+    if kind == 'lecturer':
+        lecturer = db.session.query(Lecturer).get(feed_id)
+        if lecturer is None:
+            return None
+        return iter_calendar(
+            course_rows(lecturer_id=feed_id),
+            availability_rows(lecturer_id=feed_id),
+            name=f'Lehrplan-Kalender {lecturer.name}'
+        )
+
+    curriculum = db.session.query(Curriculum).get(feed_id)
+    if curriculum is None:
+        return None
+    return iter_calendar(
+        course_rows(curriculum_id=feed_id),
+        name=f'Lehrplan {curriculum.name or curriculum.start_date.strftime("%d.%m.%Y")}'
+    )
+
+
+def get_feed(app, kind, feed_id):
+    """Pfad und ETag des aktuellen Feeds; erzeugt ihn, falls sich Daten geändert haben
+
+    Parameters:
+    -----------
+    kind : str
+        'lecturer' oder 'curriculum'
+    feed_id : int oder str
+        Dozenten-ID bzw. curriculum_id
+
+    Returns:
+    --------
+    tuple
+        ``(path, etag)``, oder ``None``, wenn es den Dozenten/Lehrplan nicht gibt
+    """
+    if not _FEED_ID.match(str(feed_id)):
+        return None
+
+    versions = feed_versions(kind, feed_id)
+    etag = _feed_etag(kind, feed_id, versions)
+    path = os.path.join(_feed_dir(app, kind, feed_id), etag + '.ics')
+    if os.path.exists(path):
+        return path, etag
+
+    with _feed_lock(kind, feed_id):
+        if os.path.exists(path):
+            return path, etag
+        chunks = _feed_chunks(kind, feed_id)
+        if chunks is None:
+            return None
+        _write_feed(path, chunks)
+    return path, etag
@@ -0,0 +1,212 @@
+"""Frei/Belegt-Index der Dozenten für Kandidatenvorschläge
+
+Pro Dozent liegen die Buchungen (Kurse) und Abwesenheiten als sortierte,
+zusammengefasste Intervalle in Tagen (``date.toordinal()``, halboffen
+``[start, ende)``) vor. Da sich die Intervalle nach dem Zusammenfassen nicht
+mehr überschneiden, sind Start- und Endwerte beide aufsteigend sortiert: ob
+ein Dozent in ``[start, end]`` frei ist, entscheidet ein einziges ``bisect``.
+Kumulierte Längen der Buchungen liefern die gebuchten Tage in einem beliebigen
+Fenster ebenfalls in O(log n).
+
+Überschneidungsregeln wie in der übrigen Anwendung: Kurse dürfen sich am
+Rand berühren (``bulk_assign()``), Abwesenheiten blockieren auch den ersten
+und letzten Tag. Eintägige Kurse zählen als ein belegter Tag und sind damit
+etwas strenger als die Konfliktprüfung. Der Index wird pro Datenversion einmal aufgebaut.
+Ein bereits gebuchter Kurs, für den Kandidaten gesucht werden, wird nur beim
+eigenen Dozenten und nur im Fenster herausgerechnet.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from . import db
+from .models import Course, Lecturer, Availability
+from .cache import LRUCache, data_version, has_uncommitted_changes
+
+# Fenster um einen Kurs, in dem die aktuelle Last gezählt wird
+LOAD_MARGIN_DAYS = 28
+
+# Index pro Datenversion
+freebusy_cache = LRUCache(maxsize=4)
+
+# Keine Intervalle (Form wie ``_merge()``)
+EMPTY = ([], [], [0])
+
+
+def _merge(intervals):
+    """Fasst halboffene Intervalle zusammen
+
+    Returns:
+    --------
+    tuple
+        ``(starts, ends, prefix)`` mit ``prefix[i]`` = Summe der Längen der
+        ersten ``i`` Intervalle
+    """
+    starts, ends, prefix = [], [], [0]
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if ends and start <= ends[-1]:
+            if end > ends[-1]:
+                prefix[-1] += end - ends[-1]
+                ends[-1] = end
+            continue
+        starts.append(start)
+        ends.append(end)
+        prefix.append(prefix[-1] + end - start)
+    return starts, ends, prefix
+
+
+def _overlaps(merged, start, end):
+    """True, wenn ein Intervall ``[start, end)`` schneidet"""
+    starts, ends, _ = merged
+    i = bisect_left(starts, end) - 1
+    return i >= 0 and ends[i] > start
+
+
+def _covered(merged, start, end):
+    """Anzahl der Tage in ``[start, end)``, die in den Intervallen liegen"""
+    starts, ends, prefix = merged
+    if not starts or end <= start:
+        return 0
+    first = bisect_right(ends, start)
+    last = bisect_left(starts, end)
+    if first >= last:
+        return 0
+    total = prefix[last] - prefix[first]
+    # Randintervalle auf das Fenster zuschneiden
+    total -= max(start - starts[first], 0)
+    total -= max(ends[last - 1] - end, 0)
+    return total
+
+
+class FreeBusyIndex:
+    """Sortierte Belegt-Intervalle pro Dozent
+
+    Parameters:
+    -----------
+    lecturers : list
+        ``(id, name, color)`` aller Dozenten
+    bookings : iterable
+        ``(course_id, lecturer_id, start_date, end_date)`` der Kurse mit Dozent
+    absences : iterable
+        ``(lecturer_id, start_date, end_date)`` der Abwesenheiten
+    """
+
+    def __init__(self, lecturers, bookings, absences):
+        self.lecturers = list(lecturers)
+        self._raw_bookings = defaultdict(list)
+        self._course_lecturer = {}
+        for course_id, lecturer_id, start_date, end_date in bookings:
+            # Kurse dürfen sich am Rand berühren: Endtag exklusiv, eintägige
+            # Kurse belegen aber ihren Tag
+            start = start_date.toordinal()
+            self._raw_bookings[lecturer_id].append((start, max(end_date.toordinal(), start + 1), course_id))
+            self._course_lecturer[course_id] = lecturer_id
+        raw_absences = defaultdict(list)
+        for lecturer_id, start_date, end_date in absences:
+            raw_absences[lecturer_id].append((start_date.toordinal(), end_date.toordinal() + 1))
+
+        # Einzelbuchungen nach Start sortiert, für das Herausrechnen eines Kurses
+        self._raw_starts = {}
+        for lecturer_id, entries in self._raw_bookings.items():
+            entries.sort()
+            self._raw_starts[lecturer_id] = [start for start, _, _ in entries]
+
+        self._booked = {
+            lecturer_id: _merge((start, end) for start, end, _ in entries)
+            for lecturer_id, entries in self._raw_bookings.items()
+        }
+        self._absent = {lecturer_id: _merge(entries) for lecturer_id, entries in raw_absences.items()}
+
+    def _booked_for(self, lecturer_id, start, end, exclude_course_id=None):
+        """Zusammengefasste Buchungen, gültig für Abfragen innerhalb ``[start, end)``
+
+        Nur wenn der ausgeschlossene Kurs diesem Dozenten gehört und das
+        Fenster schneidet, werden die Einzelbuchungen im Fenster (per
+        ``bisect`` gefunden) ohne ihn neu zusammengefasst.
+        """
+        booked = self._booked.get(lecturer_id, EMPTY)
+        if exclude_course_id is None or self._course_lecturer.get(exclude_course_id) != lecturer_id:
+            return booked
+        starts, ends, _ = booked
+        # Jede Einzelbuchung liegt in einem zusammengefassten Intervall: die im
+        # Fenster beginnen frühestens mit dem ersten Intervall, das es schneidet
+        first = bisect_right(ends, start)
+        if first == len(starts):
+            return booked
+        raw_starts = self._raw_starts[lecturer_id]
+        window = self._raw_bookings[lecturer_id][bisect_left(raw_starts, starts[first]):bisect_left(raw_starts, end)]
+        if all(course_id != exclude_course_id for _, _, course_id in window):
+            return booked
+        return _merge((entry_start, entry_end) for entry_start, entry_end, course_id in window
+                      if course_id != exclude_course_id)
+
+    def status(self, lecturer_id, start_date, end_date, exclude_course_id=None):
+        """Frei/belegt/abwesend und Last eines Dozenten für ``[start_date, end_date]``
+
+        Returns:
+        --------
+        dict
+            ``booked`` (Kursüberschneidung), ``absent`` (Abwesenheit),
+            ``free`` und ``load_days`` (gebuchte Tage im Fenster
+            ``LOAD_MARGIN_DAYS`` vor und nach dem Zeitraum)
+        """
+        start = start_date.toordinal()
+        end = end_date.toordinal()
+        # Das Lastfenster enthält den Zeitraum selbst
+        load_start, load_end = start - LOAD_MARGIN_DAYS, end + 1 + LOAD_MARGIN_DAYS
+        booked = self._booked_for(lecturer_id, load_start, load_end, exclude_course_id)
+        is_booked = _overlaps(booked, start, max(end, start + 1))
+        is_absent = _overlaps(self._absent.get(lecturer_id, EMPTY), start, end + 1)
+        return {
+            'booked': is_booked,
+            'absent': is_absent,
+            'free': not (is_booked or is_absent),
+            'load_days': _covered(booked, load_start, load_end),
+        }
+
+    def candidates(self, start_date, end_date, exclude_course_id=None):
+        """Alle Dozenten mit Status, freie zuerst und darunter nach Last
+
+        Returns:
+        --------
+        list
+            Dicts mit ``id``, ``name``, ``color`` und den Feldern aus ``status()``
+        """
+        result = []
+        for lecturer_id, name, color in self.lecturers:
+            entry = {'id': lecturer_id, 'name': name, 'color': color or '#808080'}
+            entry.update(self.status(lecturer_id, start_date, end_date, exclude_course_id))
+            result.append(entry)
+        result.sort(key=lambda entry: (not entry['free'], entry['absent'], entry['load_days'], entry['name']))
+        return result
+
+
+def build_index():
+    """Lädt Dozenten, Buchungen und Abwesenheiten (drei Abfragen)"""
+    lecturers = db.session.query(Lecturer.id, Lecturer.name, Lecturer.color).order_by(Lecturer.name).all()
+    bookings = db.session.query(Course.id, Course.lecturer_id, Course.start_date, Course.end_date)\
+        .filter(Course.lecturer_id.isnot(None))\
+        .all()
+    absences = db.session.query(Availability.lecturer_id, Availability.start_date, Availability.end_date)\
+        .filter(Availability.lecturer_id.isnot(None))\
+        .all()
+    return FreeBusyIndex([tuple(row) for row in lecturers], bookings, absences)
+
+
+def get_index(version=None):
+    """Index für die aktuelle Datenversion (aus dem Cache oder neu aufgebaut)"""
+    if version is None:
+        version = data_version()
+    index = freebusy_cache.get(version)
+    if index is None:
+        index = build_index()
+        if not has_uncommitted_changes():
+            freebusy_cache.set(version, index)
+    return index
+
+
+def free_lecturers(start_date, end_date, exclude_course_id=None, version=None):
+    """Kandidaten für einen Zeitraum, siehe ``FreeBusyIndex.candidates()``"""
+    return get_index(version).candidates(start_date, end_date, exclude_course_id)
+
@@ -0,0 +1,158 @@
+"""iCalendar-Feeds als Datenstrom
+
+Statt für jeden Abruf einen ``icalendar.Calendar`` mit allen Kursen und
+Verfügbarkeiten im Speicher aufzubauen, schreibt ``iter_calendar()`` die
+VEVENT-Blöcke direkt aus einem Cursor (``yield_per``, siehe
+``queries.course_rows()``). Zeilen werden nach RFC 5545 maskiert
+(TEXT-Werte) und bei 75 Oktetten gefaltet, ohne UTF-8-Zeichen zu
+zerschneiden.
+
+Der Inhalt hängt nur von Filtern und Datenversion ab; der Zeitstempel
+(DTSTAMP, ``Last-Modified``) ist der Zeitpunkt der letzten Änderung aus
+``change_counter`` (``cache.data_version_modified()``) und damit in allen
+Workern gleich. Kalender-Clients, die alle paar Minuten abfragen, bekommen so
+über ETag bzw. ``If-Modified-Since`` ein 304.
+"""
+from datetime import datetime, timedelta, timezone
+
+PRODID = '-//Lehrplan-Timeline-System//DE'
+UID_DOMAIN = 'lehrplan-timeline.de'
+
+
+def escape_text(value):
+    """Maskiert einen TEXT-Wert (RFC 5545, 3.3.11)"""
+    return str(value)\
+        .replace('\\', '\\\\')\
+        .replace(';', '\\;')\
+        .replace(',', '\\,')\
+        .replace('\r\n', '\\n')\
+        .replace('\n', '\\n')\
+        .replace('\r', '\\n')
+
+
+def fold_line(line):
+    """Faltet eine Inhaltszeile auf höchstens 75 Oktette pro Zeile (RFC 5545, 3.1)
+
+    Returns:
+    --------
+    bytes
+        Die UTF-8-kodierte Zeile inklusive abschließendem CRLF
+    """
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b'\r\n'
+
+    parts = []
+    start = 0
+    limit = 75
+    while len(data) - start > limit:
+        end = start + limit
+        # Nicht innerhalb einer UTF-8-Sequenz (Folgebytes 10xxxxxx) trennen
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start = end
+        limit = 74  # Folgezeilen beginnen mit einem Leerzeichen
+    parts.append(data[start:])
+    return b'\r\n '.join(parts) + b'\r\n'
+
+
+def _date(value):
+    return value.strftime('%Y%m%d')
+
+
+def _timestamp(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _course_event(row, dtstamp):
+    lecturer_name = row.lecturer_name or 'Nicht zugewiesen'
+    description = (
+        f'Kurs: {row.topic}\n'
+        f'Dozent: {lecturer_name}\n'
+        f'Zeitraum: {row.start_date.strftime("%d.%m.%Y")} bis {row.end_date.strftime("%d.%m.%Y")}\n'
+        f'Dauer: {(row.end_date - row.start_date).days + 1} Tage\n'
+    )
+    lines = [
+        'BEGIN:VEVENT',
+        f'SUMMARY:{escape_text(f"{row.topic} ({lecturer_name})")}',
+        f'DTSTART;VALUE=DATE:{_date(row.start_date)}',
+        # iCalendar end date ist exklusiv, daher +1 Tag
+        f'DTEND;VALUE=DATE:{_date(row.end_date + timedelta(days=1))}',
+        f'DTSTAMP:{dtstamp}',
+        f'UID:course-{row.id}@{UID_DOMAIN}',
+        f'DESCRIPTION:{escape_text(description)}',
+        'CATEGORIES:Kurs',
+    ]
+    # Farbe basierend auf Dozent (wird nicht von allen Kalendern unterstützt)
+    if row.lecturer_color:
+        lines.append(f'X-APPLE-CALENDAR-COLOR:{row.lecturer_color}')
+        lines.append('X-MICROSOFT-CDO-BUSYSTATUS:BUSY')
+    lines.append('END:VEVENT')
+    return b''.join(fold_line(line) for line in lines)
+
+
+def _availability_event(row, dtstamp):
+    lecturer_name = row.lecturer_name or 'Unbekannt'
+    if row.type == 'vacation':
+        title = f'{lecturer_name}: Urlaub'
+        categories = 'Urlaub'
+        transp = 'TRANSPARENT'  # Zeigt als "frei" an
+    else:
+        title = f'{lecturer_name}: Nicht verfügbar'
+        categories = 'Nicht verfügbar'
+        transp = 'OPAQUE'  # Zeigt als "beschäftigt" an
+    if row.note:
+        title += f' - {row.note}'
+
+    description = f'Typ: {categories}\nDozent: {lecturer_name}\n'
+    if row.note:
+        description += f'Notiz: {row.note}\n'
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'SUMMARY:{escape_text(title)}',
+        f'DTSTART;VALUE=DATE:{_date(row.start_date)}',
+        f'DTEND;VALUE=DATE:{_date(row.end_date + timedelta(days=1))}',
+        f'DTSTAMP:{dtstamp}',
+        f'UID:availability-{row.id}@{UID_DOMAIN}',
+        f'DESCRIPTION:{escape_text(description)}',
+        f'CATEGORIES:{escape_text(categories)}',
+        f'TRANSP:{transp}',
+        'END:VEVENT',
+    ]
+    return b''.join(fold_line(line) for line in lines)
+
+
+def iter_calendar(courses=(), availabilities=(), modified=None, name='Lehrplan-Kalender'):
+    """Erzeugt einen VCALENDAR als Folge von Byte-Blöcken
+
+    Parameters:
+    -----------
+    courses : iterable
+        Zeilen aus ``queries.course_rows()``
+    availabilities : iterable
+        Zeilen aus ``queries.availability_rows()``
+    modified : datetime
+        Stand der Daten, wird als DTSTAMP aller Ereignisse geschrieben
+    name : str
+        Anzeigename des Kalenders (X-WR-CALNAME)
+    """
+    dtstamp = _timestamp(modified or datetime.now(timezone.utc))
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+        'X-WR-TIMEZONE:Europe/Berlin',
+    ]
+    yield b''.join(fold_line(line) for line in header)
+
+    for row in courses:
+        yield _course_event(row, dtstamp)
+    for row in availabilities:
+        yield _availability_event(row, dtstamp)
+
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,335 @@
+"""Import von Lehrplänen aus CSV- und XLSX-Dateien
+
+Große Dateien werden nicht im Request-Thread verarbeitet: ``upload_file()``
+speichert die Datei, legt einen ``ImportJob`` an und übergibt ihn an einen
+Thread-Pool. Der Job liest die Datei in Blöcken (CSV per ``chunksize``, XLSX
+per openpyxl ``read_only``), validiert die Zeilen, schreibt jeden Block mit
+einem Bulk-Insert und hält Fortschritt und Fehler in der Tabelle
+``import_job`` fest, damit jeder Worker-Prozess den Status abfragen kann.
+
+Die Blöcke landen in ``staged_course``, das keine Ansicht liest; erst der
+letzte Schritt übernimmt alle Kurse per ``INSERT ... SELECT`` nach ``course``
+und führt Lehrpläne, Rollups und Änderungszähler in derselben Transaktion
+nach. Andere Anfragen sehen einen Import damit ganz oder gar nicht. Jobs,
+deren Prozess beendet wurde, markiert ``recover_import_jobs()`` beim Start
+als fehlgeschlagen und entfernt ihre vorbereiteten Kurse.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+import json
+import os
+import threading
+import traceback
+import uuid
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import literal, select
+
+from . import db
+from .models import Course, ImportJob, StagedCourse
+from .cache import mark_changed
+from .curricula import refresh_curricula
+from .rollups import refresh_rollups_for_curricula
+from .workers import worker_id, worker_alive
+
+REQUIRED_COLUMNS = ['Startdatum', 'Enddatum', 'Thema']
+DATE_FORMAT = '%d.%m.%Y'
+
+# Nur die ersten Fehler werden gespeichert, der Zähler läuft weiter
+MAX_STORED_ERRORS = 100
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def insert_curriculum_rows(topics, course_starts, course_ends, reference_start, start_dates, curriculum_ids,
+                           job_id=None):
+    """Schreibt Kurse für alle Kopien eines Lehrplans per Bulk-Insert (ohne Commit)
+
+    Die Verschiebungen werden als Array-Arithmetik (Kopien x Kurse) relativ zu
+    ``reference_start``, dem ersten Kurs des Originals, berechnet. Mit
+    ``job_id`` landen die Kurse in ``staged_course`` (siehe
+    ``publish_staged_courses()``). Bulk-Inserts lösen keine Flush-Events aus:
+    Lehrplan-Kennzahlen, Statistik und Änderungszähler führt der Aufrufer nach.
+    """
+    course_count = len(topics)
+    copy_count = len(start_dates)
+    if course_count == 0 or copy_count == 0:
+        return 0
+
+    offsets = (pd.to_datetime(pd.Series(start_dates)) - pd.Timestamp(reference_start)).to_numpy()
+    new_starts = course_starts.to_numpy()[np.newaxis, :] + offsets[:, np.newaxis]
+    new_ends = course_ends.to_numpy()[np.newaxis, :] + offsets[:, np.newaxis]
+
+    new_starts = pd.DatetimeIndex(new_starts.ravel()).to_pydatetime()
+    new_ends = pd.DatetimeIndex(new_ends.ravel()).to_pydatetime()
+    all_topics = np.tile(topics.to_numpy(), copy_count)
+    all_curriculum_ids = np.repeat(curriculum_ids, course_count)
+
+    extra = {'import_job_id': job_id} if job_id else {'active': True}
+    mappings = [
+        {
+            'topic': topic,
+            'start_date': start,
+            'end_date': end,
+            'curriculum_id': curriculum_id,
+            **extra
+        }
+        for topic, start, end, curriculum_id in zip(all_topics, new_starts, new_ends, all_curriculum_ids)
+    ]
+
+    db.session.bulk_insert_mappings(StagedCourse if job_id else Course, mappings)
+    return len(mappings)
+
+
+def publish_staged_courses(job_id, curriculum_ids):
+    """Übernimmt die vorbereiteten Kurse eines Imports nach ``course`` (ohne Commit)
+
+    Ein ``INSERT ... SELECT`` in Dateireihenfolge, danach Lehrpläne, Rollups
+    und Änderungszähler nachführen.
+    """
+    staged = StagedCourse.__table__
+    columns = ['topic', 'start_date', 'end_date', 'curriculum_id']
+    rows = select(*[staged.c[column] for column in columns], literal(True))\
+        .where(staged.c.import_job_id == job_id)\
+        .order_by(staged.c.id)
+    connection = db.session.connection()
+    connection.execute(Course.__table__.insert().from_select(columns + ['active'], rows))
+    discard_staged_courses(job_id)
+    refresh_curricula(db.session, curriculum_ids)
+    refresh_rollups_for_curricula(db.session, curriculum_ids)
+    mark_changed(db.session, tables=('course',), curriculum_ids=curriculum_ids)
+
+
+def discard_staged_courses(job_id):
+    """Entfernt die vorbereiteten Kurse eines Imports (ohne Commit)"""
+    staged = StagedCourse.__table__
+    db.session.connection().execute(staged.delete().where(staged.c.import_job_id == job_id))
+
+
+def _fail_job(job, message):
+    job.status = 'failed'
+    job.curriculum_ids = None
+    job.finished_at = datetime.utcnow()
+    _store_errors(job, [(None, message)])
+
+
+def recover_import_jobs():
+    """Beendet Jobs, deren Prozess nicht mehr läuft (z.B. nach einem Neustart)
+
+    Returns:
+    --------
+    int
+        Anzahl der als fehlgeschlagen markierten Jobs
+    """
+    pending = db.session.query(ImportJob)\
+        .filter(ImportJob.status.in_(('queued', 'running')))\
+        .all()
+    stale = [job for job in pending if not worker_alive(job.worker)]
+    for job in stale:
+        discard_staged_courses(job.id)
+        _fail_job(job, 'Import abgebrochen: der ausführende Prozess wurde beendet')
+    if stale:
+        db.session.commit()
+    return len(stale)
+
+
+def _file_extension(path):
+    return path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+
+
+def _xlsx_cell(value):
+    """Datumszellen aus Excel in das CSV-Format bringen"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def _iter_xlsx_chunks(path, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else '' for c in header]
+
+        buffer = []
+        offset = 0
+        for row in rows:
+            if row is None or all(cell is None for cell in row):
+                continue
+            buffer.append([_xlsx_cell(cell) for cell in row])
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=columns, index=range(offset, offset + len(buffer)))
+                offset += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=range(offset, offset + len(buffer)))
+    finally:
+        workbook.close()
+
+
+def iter_curriculum_chunks(path, chunksize=1000):
+    """Liefert die Datei blockweise als DataFrames (Index = Datenzeile ab 0)"""
+    if _file_extension(path) == 'xlsx':
+        yield from _iter_xlsx_chunks(path, chunksize)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=str, skip_blank_lines=True)
+
+
+def validate_chunk(chunk):
+    """Prüft einen Block und trennt gültige von ungültigen Zeilen
+
+    Returns:
+    --------
+    tuple
+        ``(topics, course_starts, course_ends, errors)`` für die gültigen Zeilen;
+        ``errors`` ist eine Liste von ``(zeilennummer, meldung)``.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Datei muss die Spalten {', '.join(REQUIRED_COLUMNS)} enthalten")
+
+    topics = chunk['Thema'].astype('string').str.strip()
+    course_starts = pd.to_datetime(chunk['Startdatum'].astype('string').str.strip(), format=DATE_FORMAT, errors='coerce')
+    course_ends = pd.to_datetime(chunk['Enddatum'].astype('string').str.strip(), format=DATE_FORMAT, errors='coerce')
+
+    missing_topic = topics.isna() | (topics == '')
+    bad_start = course_starts.isna()
+    bad_end = course_ends.isna()
+    reversed_dates = ~bad_start & ~bad_end & (course_ends < course_starts)
+    invalid = missing_topic | bad_start | bad_end | reversed_dates
+
+    errors = []
+    for row_index in chunk.index[invalid]:
+        # +2: Kopfzeile und 1-basierte Zählung wie in Excel
+        line = int(row_index) + 2
+        if missing_topic[row_index]:
+            errors.append((line, 'Thema fehlt'))
+        elif bad_start[row_index]:
+            errors.append((line, f"Ungültiges Startdatum: {chunk.at[row_index, 'Startdatum']}"))
+        elif bad_end[row_index]:
+            errors.append((line, f"Ungültiges Enddatum: {chunk.at[row_index, 'Enddatum']}"))
+        else:
+            errors.append((line, 'Enddatum liegt vor dem Startdatum'))
+
+    valid = ~invalid
+    return (topics[valid].astype(str), course_starts[valid], course_ends[valid], errors)
+
+
+def scan_curriculum_bounds(path, chunksize=1000):
+    """Erster Durchlauf: Zeilenzahl, Start des ersten und Ende des letzten gültigen Kurses
+
+    Wird für die Verschiebung und den Abstand der Wiederholungen gebraucht,
+    ohne die ganze Datei im Speicher zu halten.
+    """
+    rows_total = 0
+    first_start = None
+    last_end = None
+    for chunk in iter_curriculum_chunks(path, chunksize):
+        rows_total += len(chunk)
+        _, course_starts, course_ends, _ = validate_chunk(chunk)
+        if len(course_starts) == 0:
+            continue
+        if first_start is None:
+            first_start = course_starts.iloc[0]
+        last_end = course_ends.iloc[-1]
+    return rows_total, first_start, last_end
+
+
+def _store_errors(job, new_errors):
+    if not new_errors:
+        return
+    stored = json.loads(job.errors) if job.errors else []
+    room = MAX_STORED_ERRORS - len(stored)
+    if room > 0:
+        stored.extend(f'Zeile {line}: {message}' if line else message
+                      for line, message in new_errors[:room])
+        job.errors = json.dumps(stored, ensure_ascii=False)
+    job.rows_failed += len(new_errors)
+
+
+def run_import_job(app, job_id, path, start_date, duplicate_count):
+    """Führt einen Import aus (läuft im Thread-Pool mit eigenem App-Kontext)"""
+    with app.app_context():
+        chunksize = app.config.get('IMPORT_CHUNK_SIZE', 1000)
+        job = db.session.query(ImportJob).get(job_id)
+        try:
+            job.status = 'running'
+            db.session.commit()
+
+            rows_total, first_start, last_end = scan_curriculum_bounds(path, chunksize)
+            job.rows_total = rows_total
+            if first_start is None:
+                raise ValueError('Die Datei enthält keine gültigen Kurse')
+
+            # Abstand der Wiederholungen wie beim bisherigen Upload
+            duration = (last_end - first_start).days
+            start_dates = [start_date + pd.Timedelta(days=(duration + 1) * i) for i in range(duplicate_count + 1)]
+            curriculum_ids = [str(uuid.uuid4()) for _ in start_dates]
+            job.curriculum_ids = json.dumps(curriculum_ids)
+            db.session.commit()
+
+            for chunk in iter_curriculum_chunks(path, chunksize):
+                topics, course_starts, course_ends, errors = validate_chunk(chunk)
+                insert_curriculum_rows(topics, course_starts, course_ends,
+                                       first_start, start_dates, curriculum_ids, job_id=job_id)
+                job.rows_processed += len(chunk)
+                _store_errors(job, errors)
+                # Vorbereitete Kurse und Fortschritt eines Blocks landen in einer Transaktion
+                db.session.commit()
+
+            # Erst nach dem letzten Block übernehmen und auswerten
+            publish_staged_courses(job_id, curriculum_ids)
+            job.status = 'done'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            if isinstance(e, ValueError):
+                app.logger.warning(f"Import {job_id} abgelehnt: {str(e)}")
+            else:
+                app.logger.error(f"Import {job_id} fehlgeschlagen: {str(e)}\n{traceback.format_exc()}")
+            # Bereits geschriebene Blöcke wieder entfernen
+            discard_staged_courses(job_id)
+            job = db.session.query(ImportJob).get(job_id)
+            _fail_job(job, str(e))
+            db.session.commit()
+
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('IMPORT_WORKERS', 2),
+                thread_name_prefix='curriculum-import'
+            )
+        return _executor
+
+
+def start_import_job(app, path, filename, start_date, duplicate_count):
+    """Legt einen ImportJob an und startet ihn im Hintergrund
+
+    Returns:
+    --------
+    str
+        Die Job-ID für den Status-Endpunkt
+    """
+    job = ImportJob(id=str(uuid.uuid4()), filename=filename, status='queued', worker=worker_id())
+    db.session.add(job)
+    db.session.commit()
+
+    _get_executor(app).submit(run_import_job, app, job.id, path, start_date, duplicate_count)
+    return job.id
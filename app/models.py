@@ -1,4 +1,5 @@
 from datetime import datetime
+import json
 from . import db  # Importiere db aus dem app-Paket
 
 class Lecturer(db.Model):
@@ -18,6 +19,25 @@ class Course(db.Model):
     curriculum_id = db.Column(db.String(36), nullable=False)  # Gruppierung zusammengehöriger Kurse
     active = db.Column(db.Boolean, default=False)  # Neu: Flag für Timeline-Sichtbarkeit
 
+    __table_args__ = (
+        # Konfliktprüfung und Buchungen pro Dozent (auch inaktive Kurse)
+        db.Index('ix_course_lecturer_dates', 'lecturer_id', 'start_date', 'end_date'),
+        # Dozentenfilter und iCal-Feeds pro Dozent (nur aktive Kurse); zwei
+        # Gleichheitsspalten, damit SQLite ihn ohne ANALYZE immer vor
+        # ix_course_lecturer_dates und ix_course_active_dates wählt
+        db.Index('ix_course_lecturer_active_dates', 'lecturer_id', 'active', 'start_date', 'end_date'),
+        # Timeline, Kalender und Exporte (nur aktive Kurse, nach Batch sortiert)
+        db.Index('ix_course_active_curriculum_start', 'active', 'curriculum_id', 'start_date'),
+        # Kurse eines Lehrplans (Duplizieren, Verwalten, Lehrplan-Cache)
+        db.Index('ix_course_curriculum_start', 'curriculum_id', 'start_date'),
+        # Zeitfenster ohne Dozentenfilter
+        db.Index('ix_course_dates', 'start_date', 'end_date'),
+        # Kalender-API: sichtbares Fenster über alle aktiven Kurse
+        db.Index('ix_course_active_dates', 'active', 'start_date', 'end_date'),
+        # Nachberechnung der Themen-Statistik (siehe rollups.py)
+        db.Index('ix_course_topic_active', 'topic', 'active', 'lecturer_id'),
+    )
+
 class Assignment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     lecturer_id = db.Column(db.Integer, db.ForeignKey('lecturer.id'), nullable=False)
@@ -52,4 +72,140 @@ class Availability(db.Model):
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
     type = db.Column(db.String(20))  # 'vacation' oder 'unavailable'
-    note = db.Column(db.String(200)) 
\ No newline at end of file
+    note = db.Column(db.String(200)) 
+
+    __table_args__ = (
+        db.Index('ix_availability_lecturer_dates', 'lecturer_id', 'start_date', 'end_date'),
+        db.Index('ix_availability_dates', 'start_date', 'end_date'),
+    )
+
+class Curriculum(db.Model):
+    """Ein Lehrplan (Batch) mit aus den Kursen abgeleiteten Kennzahlen
+
+    Die ``id`` entspricht ``Course.curriculum_id``. Start, Ende, Kursanzahl und
+    Aktiv-Flag werden bei jedem Schreiben von Kursen für die betroffenen
+    Lehrpläne nachgeführt (siehe ``curricula.py``), der Name wird gepflegt.
+    """
+    id = db.Column(db.String(36), primary_key=True)
+    name = db.Column(db.String(200), nullable=True)
+    start_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime, nullable=False)
+    course_count = db.Column(db.Integer, nullable=False, default=0)
+    active = db.Column(db.Boolean, nullable=False, default=False)  # mind. ein Kurs in der Timeline
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_curriculum_start', 'start_date'),
+        db.Index('ix_curriculum_active_start', 'active', 'start_date'),
+    )
+
+    @property
+    def curriculum_id(self):
+        return self.id
+
+class LecturerMonthRollup(db.Model):
+    """Gebuchte Kurse und Abwesenheiten pro Dozent und Startmonat
+
+    ``lecturer_id`` 0 steht für Kurse ohne Dozent. Gezählt werden nur aktive
+    Kurse; gepflegt in ``rollups.py``.
+    """
+    lecturer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM' des Startdatums
+    course_count = db.Column(db.Integer, nullable=False, default=0)
+    booked_days = db.Column(db.Float, nullable=False, default=0)  # Summe end - start (julianday)
+    course_days = db.Column(db.Integer, nullable=False, default=0)  # Summe (end - start).days + 1
+    availability_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CourseMonthRollup(db.Model):
+    """Aktive Kurse pro Startmonat, Wochentag und Dauer-Bucket (siehe statistics.py)"""
+    month = db.Column(db.String(7), primary_key=True)
+    weekday = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 = Sonntag
+    duration_bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    course_count = db.Column(db.Integer, nullable=False, default=0)
+    total_days = db.Column(db.Integer, nullable=False, default=0)  # Summe der Dauer, mind. 1 Tag
+
+class TopicRollup(db.Model):
+    """Aktive Kurse pro Thema und Dozent (``lecturer_id`` 0 = ohne Dozent)"""
+    topic = db.Column(db.String(200), primary_key=True)
+    lecturer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    course_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ChangeCounter(db.Model):
+    """Änderungszähler pro Tabelle bzw. Lehrplan (z.B. 'course', 'curriculum:<uuid>')
+
+    Wird im selben Commit wie die Änderung erhöht und ist damit für alle
+    Worker-Prozesse sichtbar; Caches versionieren ihre Einträge darüber.
+    """
+    name = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Zeitpunkt der letzten Erhöhung (UTC), z.B. für DTSTAMP/Last-Modified
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+class ImportJob(db.Model):
+    """Fortschritt eines im Hintergrund laufenden Lehrplan-Imports"""
+    id = db.Column(db.String(36), primary_key=True)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    rows_total = db.Column(db.Integer)  # bekannt nach dem ersten Durchlauf
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)          # JSON-Liste der ersten Fehlermeldungen
+    curriculum_ids = db.Column(db.Text)  # JSON-Liste der angelegten Lehrpläne
+    worker = db.Column(db.String(50))    # ausführender Prozess (siehe workers.py)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'rows_total': self.rows_total,
+            'rows_processed': self.rows_processed,
+            'rows_failed': self.rows_failed,
+            'errors': json.loads(self.errors) if self.errors else [],
+            'curriculum_ids': json.loads(self.curriculum_ids) if self.curriculum_ids else [],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class StagedCourse(db.Model):
+    """Kurs eines laufenden Imports, bis der letzte Schritt ihn nach ``course`` übernimmt
+
+    Liegt in einer eigenen Tabelle, damit keine Kursliste halb importierte
+    Lehrpläne zeigt.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    import_job_id = db.Column(db.String(36), db.ForeignKey('import_job.id'), nullable=False, index=True)
+    topic = db.Column(db.String(200), nullable=False)
+    start_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime, nullable=False)
+    curriculum_id = db.Column(db.String(36), nullable=False)
+
+class ReportJob(db.Model):
+    """Ein im Hintergrund erzeugter PDF-Bericht und sein Ablageort"""
+    id = db.Column(db.String(36), primary_key=True)
+    engine = db.Column(db.String(20), nullable=False, default='direct')  # direct (ReportLab) oder wkhtmltopdf
+    options = db.Column(db.Text)  # JSON der Formularwerte (siehe reports.REPORT_FIELDS)
+    cache_key = db.Column(db.String(64), index=True)  # gleiche Optionen + Datenversion = gleiche Datei
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    filename = db.Column(db.String(255))  # Dateiname für den Download
+    file_path = db.Column(db.String(500))
+    file_size = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(50))  # ausführender Prozess (siehe workers.py)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'engine': self.engine,
+            'options': json.loads(self.options) if self.options else {},
+            'status': self.status,
+            'filename': self.filename,
+            'file_size': self.file_size,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
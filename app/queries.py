@@ -0,0 +1,125 @@
+"""Gemeinsame Abfragen mit festgelegten Ladestrategien
+
+Views, die pro Kurs oder Abwesenheit auf ``lecturer`` zugreifen, holen ihre
+Daten hier. Die Dozenten werden per ``joinedload`` (many-to-one, ein JOIN in
+derselben Abfrage) mitgeladen, damit die Zahl der Abfragen nicht mit der Zahl
+der Kurse wächst. Die Budgets pro View prüft ``querycount.py``.
+
+Für Feeds und APIs, die nur einzelne Spalten brauchen, liefern
+``course_rows()`` und ``availability_rows()`` schlanke Zeilen ohne
+ORM-Objekte, blockweise per ``yield_per`` gelesen.
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from . import db
+from .models import Course, Lecturer, Availability
+
+# Zeilen pro Fetch bei ``yield_per``
+FETCH_SIZE = 500
+
+
+def courses_with_lecturer():
+    """Kurse inkl. Dozent (ein JOIN statt einer Abfrage pro Kurs)"""
+    return db.session.query(Course).options(joinedload(Course.lecturer))
+
+
+def _filter_courses(query, filter_options):
+    """Aktive Kurse nach ``filter_options`` (siehe ``active_courses()``)"""
+    filter_options = filter_options or {}
+    query = query.filter(Course.active == True)
+
+    if filter_options.get('lecturer_id'):
+        query = query.filter(Course.lecturer_id == filter_options['lecturer_id'])
+
+    if filter_options.get('curriculum_id'):
+        query = query.filter(Course.curriculum_id == filter_options['curriculum_id'])
+
+    if filter_options.get('date_range'):
+        start_date, end_date = filter_options['date_range']
+        query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
+
+    return query
+
+
+def active_courses(filter_options=None, within=None):
+    """Aktive Kurse nach Batch und Startdatum, optional gefiltert
+
+    Parameters:
+    -----------
+    filter_options : dict, optional
+        Filteroptionen wie in ``create_timeline_figure()``, z.B.
+        {'lecturer_id': 1, 'curriculum_id': '...', 'date_range': [start, end]}
+    within : tuple, optional
+        Nur Kurse, die den Bereich ``[start, ende)`` überschneiden
+        (z.B. der geladene Bereich der Timeline)
+    """
+    query = _filter_courses(courses_with_lecturer(), filter_options)
+    if within:
+        query = query.filter(Course.end_date >= within[0], Course.start_date < within[1])
+    return query.order_by(Course.curriculum_id, Course.start_date)
+
+
+def active_course_extents(filter_options=None):
+    """Erster Start und letztes Ende der aktiven Kurse pro Lehrplan
+
+    Eine Zeile pro Lehrplan statt aller Kurse, gefiltert wie ``active_courses()``.
+
+    Returns:
+    --------
+    dict
+        ``{curriculum_id: (erster_start, letztes_ende)}``
+    """
+    query = db.session.query(Course.curriculum_id, func.min(Course.start_date), func.max(Course.end_date))
+    query = _filter_courses(query, filter_options).group_by(Course.curriculum_id)
+    return {curriculum_id: (start, end) for curriculum_id, start, end in query}
+
+
+def availabilities_with_lecturer():
+    """Abwesenheiten inkl. Dozent"""
+    return db.session.query(Availability).options(joinedload(Availability.lecturer))
+
+
+def availabilities_in_range(lecturer_ids=None, start_date=None, end_date=None):
+    """Abwesenheiten nach Startdatum, optional auf Dozenten und Zeitraum beschränkt"""
+    query = availabilities_with_lecturer()
+    if lecturer_ids is not None:
+        query = query.filter(Availability.lecturer_id.in_(lecturer_ids))
+    if start_date is not None and end_date is not None:
+        query = query.filter(Availability.end_date >= start_date, Availability.start_date <= end_date)
+    return query.order_by(Availability.start_date)
+
+
+def course_rows(lecturer_id=None, curriculum_id=None, start_date=None, end_date=None):
+    """Aktive Kurse als schlanke Zeilen inkl. Dozentenname und -farbe, nach Startdatum"""
+    query = db.session.query(
+            Course.id, Course.topic, Course.start_date, Course.end_date, Course.lecturer_id,
+            Lecturer.name.label('lecturer_name'), Lecturer.color.label('lecturer_color'))\
+        .outerjoin(Lecturer, Course.lecturer_id == Lecturer.id)\
+        .filter(Course.active == True)
+    if lecturer_id:
+        query = query.filter(Course.lecturer_id == lecturer_id)
+    if curriculum_id:
+        query = query.filter(Course.curriculum_id == curriculum_id)
+    if start_date and end_date:
+        query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
+    return query.order_by(Course.start_date, Course.id).yield_per(FETCH_SIZE)
+
+
+def availability_rows(lecturer_id=None, start_date=None, end_date=None, lecturer_ids=None):
+    """Abwesenheiten als schlanke Zeilen inkl. Dozentenname, nach Startdatum
+
+    ``lecturer_ids`` beschränkt auf mehrere Dozenten (z.B. die der sichtbaren Kurse).
+    """
+    query = db.session.query(
+            Availability.id, Availability.start_date, Availability.end_date,
+            Availability.type, Availability.note, Availability.lecturer_id,
+            Lecturer.name.label('lecturer_name'))\
+        .outerjoin(Lecturer, Availability.lecturer_id == Lecturer.id)
+    if lecturer_id:
+        query = query.filter(Availability.lecturer_id == lecturer_id)
+    if lecturer_ids is not None:
+        query = query.filter(Availability.lecturer_id.in_(lecturer_ids))
+    if start_date and end_date:
+        query = query.filter(Availability.end_date >= start_date, Availability.start_date <= end_date)
+    return query.order_by(Availability.start_date, Availability.id).yield_per(FETCH_SIZE)
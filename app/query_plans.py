@@ -0,0 +1,120 @@
+"""Prüfung der SQLite-Abfragepläne für die häufigsten Abfragen
+
+Baut die Abfragen von Timeline, Zuweisung, Kalender-API und iCal-Export so nach,
+wie die Views sie stellen, und prüft per ``EXPLAIN QUERY PLAN``, dass SQLite
+dafür den erwarteten Index verwendet statt die Tabelle komplett zu lesen.
+Aufruf über ``flask check-query-plans``.
+"""
+from datetime import datetime, timedelta
+
+from . import db
+from .models import Course, Availability, Curriculum
+from .queries import course_rows, availability_rows
+
+
+def _hot_queries():
+    """Liefert ``(name, query, erwarteter_index)`` für jede geprüfte Abfrage
+
+    ``erwarteter_index`` ist ein Indexname oder ein Tupel gleichwertiger Indizes.
+    """
+    window_start = datetime(2024, 1, 1)
+    window_end = window_start + timedelta(days=90)
+    return [
+        ('timeline: aktive Kurse nach Batch',
+         db.session.query(Course)
+            .filter(Course.active == True)
+            .order_by(Course.curriculum_id, Course.start_date),
+         'ix_course_active_curriculum_start'),
+        ('timeline: Lehrplan-Filter',
+         db.session.query(Course)
+            .filter(Course.active == True)
+            .filter(Course.curriculum_id == 'x')
+            .order_by(Course.curriculum_id, Course.start_date),
+         'ix_course_active_curriculum_start'),
+        ('timeline: Dozent und Zeitraum',
+         db.session.query(Course)
+            .filter(Course.active == True)
+            .filter(Course.lecturer_id == 1)
+            .filter(Course.end_date >= window_start, Course.start_date <= window_end),
+         'ix_course_lecturer_active_dates'),
+        # Nur lecturer_id eingeschränkt: beide Dozenten-Indizes sind gleichwertig
+        ('assign: Buchungen der beteiligten Dozenten',
+         db.session.query(Course).filter(Course.lecturer_id.in_([1, 2, 3])),
+         ('ix_course_lecturer_dates', 'ix_course_lecturer_active_dates')),
+        ('assign: Kurse nach Startdatum',
+         db.session.query(Course).order_by(Course.start_date),
+         'ix_course_dates'),
+        ('lehrplan: Kurse eines Lehrplans',
+         db.session.query(Course)
+            .filter(Course.curriculum_id == 'x')
+            .order_by(Course.start_date),
+         'ix_course_curriculum_start'),
+        ('lehrplan: Batch-Liste',
+         db.session.query(Curriculum).order_by(Curriculum.start_date),
+         'ix_curriculum_start'),
+        ('timeline: aktive Batches',
+         db.session.query(Curriculum)
+            .filter(Curriculum.active == True)
+            .order_by(Curriculum.start_date),
+         'ix_curriculum_active_start'),
+        ('kalender: Kurse im sichtbaren Fenster',
+         course_rows(start_date=window_start, end_date=window_end),
+         'ix_course_active_dates'),
+        ('kalender: Abwesenheiten im sichtbaren Fenster',
+         availability_rows(start_date=window_start, end_date=window_end),
+         'ix_availability_dates'),
+        ('ical: Kurse eines Dozenten im Zeitraum',
+         db.session.query(Course)
+            .filter(Course.active == True)
+            .filter(Course.lecturer_id == 1)
+            .filter(Course.end_date >= window_start, Course.start_date <= window_end),
+         'ix_course_lecturer_active_dates'),
+        ('ical: Abwesenheiten eines Dozenten im Zeitraum',
+         db.session.query(Availability)
+            .filter(Availability.lecturer_id == 1)
+            .filter(Availability.end_date >= window_start, Availability.start_date <= window_end),
+         'ix_availability_lecturer_dates'),
+        ('export: Abwesenheiten der Dozenten im Zeitraum',
+         db.session.query(Availability)
+            .filter(Availability.lecturer_id.in_([1, 2, 3]))
+            .filter(Availability.end_date >= window_start, Availability.start_date <= window_end)
+            .order_by(Availability.start_date),
+         'ix_availability_lecturer_dates'),
+        ('statistik: Themen-Rollup nachberechnen',
+         db.session.query(Course.topic, Course.lecturer_id)
+            .filter(Course.active == True)
+            .filter(Course.topic.in_(['Python', 'SQL'])),
+         'ix_course_topic_active'),
+    ]
+
+
+def explain(query):
+    """Führt ``EXPLAIN QUERY PLAN`` für eine ORM-Abfrage aus und liefert die Plan-Zeilen"""
+    compiled = query.statement.compile(dialect=db.engine.dialect,
+                                      compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    values = tuple(params[name] for name in compiled.positiontup)
+    connection = db.session.connection()
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), values).fetchall()
+    return [row[-1] for row in rows]
+
+
+def check_query_plans():
+    """Prüft alle heißen Abfragen
+
+    Returns:
+    --------
+    list
+        Pro Abfrage ein Dict mit ``name``, ``index``, ``plan`` und ``ok``
+    """
+    results = []
+    for name, query, index in _hot_queries():
+        plan = explain(query)
+        names = index if isinstance(index, tuple) else (index,)
+        results.append({
+            'name': name,
+            'index': ' oder '.join(names),
+            'plan': plan,
+            'ok': any(f"INDEX {index_name} " in f"{step} " for step in plan for index_name in names)
+        })
+    return results
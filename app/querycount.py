@@ -0,0 +1,48 @@
+"""Zählt SQL-Statements pro Request und prüft sie gegen ein Budget
+
+Im Testmodus (``app.testing`` oder ``QUERY_BUDGET_CHECK``) wird jedes an die
+Datenbank geschickte Statement gezählt. Überschreitet ein View sein Budget aus
+``QUERY_BUDGETS``, schlägt der Request mit einem ``AssertionError`` fehl, so
+dass neu eingeschleppte N+1-Abfragen im Test auffallen. Außerhalb des
+Testmodus ist nur der Zähler aktiv und kostet einen Aufruf pro Statement.
+"""
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Ein View hat mehr SQL-Statements abgesetzt als erlaubt"""
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+
+
+def statement_count():
+    """Anzahl der bisher im aktuellen Request abgesetzten Statements"""
+    return g.get('sql_statements', 0)
+
+
+def init_query_budget(app):
+    """Registriert Zähler und Budgetprüfung für eine App"""
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+
+    enabled = app.testing or app.config.get('QUERY_BUDGET_CHECK', False)
+    if not enabled:
+        return
+
+    budgets = app.config.get('QUERY_BUDGETS', {})
+
+    @app.after_request
+    def check_query_budget(response):
+        count = statement_count()
+        response.headers['X-SQL-Statements'] = str(count)
+        budget = budgets.get(request.endpoint)
+        if budget is not None and count > budget:
+            raise QueryBudgetExceeded(
+                f'{request.endpoint}: {count} SQL-Statements, Budget ist {budget}'
+            )
+        return response
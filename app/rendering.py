@@ -0,0 +1,230 @@
+"""PNG-Rendering von Plotly-Figuren außerhalb des Request-Threads
+
+Kaleido wird nicht mehr pro Export im Gunicorn-Worker gestartet. Ein Pool
+aus ``RENDER_WORKERS`` Prozessen hält Kaleido warm und arbeitet die Aufträge
+aus der Queue des Executors ab; der Request wartet nur auf das Ergebnis.
+
+Die Bilder werden inhaltsadressiert abgelegt: der Schlüssel ist ein SHA-256
+über das Figure-JSON und die Bildoptionen. Gleiche Timelines werden so nie
+zweimal gerastert, auch nicht über Worker-Prozesse hinweg (Dateicache in
+``RENDER_CACHE_DIR``), und gleichzeitige Anfragen teilen sich einen Auftrag.
+Da die Heute-Linie jeden Tag neue Schlüssel erzeugt, behält der Dateicache
+höchstens ``RENDER_CACHE_MAX_FILES`` Bilder; die am längsten nicht genutzten
+(ältestes mtime) werden nach jedem neuen Bild gelöscht.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import tempfile
+import threading
+
+from flask import current_app
+
+from .cache import LRUCache
+
+# Zuletzt gerenderte Bilder im Speicher, Schlüssel: Inhalts-Hash
+png_cache = LRUCache(maxsize=16)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Laufende Aufträge pro Inhalts-Hash, damit gleichzeitige Anfragen teilen
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _start_kaleido_server():
+    """Startet den Sync-Server von Kaleido 1.x für die Lebensdauer des Prozesses
+
+    Ohne ihn startet ``to_image`` bei Kaleido 1.x für jedes Bild einen neuen
+    Chrome. Kaleido 0.2 hat keinen Server und hält seinen Prozess selbst offen.
+    """
+    import kaleido
+    if not hasattr(kaleido, 'start_sync_server'):
+        return
+    # Ohne Chrome stirbt der Server-Thread sofort und jeder Auftrag wartete
+    # ewig auf seine Antwort; der Konstruktor sucht Chrome, ohne ihn zu starten
+    # (ChromeNotFoundError), ``to_image`` meldet den Fehler dann pro Auftrag
+    kaleido.Kaleido()
+    kaleido.start_sync_server(silence_warnings=True)
+    # Pool-Prozesse führen keine atexit-Handler aus, wohl aber die
+    # Finalizer von multiprocessing
+    multiprocessing.util.Finalize(None, kaleido.stop_sync_server,
+                                  kwargs={'silence_warnings': True}, exitpriority=10)
+
+
+def _warm_up():
+    """Initialisierung der Pool-Prozesse: Plotly laden, Kaleido starten und einmal rendern"""
+    try:
+        _start_kaleido_server()
+        import plotly.graph_objects as go
+        go.Figure().to_image(format='png', width=10, height=10)
+    except Exception:
+        # Fehler zeigen sich beim ersten echten Auftrag mit Meldung
+        pass
+
+
+def _render(figure_json, options):
+    """Läuft im Pool-Prozess: Figur aus JSON aufbauen und rastern"""
+    import plotly.io as pio
+    return pio.from_json(figure_json).to_image(**options)
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn' statt fork: der Gunicorn-Worker hat bereits Threads
+            # und offene Datenbankverbindungen
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config.get('RENDER_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warm_up
+            )
+        return _executor
+
+
+def figure_key(figure_json, options):
+    """Inhalts-Hash aus Figure-JSON und Bildoptionen"""
+    digest = hashlib.sha256(figure_json.encode('utf-8'))
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _cache_path(app, key):
+    cache_dir = app.config.get('RENDER_CACHE_DIR')
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, key[:2], key + '.png')
+
+
+def _read_file(path):
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            png = f.read()
+        # Treffer zählen als Nutzung, damit das Aufräumen sie zuletzt löscht
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return png
+    return None
+
+
+def _write_file(path, png):
+    """Atomar schreiben, damit andere Worker nie ein halbes Bild lesen"""
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(png)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def prune_render_cache(app):
+    """Löscht die ältesten Bilder, bis höchstens ``RENDER_CACHE_MAX_FILES`` übrig sind"""
+    cache_dir = app.config.get('RENDER_CACHE_DIR')
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if not name.endswith('.png'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                pass
+
+    excess = len(entries) - app.config.get('RENDER_CACHE_MAX_FILES', 200)
+    if excess <= 0:
+        return 0
+    entries.sort()
+    removed = 0
+    for _, path in entries[:excess]:
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _render_uncached(app, figure_json, options):
+    if app.config.get('RENDER_WORKERS', 2) <= 0:
+        # Ohne Pool (z.B. in Tests) direkt im aktuellen Prozess
+        return _render(figure_json, options)
+    future = _get_executor(app).submit(_render, figure_json, options)
+    return future.result(timeout=app.config.get('RENDER_TIMEOUT', 60))
+
+
+def render_png(fig, **options):
+    """Liefert das PNG einer Plotly-Figur, aus dem Cache oder vom Render-Pool
+
+    Parameters:
+    -----------
+    fig : plotly.graph_objects.Figure
+        Die zu rasternde Figur
+    **options
+        Optionen für ``to_image``, z.B. ``format='png', width=1000, height=500``
+
+    Raises:
+    -------
+    concurrent.futures.TimeoutError
+        Wenn der Pool nicht innerhalb von ``RENDER_TIMEOUT`` Sekunden liefert
+    """
+    app = current_app._get_current_object()
+    figure_json = fig.to_json()
+    key = figure_key(figure_json, options)
+
+    png = png_cache.get(key)
+    if png is not None:
+        return png
+
+    path = _cache_path(app, key)
+    png = _read_file(path)
+    if png is not None:
+        png_cache.set(key, png)
+        return png
+
+    # Läuft derselbe Auftrag schon, auf dessen Ergebnis warten
+    with _pending_lock:
+        waiter = _pending.get(key)
+        owner = waiter is None
+        if owner:
+            waiter = _pending[key] = {'event': threading.Event(), 'png': None, 'error': None}
+
+    if not owner:
+        waiter['event'].wait(app.config.get('RENDER_TIMEOUT', 60))
+        if waiter['error'] is not None:
+            raise waiter['error']
+        if waiter['png'] is None:
+            raise TimeoutError('Timeline-Bild wurde nicht rechtzeitig gerendert')
+        return waiter['png']
+
+    try:
+        png = _render_uncached(app, figure_json, options)
+        waiter['png'] = png
+        png_cache.set(key, png)
+        if path:
+            _write_file(path, png)
+            prune_render_cache(app)
+        return png
+    except Exception as e:
+        waiter['error'] = e
+        raise
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+        waiter['event'].set()
@@ -0,0 +1,195 @@
+"""PDF-Berichte als Hintergrund-Jobs
+
+Der Export-Request legt nur einen ``ReportJob`` an und antwortet sofort mit
+der Job-ID. Ein Thread-Pool baut die Berichtsdaten (``get_report_data()``),
+erzeugt das PDF mit ReportLab oder wkhtmltopdf und schreibt es nach
+``REPORT_OUTPUT_DIR``. Status und Ablageort stehen in der Tabelle
+``report_job``, damit jeder Worker-Prozess den Status beantworten und die
+fertige Datei ausliefern kann.
+
+Gleiche Optionen bei unveränderten Daten ergeben dieselbe Datei: solange ein
+passender Job läuft oder fertig ist, wird er wiederverwendet. Jobs, deren
+Prozess beendet wurde, markiert ``recover_report_jobs()`` beim Start als
+fehlgeschlagen, damit weder die Statusseite noch gleiche Aufträge ewig warten.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import traceback
+import uuid
+
+from . import db
+from .models import ReportJob
+from .cache import data_version
+from .reports import parse_report_values, get_report_data, write_direct_pdf, write_wkhtmltopdf_pdf
+from .workers import worker_id, worker_alive
+
+ENGINES = ('direct', 'wkhtmltopdf')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def report_cache_key(values, engine):
+    """Schlüssel aus Optionen, Engine, Datenversion und Datum (Heute-Linie im Bild)"""
+    digest = hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8'))
+    digest.update(f'|{engine}|{data_version()}|{datetime.now().date()}'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _write_pdf(data, options, engine, path):
+    """Schreibt das PDF atomar, damit ein Download nie eine halbe Datei liefert"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        if engine == 'wkhtmltopdf':
+            os.close(fd)
+            write_wkhtmltopdf_pdf(data, options, temp_path)
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                write_direct_pdf(data, options, f)
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def run_report_job(app, job_id):
+    """Erzeugt einen Bericht (läuft im Thread-Pool mit eigenem App-Kontext)"""
+    with app.app_context():
+        job = db.session.query(ReportJob).get(job_id)
+        try:
+            job.status = 'running'
+            db.session.commit()
+
+            options = parse_report_values(json.loads(job.options or '{}'))
+            data = get_report_data(options.filter_options)
+            if not data.courses:
+                raise ValueError('Keine Kurse gefunden, die den Filterkriterien entsprechen.')
+
+            path = os.path.join(app.config['REPORT_OUTPUT_DIR'], f'{job.id}.pdf')
+            _write_pdf(data, options, job.engine, path)
+
+            job.status = 'done'
+            job.filename = data.filename_stem + '.pdf'
+            job.file_path = path
+            job.file_size = os.path.getsize(path)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            if isinstance(e, ValueError):
+                app.logger.warning(f"Bericht {job_id} abgelehnt: {str(e)}")
+            else:
+                app.logger.error(f"Bericht {job_id} fehlgeschlagen: {str(e)}\n{traceback.format_exc()}")
+            job = db.session.query(ReportJob).get(job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('REPORT_WORKERS', 2),
+                thread_name_prefix='report-export'
+            )
+        return _executor
+
+
+def prune_report_jobs(app):
+    """Entfernt Jobs und Dateien, die älter als ``REPORT_RETENTION_HOURS`` sind"""
+    cutoff = datetime.utcnow() - timedelta(hours=app.config.get('REPORT_RETENTION_HOURS', 24))
+    expired = db.session.query(ReportJob)\
+        .filter(ReportJob.created_at < cutoff)\
+        .filter(ReportJob.status.in_(('done', 'failed')))\
+        .all()
+    for job in expired:
+        if job.file_path:
+            try:
+                os.unlink(job.file_path)
+            except OSError:
+                pass
+        db.session.delete(job)
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+
+def recover_report_jobs():
+    """Beendet Jobs, deren Prozess nicht mehr läuft (z.B. nach einem Neustart)
+
+    Returns:
+    --------
+    int
+        Anzahl der als fehlgeschlagen markierten Jobs
+    """
+    pending = db.session.query(ReportJob)\
+        .filter(ReportJob.status.in_(('queued', 'running')))\
+        .all()
+    stale = [job for job in pending if not worker_alive(job.worker)]
+    for job in stale:
+        job.status = 'failed'
+        job.error = 'Bericht abgebrochen: der ausführende Prozess wurde beendet'
+        job.finished_at = datetime.utcnow()
+    if stale:
+        db.session.commit()
+    return len(stale)
+
+
+def start_report_job(app, values, engine='direct'):
+    """Legt einen ReportJob an und startet ihn im Hintergrund
+
+    Parameters:
+    -----------
+    values : dict
+        Formularwerte des Berichts (siehe ``reports.report_values()``)
+    engine : str
+        'direct' (ReportLab) oder 'wkhtmltopdf'
+
+    Returns:
+    --------
+    str
+        Die Job-ID für Status und Download; bei identischem Auftrag die des
+        laufenden oder fertigen Jobs
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'Unbekannte PDF-Engine: {engine}')
+
+    # Optionen vorab prüfen, damit ungültige Daten sofort gemeldet werden
+    parse_report_values(values)
+    prune_report_jobs(app)
+
+    cache_key = report_cache_key(values, engine)
+    existing = db.session.query(ReportJob)\
+        .filter(ReportJob.cache_key == cache_key)\
+        .filter(ReportJob.status.in_(('queued', 'running', 'done')))\
+        .order_by(ReportJob.created_at.desc())\
+        .first()
+    if existing and (existing.status != 'done' or os.path.exists(existing.file_path or '')):
+        return existing.id
+
+    job = ReportJob(
+        id=str(uuid.uuid4()),
+        engine=engine,
+        options=json.dumps(values, ensure_ascii=False),
+        cache_key=cache_key,
+        status='queued',
+        worker=worker_id()
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _get_executor(app).submit(run_report_job, app, job.id)
+    return job.id
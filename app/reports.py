@@ -0,0 +1,558 @@
+"""Gemeinsame Datengrundlage für alle Berichtsexporte
+
+``export_report`` (wkhtmltopdf), ``export_report_html``,
+``export_report_download`` und ``export_report_direct`` (ReportLab) rendern
+aus demselben ``ReportData``. Es enthält losgelöste, unveränderliche Kopien
+der Kurse, Batches, Statistiken und Abwesenheiten sowie das Timeline-Bild und
+wird pro Filter und Datenversion gecacht. Ein Wechsel des Formats oder der
+Checkboxen löst damit weder Datenbankabfragen noch Kaleido erneut aus.
+"""
+from collections import Counter, namedtuple
+from datetime import datetime
+import base64
+from io import BytesIO
+import os
+
+from flask import current_app
+
+from .models import Lecturer, LecturerMonthRollup
+from . import statistics
+from .cache import LRUCache, filter_cache_key, data_version, has_uncommitted_changes
+from .queries import active_courses, availabilities_in_range
+from .rendering import render_png
+from .timeline import create_timeline_figure
+
+ReportOptions = namedtuple('ReportOptions', [
+    'filter_options', 'report_type', 'include_statistics', 'include_availabilities'
+])
+ReportLecturer = namedtuple('ReportLecturer', ['id', 'name', 'color'])
+ReportCourse = namedtuple('ReportCourse', [
+    'id', 'topic', 'start_date', 'end_date', 'duration_days', 'lecturer_id', 'lecturer', 'curriculum_id'
+])
+
+
+class ReportAvailability(namedtuple('ReportAvailability', [
+        'id', 'lecturer_id', 'lecturer', 'start_date', 'end_date', 'type', 'note'])):
+    __slots__ = ()
+
+    @property
+    def lecturer_name(self):
+        """Wie die Zeilen aus ``availability_rows()`` (für die Timeline)"""
+        return self.lecturer.name if self.lecturer else None
+
+
+ReportBatch = namedtuple('ReportBatch', ['curriculum_id', 'name', 'start_date', 'courses'])
+LecturerStat = namedtuple('LecturerStat', ['name', 'color', 'course_count', 'total_days'])
+TopicStat = namedtuple('TopicStat', ['topic', 'count'])
+ReportStatistics = namedtuple('ReportStatistics', [
+    'course_count', 'total_days', 'avg_duration', 'top_lecturers', 'top_topics'
+])
+ReportData = namedtuple('ReportData', [
+    'courses', 'batches', 'statistics', 'availabilities',
+    'timeline_png', 'timeline_image', 'filename_stem'
+])
+
+# Berichtsdaten, Schlüssel: (Filter, Datenversion, Tag)
+report_cache = LRUCache(maxsize=8)
+
+# Formularfelder, die einen Bericht beschreiben
+REPORT_FIELDS = (
+    'lecturer_id', 'curriculum_id', 'start_date', 'end_date',
+    'report_type', 'include_statistics', 'include_availabilities'
+)
+
+# Timeline-Bild für alle Berichtsformate
+TIMELINE_IMAGE_OPTIONS = {'format': 'png', 'width': 1000, 'height': 500, 'scale': 1.5}
+
+
+def _flag(value):
+    return value in ('on', 'true', '1')
+
+
+def report_values(req):
+    """Rohwerte der Berichtsoptionen aus Formular (POST) oder Query-String (GET)"""
+    values = req.form if req.method == 'POST' else req.args
+    return {key: values.get(key) for key in REPORT_FIELDS if values.get(key)}
+
+
+def parse_report_options(req):
+    """Liest Filter und Berichtsoptionen aus Formular (POST) oder Query-String (GET)"""
+    return parse_report_values(report_values(req))
+
+
+def parse_report_values(values):
+    """Wandelt Rohwerte (z.B. aus einem gespeicherten Report-Job) in ``ReportOptions`` um"""
+    filter_options = {}
+    if values.get('lecturer_id'):
+        filter_options['lecturer_id'] = int(values.get('lecturer_id'))
+    if values.get('curriculum_id'):
+        filter_options['curriculum_id'] = values.get('curriculum_id')
+    if values.get('start_date') and values.get('end_date'):
+        start_date = datetime.strptime(values.get('start_date'), '%Y-%m-%d')
+        end_date = datetime.strptime(values.get('end_date'), '%Y-%m-%d')
+        filter_options['date_range'] = [start_date, end_date]
+
+    return ReportOptions(
+        filter_options=filter_options,
+        report_type=values.get('report_type', 'standard'),
+        include_statistics=_flag(values.get('include_statistics')),
+        include_availabilities=_flag(values.get('include_availabilities'))
+    )
+
+
+def _snapshot_lecturer(lecturer):
+    if lecturer is None:
+        return None
+    return ReportLecturer(lecturer.id, lecturer.name, lecturer.color)
+
+
+def _snapshot_course(course):
+    return ReportCourse(
+        id=course.id,
+        topic=course.topic,
+        start_date=course.start_date,
+        end_date=course.end_date,
+        duration_days=(course.end_date - course.start_date).days + 1,
+        lecturer_id=course.lecturer_id,
+        lecturer=_snapshot_lecturer(course.lecturer),
+        curriculum_id=course.curriculum_id
+    )
+
+
+def _snapshot_availability(availability):
+    return ReportAvailability(
+        id=availability.id,
+        lecturer_id=availability.lecturer_id,
+        lecturer=_snapshot_lecturer(availability.lecturer),
+        start_date=availability.start_date,
+        end_date=availability.end_date,
+        type=availability.type,
+        note=availability.note
+    )
+
+
+def build_batches(courses):
+    """Gruppiert Kurse nach Lehrplan, sortiert nach dem ersten Kursstart"""
+    curriculum_courses = {}
+    for course in courses:
+        curriculum_courses.setdefault(course.curriculum_id, []).append(course)
+
+    for batch_courses in curriculum_courses.values():
+        batch_courses.sort(key=lambda c: c.start_date)
+
+    sorted_curriculum_ids = sorted(
+        curriculum_courses.keys(),
+        key=lambda cid: curriculum_courses[cid][0].start_date
+    )
+
+    batches = []
+    for i, curriculum_id in enumerate(sorted_curriculum_ids):
+        batch_courses = curriculum_courses[curriculum_id]
+        first_start = batch_courses[0].start_date
+        semester = "SoSe" if 3 <= first_start.month <= 8 else "WiSe"
+        batches.append(ReportBatch(
+            curriculum_id=curriculum_id,
+            name=f"Batch {i + 1} ({semester} {first_start.year})",
+            start_date=first_start,
+            courses=tuple(batch_courses)
+        ))
+    return tuple(batches)
+
+
+def build_statistics(courses, top=5):
+    """Kursanzahl, Kurstage, Top-Dozenten und häufigste Themen in einem Durchlauf"""
+    total_days = 0
+    lecturer_stats = {}
+    topic_counts = Counter()
+    for course in courses:
+        total_days += course.duration_days
+        topic_counts[course.topic] += 1
+        if course.lecturer:
+            stats = lecturer_stats.setdefault(course.lecturer.id, [course.lecturer, 0, 0])
+            stats[1] += 1
+            stats[2] += course.duration_days
+
+    top_lecturers = sorted(
+        (LecturerStat(lecturer.name, lecturer.color or '#808080', count, days)
+         for lecturer, count, days in lecturer_stats.values()),
+        key=lambda stat: stat.total_days,
+        reverse=True
+    )[:top]
+
+    return ReportStatistics(
+        course_count=len(courses),
+        total_days=total_days,
+        avg_duration=round(total_days / len(courses), 1) if courses else 0,
+        top_lecturers=tuple(top_lecturers),
+        top_topics=tuple(TopicStat(topic, count) for topic, count in topic_counts.most_common(top))
+    )
+
+
+def rollup_statistics(filter_options, top=5):
+    """Statistik aus den Rollup-Tabellen statt aus der Kursliste
+
+    Returns:
+    --------
+    ReportStatistics oder None
+        None, wenn nach Lehrplan oder Zeitraum gefiltert wird; die Rollups
+        sind nur nach Dozent und Startmonat aufgeteilt.
+    """
+    if filter_options.get('curriculum_id') or filter_options.get('date_range'):
+        return None
+
+    lecturer_id = filter_options.get('lecturer_id')
+    lecturer_id = int(lecturer_id) if lecturer_id else None
+    course_count, total_days = statistics.course_totals(lecturer_id)
+    top_lecturers = statistics.lecturer_workload(
+        limit=top, days_column=LecturerMonthRollup.course_days, lecturer_id=lecturer_id)
+    top_topics = statistics.topic_counts(limit=top, lecturer_id=lecturer_id)
+
+    return ReportStatistics(
+        course_count=course_count,
+        total_days=total_days,
+        avg_duration=round(total_days / course_count, 1) if course_count else 0,
+        top_lecturers=tuple(LecturerStat(row.name, row.color or '#808080', row.course_count, row.total_days)
+                            for row in top_lecturers),
+        top_topics=tuple(TopicStat(row.topic, row.count) for row in top_topics)
+    )
+
+
+def _filename_stem(filter_options):
+    filename_parts = ['Lehrplan_Bericht']
+    if filter_options.get('lecturer_id'):
+        lecturer = Lecturer.query.get(filter_options['lecturer_id'])
+        if lecturer:
+            filename_parts.append(f"Dozent_{lecturer.name.replace(' ', '_')}")
+
+    if filter_options.get('curriculum_id'):
+        filename_parts.append(f"Batch_{filter_options['curriculum_id'][:8]}")
+
+    if filter_options.get('date_range'):
+        start, end = filter_options['date_range']
+        filename_parts.append(f"{start.strftime('%Y%m%d')}-{end.strftime('%Y%m%d')}")
+
+    return '_'.join(filename_parts)
+
+
+def build_report_data(filter_options):
+    """Lädt alle Daten für einen Bericht und rendert das Timeline-Bild
+
+    Returns:
+    --------
+    ReportData
+        ``courses`` ist leer, wenn kein Kurs den Filtern entspricht; dann gibt
+        es auch kein Timeline-Bild.
+    """
+    orm_courses = active_courses(filter_options).all()
+    courses = tuple(_snapshot_course(course) for course in orm_courses)
+
+    availabilities = ()
+    timeline_png = None
+    timeline_image = None
+    if courses:
+        lecturer_ids = {course.lecturer_id for course in courses if course.lecturer_id}
+        min_date = min(course.start_date for course in courses)
+        max_date = max(course.end_date for course in courses)
+        availabilities = tuple(
+            _snapshot_availability(availability)
+            for availability in availabilities_in_range(lecturer_ids, min_date, max_date).all()
+        )
+
+        # Die Abwesenheiten sind schon geladen, die Timeline fragt sie nicht erneut ab
+        fig = create_timeline_figure(orm_courses, filter_options, availabilities)
+        timeline_png = render_png(fig, **TIMELINE_IMAGE_OPTIONS)
+        timeline_image = base64.b64encode(timeline_png).decode('utf-8')
+
+    return ReportData(
+        courses=courses,
+        batches=build_batches(courses),
+        statistics=rollup_statistics(filter_options) or build_statistics(courses),
+        availabilities=availabilities,
+        timeline_png=timeline_png,
+        timeline_image=timeline_image,
+        filename_stem=_filename_stem(filter_options)
+    )
+
+
+def get_report_data(filter_options):
+    """``build_report_data()`` mit Cache pro Filter und Datenversion
+
+    Das Datum gehört zum Schlüssel, weil das Timeline-Bild die Heute-Linie zeigt.
+    """
+    key = (filter_cache_key(filter_options), data_version(), datetime.now().date())
+    data = report_cache.get(key)
+    if data is None:
+        data = build_report_data(filter_options)
+        if not has_uncommitted_changes():
+            report_cache.set(key, data)
+    return data
+
+
+def load_report_template(report_type):
+    """Quelltext der Berichtsvorlage; fällt auf die Standardvorlage zurück und legt sie bei Bedarf an"""
+    from .routes import get_standard_report_template
+
+    if report_type == 'lecturer':
+        report_template_path = 'pdf_templates/lecturer_report.html'
+    elif report_type == 'curriculum':
+        report_template_path = 'pdf_templates/curriculum_report.html'
+    else:
+        report_template_path = 'pdf_templates/standard_report.html'
+
+    pdf_template_dir = os.path.join(current_app.root_path, 'templates', 'pdf_templates')
+    os.makedirs(pdf_template_dir, exist_ok=True)
+
+    report_template_path = os.path.join(current_app.root_path, 'templates', report_template_path)
+    if not os.path.exists(report_template_path):
+        report_template_path = os.path.join(pdf_template_dir, 'standard_report.html')
+        if not os.path.exists(report_template_path):
+            with open(report_template_path, 'w', encoding='utf-8') as f:
+                f.write(get_standard_report_template())
+
+    with open(report_template_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def report_context(data, options):
+    """Template-Kontext für die HTML-basierten Exporte"""
+    return {
+        'current_date': datetime.now().strftime('%d.%m.%Y'),
+        'timeline_image': data.timeline_image,
+        'batches': data.batches,
+        'statistics': data.statistics if options.include_statistics else {},
+        'availabilities': data.availabilities if options.include_availabilities else [],
+        'include_statistics': options.include_statistics,
+        'include_availabilities': options.include_availabilities,
+        'report_type': options.report_type
+    }
+
+
+def write_direct_pdf(data, options, output):
+    """Erzeugt den PDF-Bericht mit ReportLab (ohne wkhtmltopdf)
+
+    Parameters:
+    -----------
+    data : ReportData
+        Ergebnis von ``get_report_data()``
+    options : ReportOptions
+        Steuert Statistik- und Verfügbarkeitsabschnitte
+    output : str or file
+        Zielpfad oder beschreibbares Dateiobjekt (z.B. ``BytesIO``)
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import mm
+
+    statistics_data = data.statistics
+
+    # Set up the document
+    doc = SimpleDocTemplate(output, pagesize=A4, 
+                           rightMargin=20*mm, leftMargin=20*mm,
+                           topMargin=20*mm, bottomMargin=20*mm)
+
+    # Styles (eigene Namen, die Beispiel-Stylesheet enthält Title/Heading/Normal bereits)
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='ReportTitle', 
+                             fontName='Helvetica-Bold', 
+                             fontSize=18, 
+                             alignment=1,  # 0=left, 1=center, 2=right
+                             spaceAfter=6))
+    styles.add(ParagraphStyle(name='ReportHeading2', 
+                             fontName='Helvetica-Bold', 
+                             fontSize=14,
+                             spaceAfter=6))
+    styles.add(ParagraphStyle(name='ReportHeading3', 
+                             fontName='Helvetica-Bold', 
+                             fontSize=12,
+                             spaceAfter=6))
+    styles.add(ParagraphStyle(name='ReportNormal', 
+                             fontName='Helvetica', 
+                             fontSize=10,
+                             spaceAfter=6))
+
+    # Content elements
+    elements = []
+
+    # Title
+    elements.append(Paragraph('Lehrplan Übersicht', styles['ReportTitle']))
+    elements.append(Paragraph(f'Erstellt am {datetime.now().strftime("%d.%m.%Y")}', styles['ReportNormal']))
+    elements.append(Spacer(1, 10*mm))
+
+    # Timeline image
+    img_data = BytesIO(data.timeline_png)
+    img = Image(img_data, width=160*mm, height=80*mm)
+    elements.append(Paragraph('Timeline Übersicht', styles['ReportHeading2']))
+    elements.append(img)
+    elements.append(Spacer(1, 5*mm))
+
+    # Statistics if included
+    if options.include_statistics and statistics_data:
+        elements.append(Paragraph('Statistische Übersicht', styles['ReportHeading2']))
+
+        # Basic statistics
+        summary_data = [
+            ['Anzahl Kurse', str(statistics_data.course_count)],
+            ['Durchschnittliche Kursdauer', f"{statistics_data.avg_duration} Tage"],
+            ['Gesamtzahl Kurstage', f"{statistics_data.total_days} Tage"]
+        ]
+
+        table = Table(summary_data, colWidths=[100*mm, 50*mm])
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        elements.append(table)
+        elements.append(Spacer(1, 5*mm))
+
+        # Top lecturers if available
+        if statistics_data.top_lecturers:
+            elements.append(Paragraph('Top Dozenten', styles['ReportHeading3']))
+
+            lecturer_data = [['Dozent', 'Anzahl Kurse', 'Gesamttage', 'Tage/Kurs']]
+            for lecturer in statistics_data.top_lecturers:
+                avg = round(lecturer.total_days / lecturer.course_count, 1) if lecturer.course_count > 0 else 0
+                lecturer_data.append([
+                    lecturer.name,
+                    str(lecturer.course_count),
+                    str(lecturer.total_days),
+                    str(avg)
+                ])
+
+            table = Table(lecturer_data, colWidths=[70*mm, 30*mm, 30*mm, 30*mm])
+            table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]))
+            elements.append(table)
+            elements.append(Spacer(1, 5*mm))
+
+        # Top topics if available
+        if statistics_data.top_topics:
+            elements.append(Paragraph('Häufigste Kursthemen', styles['ReportHeading3']))
+
+            topic_data = [['Thema', 'Anzahl']]
+            for topic in statistics_data.top_topics:
+                topic_data.append([topic.topic, str(topic.count)])
+
+            table = Table(topic_data, colWidths=[130*mm, 30*mm])
+            table.setStyle(TableStyle([
+                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]))
+            elements.append(table)
+            elements.append(Spacer(1, 5*mm))
+
+    # Page break before courses
+    elements.append(PageBreak())
+
+    # Course details by batch
+    elements.append(Paragraph('Detaillierte Lehrplan Informationen', styles['ReportHeading2']))
+
+    for batch in data.batches:
+        elements.append(Paragraph(f"{batch.name} (Start: {batch.start_date.strftime('%d.%m.%Y')})", styles['ReportHeading3']))
+
+        course_data = [['Thema', 'Zeitraum', 'Dauer', 'Dozent']]
+        for course in batch.courses:
+            duration = course.duration_days
+            lecturer_name = course.lecturer.name if course.lecturer else 'Nicht zugewiesen'
+
+            course_data.append([
+                course.topic,
+                f"{course.start_date.strftime('%d.%m.%Y')} - {course.end_date.strftime('%d.%m.%Y')}",
+                f"{duration} Tage",
+                lecturer_name
+            ])
+
+        table = Table(course_data, colWidths=[70*mm, 50*mm, 20*mm, 30*mm])
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        elements.append(table)
+        elements.append(Spacer(1, 5*mm))
+
+    # Availabilities if included
+    if options.include_availabilities and data.availabilities:
+        # Add page break before availabilities
+        elements.append(PageBreak())
+        elements.append(Paragraph('Dozenten-Verfügbarkeiten', styles['ReportHeading2']))
+
+        avail_data = [['Dozent', 'Typ', 'Zeitraum', 'Dauer', 'Notiz']]
+        for avail in data.availabilities:
+            duration = (avail.end_date - avail.start_date).days + 1
+            avail_type = 'Urlaub' if avail.type == 'vacation' else 'Nicht verfügbar'
+
+            avail_data.append([
+                avail.lecturer.name,
+                avail_type,
+                f"{avail.start_date.strftime('%d.%m.%Y')} - {avail.end_date.strftime('%d.%m.%Y')}",
+                f"{duration} Tage",
+                avail.note or ''
+            ])
+
+        table = Table(avail_data, colWidths=[40*mm, 25*mm, 45*mm, 20*mm, 40*mm])
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+        elements.append(table)
+
+    # Build the PDF
+    doc.build(elements)
+
+
+def wkhtmltopdf_path():
+    return os.environ.get('WKHTMLTOPDF_PATH', r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe')
+
+
+def wkhtmltopdf_options():
+    """PDF-Optionen für wkhtmltopdf"""
+    return {
+        'page-size': 'A4',
+        'margin-top': '20mm',
+        'margin-right': '20mm',
+        'margin-bottom': '20mm',
+        'margin-left': '20mm',
+        'encoding': 'UTF-8',
+        'title': 'Lehrplan Bericht',
+        'footer-right': '[page]/[topage]',
+        'footer-left': f'Erstellt am {datetime.now().strftime("%d.%m.%Y")}',
+        'footer-font-size': '8',
+        'header-html': '',
+        'footer-line': '',
+        'disable-smart-shrinking': '',  # This helps with image rendering
+        'no-stop-slow-scripts': '',     # Prevent timeout on complex scripts
+        'quiet': ''
+    }
+
+
+def write_wkhtmltopdf_pdf(data, options, output_path):
+    """Rendert die HTML-Vorlage und wandelt sie mit wkhtmltopdf in ``output_path`` um"""
+    import pdfkit
+    from jinja2 import Template
+
+    path = wkhtmltopdf_path()
+    if not os.path.exists(path):
+        raise RuntimeError(f'wkhtmltopdf nicht gefunden unter {path}')
+
+    template = Template(load_report_template(options.report_type))
+    html_content = template.render(**report_context(data, options))
+    config = pdfkit.configuration(wkhtmltopdf=path)
+    pdfkit.from_string(html_content, output_path, options=wkhtmltopdf_options(), configuration=config)
@@ -0,0 +1,60 @@
+"""JSON-Antworten für Polling-Endpunkte: ETag, 304 und gzip
+
+Kalender und Timeline fragen dieselben Daten immer wieder ab. Der ETag wird
+vor dem Laden der Daten aus Datenversion und Parametern gebildet, sodass ein
+unveränderter Stand nur die Versionsabfrage kostet. Größere Antworten werden
+komprimiert, wenn der Client gzip akzeptiert.
+"""
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+# Kleinere Antworten lohnen die Kompression nicht
+GZIP_MIN_SIZE = 1024
+
+_GZIP_SUFFIX = '-gz'
+
+
+def make_etag(*parts):
+    """Starker ETag aus beliebigen Teilen (z.B. Datenversion und Filter)"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode('utf-8') + b'|')
+    return digest.hexdigest()
+
+
+def _accepts_gzip():
+    return 'gzip' in request.accept_encodings
+
+
+def not_modified(etag):
+    """304-Antwort, wenn der Client diesen Stand schon hat, sonst None
+
+    Die komprimierte Variante trägt einen eigenen ETag (RFC 7232 verlangt
+    verschiedene starke ETags für verschiedene Kodierungen).
+    """
+    if request.if_none_match.contains(etag) or request.if_none_match.contains(etag + _GZIP_SUFFIX):
+        response = Response(status=304)
+        response.set_etag(etag + _GZIP_SUFFIX if _accepts_gzip() else etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.no_cache = True
+        return response
+    return None
+
+
+def json_response(data, etag):
+    """JSON-Antwort mit ETag, ``Cache-Control: no-cache`` und ggf. gzip"""
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    response = Response(mimetype='application/json')
+    if len(body) >= GZIP_MIN_SIZE and _accepts_gzip():
+        body = gzip.compress(body, compresslevel=6)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += _GZIP_SUFFIX
+    response.set_data(body)
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Clients dürfen speichern, müssen aber per ETag nachfragen
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,358 @@
+"""Pflege der Statistik-Tabellen (Rollups)
+
+Das Statistik-Dashboard und die Statistik-Abschnitte der Exporte lesen nicht
+mehr alle Kurse, sondern vorab verdichtete Zeilen:
+
+* ``lecturer_month_rollup``: Kurse, gebuchte Tage und Abwesenheiten pro
+  Dozent und Startmonat
+* ``course_month_rollup``: Kurse pro Startmonat, Wochentag und Dauer-Bucket
+* ``topic_rollup``: Kurse pro Thema und Dozent
+
+Wie bei ``curricula.py`` werden in derselben Transaktion wie die Änderung nur
+die betroffenen Schlüssel neu berechnet (``DELETE`` plus ``INSERT ... SELECT``
+aus ``course`` bzw. ``availability``, zwei Statements pro Tabelle), bei
+Bulk-Updates und -Deletes die ganze Tabelle. ``flask rebuild-statistics``
+baut alle Rollups komplett neu auf.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, case, cast, event, func, inspect, literal, or_, select, union_all, Float, Integer
+from sqlalchemy.orm import Session
+
+from .models import Course, Availability, Lecturer, LecturerMonthRollup, CourseMonthRollup, TopicRollup
+from .statistics import DURATION_BINS
+
+# Spalten, deren Änderung das jeweilige Rollup beeinflusst
+LECTURER_MONTH_COLUMNS = {'start_date', 'end_date', 'lecturer_id', 'active'}
+COURSE_MONTH_COLUMNS = {'start_date', 'end_date', 'active'}
+TOPIC_COLUMNS = {'topic', 'lecturer_id', 'active'}
+COURSE_COLUMNS = LECTURER_MONTH_COLUMNS | COURSE_MONTH_COLUMNS | TOPIC_COLUMNS
+AVAILABILITY_COLUMNS = {'lecturer_id', 'start_date'}
+
+# Rollup-Schlüssel für Kurse und Abwesenheiten ohne Dozent
+NO_LECTURER = 0
+
+
+def course_days():
+    """Kursdauer in ganzen Tagen wie ``(end - start).days``, mindestens 1"""
+    days = cast(func.julianday(Course.end_date) - func.julianday(Course.start_date), Integer)
+    return func.max(days, 1)
+
+
+def duration_bucket(days):
+    """Index des Dauer-Buckets als SQL-Ausdruck"""
+    return case(
+        *[(days < upper, index) for index, upper in enumerate(DURATION_BINS[1:])],
+        else_=len(DURATION_BINS) - 1
+    )
+
+
+def month_of(value):
+    """Rollup-Monat ('YYYY-MM') eines Datums"""
+    return value.strftime('%Y-%m')
+
+
+def _month_start(month):
+    year, month_num = month.split('-')
+    return datetime(int(year), int(month_num), 1)
+
+
+def _month_end(month):
+    """Erster Tag des Folgemonats (exklusive Obergrenze)"""
+    start = _month_start(month)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _month_range(date_column, months):
+    """Bedingung: Datum liegt zwischen dem ersten und letzten der Monate"""
+    return and_(date_column >= _month_start(min(months)), date_column < _month_end(max(months)))
+
+
+def _lecturer_key(column):
+    return func.coalesce(column, NO_LECTURER)
+
+
+def _lecturer_filter(lecturer_column, date_column, lecturer_months):
+    """ODER-Verknüpfung aus Dozent und Monatsbereich je betroffenem Dozenten"""
+    terms = []
+    for lecturer_id, months in lecturer_months.items():
+        if lecturer_id == NO_LECTURER:
+            condition = lecturer_column.is_(None)
+        else:
+            condition = lecturer_column == lecturer_id
+        if months is not None:
+            condition = and_(condition, _month_range(date_column, months))
+        terms.append(condition)
+    return or_(*terms)
+
+
+def _rollup_filter(lecturer_months):
+    """Dieselbe Bedingung für die Zeilen von ``lecturer_month_rollup``"""
+    table = LecturerMonthRollup.__table__
+    terms = []
+    for lecturer_id, months in lecturer_months.items():
+        condition = table.c.lecturer_id == lecturer_id
+        if months is not None:
+            condition = and_(condition, table.c.month.between(min(months), max(months)))
+        terms.append(condition)
+    return or_(*terms)
+
+
+def refresh_lecturer_months(session, lecturer_months=None):
+    """Berechnet ``lecturer_month_rollup`` neu (ohne Commit)
+
+    Parameters:
+    -----------
+    session : Session
+        Die Session, in deren Transaktion geschrieben wird
+    lecturer_months : dict, optional
+        ``{lecturer_id: {'YYYY-MM', ...}}``; neu berechnet wird jeweils der
+        Bereich vom ersten bis zum letzten Monat, ``None`` als Monatsmenge
+        steht für alle Monate des Dozenten. ``None`` baut die ganze Tabelle
+        neu auf.
+    """
+    if lecturer_months is not None and not lecturer_months:
+        return
+
+    courses = select(
+        _lecturer_key(Course.lecturer_id).label('lecturer_id'),
+        func.strftime('%Y-%m', Course.start_date).label('month'),
+        literal(1).label('course_count'),
+        (func.julianday(Course.end_date) - func.julianday(Course.start_date)).label('booked_days'),
+        (cast(func.julianday(Course.end_date) - func.julianday(Course.start_date), Integer) + 1)
+            .label('course_days'),
+        literal(0).label('availability_count')
+    ).where(Course.active == True)
+    availabilities = select(
+        _lecturer_key(Availability.lecturer_id),
+        func.strftime('%Y-%m', Availability.start_date),
+        literal(0),
+        cast(literal(0), Float),
+        literal(0),
+        literal(1)
+    )
+    if lecturer_months is not None:
+        courses = courses.where(_lecturer_filter(Course.lecturer_id, Course.start_date, lecturer_months))
+        availabilities = availabilities.where(
+            _lecturer_filter(Availability.lecturer_id, Availability.start_date, lecturer_months))
+
+    rows = union_all(courses, availabilities).subquery()
+    stats = select(
+        rows.c.lecturer_id,
+        rows.c.month,
+        func.sum(rows.c.course_count),
+        func.sum(rows.c.booked_days),
+        func.sum(rows.c.course_days),
+        func.sum(rows.c.availability_count)
+    ).group_by(rows.c.lecturer_id, rows.c.month)
+
+    table = LecturerMonthRollup.__table__
+    delete = table.delete()
+    if lecturer_months is not None:
+        delete = delete.where(_rollup_filter(lecturer_months))
+
+    connection = session.connection()
+    connection.execute(delete)
+    connection.execute(table.insert().from_select(
+        ['lecturer_id', 'month', 'course_count', 'booked_days', 'course_days', 'availability_count'],
+        stats
+    ))
+
+
+def refresh_course_months(session, months=None):
+    """Berechnet ``course_month_rollup`` für die Monate vom ersten bis zum letzten neu
+
+    ``None`` baut die ganze Tabelle neu auf.
+    """
+    if months is not None and not months:
+        return
+
+    rows = select(
+        func.strftime('%Y-%m', Course.start_date).label('month'),
+        cast(func.strftime('%w', Course.start_date), Integer).label('weekday'),
+        course_days().label('days')
+    ).where(Course.active == True)
+    if months is not None:
+        rows = rows.where(_month_range(Course.start_date, months))
+    rows = rows.subquery()
+    bucket = duration_bucket(rows.c.days)
+    stats = select(rows.c.month, rows.c.weekday, bucket, func.count(), func.sum(rows.c.days))\
+        .group_by(rows.c.month, rows.c.weekday, bucket)
+
+    table = CourseMonthRollup.__table__
+    delete = table.delete()
+    if months is not None:
+        delete = delete.where(table.c.month.between(min(months), max(months)))
+
+    connection = session.connection()
+    connection.execute(delete)
+    connection.execute(table.insert().from_select(
+        ['month', 'weekday', 'duration_bucket', 'course_count', 'total_days'], stats
+    ))
+
+
+def refresh_topics(session, topics=None):
+    """Berechnet ``topic_rollup`` für die angegebenen Themen neu
+
+    ``None`` baut die ganze Tabelle neu auf.
+    """
+    if topics is not None:
+        topics = set(topics) - {None}
+        if not topics:
+            return
+
+    lecturer_id = _lecturer_key(Course.lecturer_id)
+    stats = select(Course.topic, lecturer_id, func.count())\
+        .where(Course.active == True)\
+        .group_by(Course.topic, lecturer_id)
+    table = TopicRollup.__table__
+    delete = table.delete()
+    if topics is not None:
+        stats = stats.where(Course.topic.in_(topics))
+        delete = delete.where(table.c.topic.in_(topics))
+
+    connection = session.connection()
+    connection.execute(delete)
+    connection.execute(table.insert().from_select(['topic', 'lecturer_id', 'course_count'], stats))
+
+
+def rebuild_rollups(session):
+    """Baut alle Statistik-Tabellen komplett neu auf (ohne Commit)"""
+    refresh_lecturer_months(session)
+    refresh_course_months(session)
+    refresh_topics(session)
+
+
+def refresh_rollups_for_curricula(session, curriculum_ids):
+    """Berechnet die Rollups für alle Kurse der angegebenen Lehrpläne neu
+
+    Für Bulk-Inserts (Import) und Core-Updates, die keine Flush-Events auslösen.
+
+    Returns:
+    --------
+    set
+        Betroffene Dozenten (``NO_LECTURER`` für Kurse ohne Dozent)
+    """
+    curriculum_ids = set(curriculum_ids) - {None}
+    if not curriculum_ids:
+        return set()
+
+    lecturer_id = _lecturer_key(Course.lecturer_id)
+    ranges = session.query(lecturer_id, func.min(Course.start_date), func.max(Course.start_date))\
+        .filter(Course.curriculum_id.in_(curriculum_ids))\
+        .group_by(lecturer_id)\
+        .all()
+    lecturer_months = {
+        lecturer: {month_of(first_start), month_of(last_start)}
+        for lecturer, first_start, last_start in ranges
+    }
+    months = set().union(*lecturer_months.values())
+    topics = {topic for topic, in session.query(Course.topic)
+              .filter(Course.curriculum_id.in_(curriculum_ids))
+              .distinct()}
+
+    refresh_lecturer_months(session, lecturer_months)
+    refresh_course_months(session, months)
+    refresh_topics(session, topics)
+    return set(lecturer_months)
+
+
+def _values(instance, attribute, deleted=False):
+    """Werte eines Attributs vor und nach der Änderung (inklusive None)"""
+    current = getattr(instance, attribute)
+    if deleted:
+        return {current}
+    history = getattr(inspect(instance).attrs, attribute).history
+    return set(history.added or ()) | set(history.deleted or ()) | {current}
+
+
+def _modified(instance, columns):
+    attrs = inspect(instance).attrs
+    return any(attrs[name].history.has_changes() for name in columns)
+
+
+def _after_flush(session, flush_context):
+    lecturer_months = {}
+    months = set()
+    topics = set()
+
+    def touch(instance, deleted=False, rollups=('lecturer',)):
+        touched_months = {month_of(value) for value in _values(instance, 'start_date', deleted) if value}
+        if 'lecturer' in rollups:
+            for lecturer_id in _values(instance, 'lecturer_id', deleted):
+                key = lecturer_id or NO_LECTURER
+                if key in lecturer_months and lecturer_months[key] is None:
+                    continue
+                lecturer_months.setdefault(key, set()).update(touched_months)
+        if 'month' in rollups:
+            months.update(touched_months)
+        if 'topic' in rollups:
+            topics.update(_values(instance, 'topic', deleted))
+
+    all_rollups = ('lecturer', 'month', 'topic')
+    for instance in session.new:
+        if isinstance(instance, Course):
+            touch(instance, rollups=all_rollups)
+        elif isinstance(instance, Availability):
+            touch(instance)
+    for instance in session.dirty:
+        if isinstance(instance, Course):
+            touched = [name for name, columns in (('lecturer', LECTURER_MONTH_COLUMNS),
+                                                  ('month', COURSE_MONTH_COLUMNS),
+                                                  ('topic', TOPIC_COLUMNS))
+                       if _modified(instance, columns)]
+            touch(instance, rollups=touched)
+        elif isinstance(instance, Availability) and _modified(instance, AVAILABILITY_COLUMNS):
+            touch(instance)
+    for instance in session.deleted:
+        if isinstance(instance, Course):
+            touch(instance, deleted=True, rollups=all_rollups)
+        elif isinstance(instance, Availability):
+            touch(instance, deleted=True)
+        elif isinstance(instance, Lecturer) and instance.id:
+            # Alle Zeilen des Dozenten entfernen
+            lecturer_months[instance.id] = None
+
+    # Dozenten ohne bekannte Monate (z.B. Startdatum fehlt) nicht anfassen
+    lecturer_months = {
+        lecturer_id: touched for lecturer_id, touched in lecturer_months.items()
+        if touched is None or touched
+    }
+    refresh_lecturer_months(session, lecturer_months)
+    refresh_course_months(session, months)
+    refresh_topics(session, topics)
+
+
+def _after_bulk_update(update_context):
+    mapper_class = update_context.mapper.class_
+    columns = {getattr(key, 'key', key) for key in update_context.values}
+    if mapper_class is Course and columns & COURSE_COLUMNS:
+        rebuild_rollups(update_context.session)
+    elif mapper_class is Availability and columns & AVAILABILITY_COLUMNS:
+        refresh_lecturer_months(update_context.session)
+
+
+def _after_bulk_delete(delete_context):
+    mapper_class = delete_context.mapper.class_
+    if mapper_class is Course:
+        rebuild_rollups(delete_context.session)
+    elif mapper_class is Availability:
+        refresh_lecturer_months(delete_context.session)
+
+
+def register_rollup_events():
+    """Registriert die Session-Events einmalig für alle Sessions
+
+    Bulk-Updates und -Deletes verraten die betroffenen Zeilen nicht und bauen
+    deshalb die betroffenen Rollups komplett neu auf.
+    """
+    listeners = [
+        ('after_flush', _after_flush),
+        ('after_bulk_update', _after_bulk_update),
+        ('after_bulk_delete', _after_bulk_delete),
+    ]
+    for name, listener in listeners:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -1,9 +1,29 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, flash, send_file, Response
+from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, flash, send_file, Response, stream_with_context
+from werkzeug.http import is_resource_modified
 from . import db
-import pandas as pd
 from datetime import datetime, timedelta
-from .models import Course, Lecturer, Assignment, Settings, Availability
-import plotly.express as px
+from .models import Course, Lecturer, Assignment, Settings, Availability, ImportJob, Curriculum, ReportJob
+from .conflicts import IntervalIndex
+from .assignments import bulk_assign, parse_assignment_pairs
+from .autoassign import propose_assignments
+from .freebusy import free_lecturers, freebusy_cache
+from .timeline import parse_filter_options, parse_view_range, get_timeline_model, cached_timeline_model, figure_dict, timeline_delta, timeline_model_cache
+from .cache import timeline_cache, data_version, data_version_modified, filter_cache_key, has_uncommitted_changes, get_curriculum_snapshot, curriculum_cache
+from .importer import start_import_job
+from .report_jobs import start_report_job
+from .ical import iter_calendar
+from .feeds import get_feed
+from .calendar_events import calendar_events, parse_window, EVENT_TYPES
+from .responses import make_etag, not_modified, json_response
+from .statistics import dashboard_statistics
+from .utilization import utilization, working_day_numbers, utilization_cache, DEFAULT_WEEKS
+from .curricula import list_curricula, set_curriculum_active
+from .queries import courses_with_lecturer, course_rows, availability_rows
+from . import reports
+from .reports import parse_report_options, report_values, get_report_data, load_report_template, report_context, report_cache, write_direct_pdf
+from .rendering import png_cache
+from .utils import allowed_file
+import plotly.graph_objects as go
 from bson import ObjectId
 import os
 import uuid
@@ -11,8 +31,6 @@ import numpy as np
 from jinja2 import Template
 import pdfkit
 from io import BytesIO
-from functools import lru_cache
-from sqlalchemy import func
 import icalendar
 from icalendar import Calendar, Event, vText
 import tempfile
@@ -33,304 +51,9 @@ COLORS = [
     {"hex": "#4B0082", "name": "Indigo"}
 ]
 
-@lru_cache(maxsize=32)
 def get_sorted_curriculum_courses(curriculum_id):
-    """Cache für häufig abgefragte Kurssequenzen"""
-    return db.session.query(Course)\
-        .filter(Course.curriculum_id == curriculum_id)\
-        .filter(Course.active == True)\
-        .order_by(Course.start_date)\
-        .all()
-
-def create_timeline_figure(courses, filter_options=None):
-    """Erstellt die Timeline-Figur basierend auf den Kursen
-    
-    Parameters:
-    -----------
-    courses : list
-        Liste der Kursobjekte
-    filter_options : dict, optional
-        Filteroptionen, z.B. {'lecturer_id': 1, 'date_range': [start_date, end_date]}
-    """
-    batches = {}
-    color_map = {}
-    batch_counter = 1
-    
-    # Filter courses if filter_options provided
-    if filter_options:
-        filtered_courses = []
-        for course in courses:
-            # Filter by lecturer
-            if filter_options.get('lecturer_id') and course.lecturer_id != filter_options['lecturer_id']:
-                continue
-            
-            # Filter by date range
-            if filter_options.get('date_range'):
-                start_date, end_date = filter_options['date_range']
-                if course.end_date < start_date or course.start_date > end_date:
-                    continue
-                    
-            # Filter by curriculum
-            if filter_options.get('curriculum_id') and course.curriculum_id != filter_options['curriculum_id']:
-                continue
-                
-            filtered_courses.append(course)
-        courses = filtered_courses
-    
-    # Sortiere courses nach Startdatum
-    curriculum_start_dates = {}
-    for course in courses:
-        if course.curriculum_id not in curriculum_start_dates:
-            first_course = min([c for c in courses if c.curriculum_id == course.curriculum_id],
-                             key=lambda x: x.start_date)
-            curriculum_start_dates[course.curriculum_id] = first_course.start_date
-
-    sorted_curriculum_ids = sorted(curriculum_start_dates.keys(), 
-                                 key=lambda x: curriculum_start_dates[x])
-
-    # Verarbeite Kurse in der sortierten Reihenfolge
-    for curriculum_id in sorted_curriculum_ids:
-        curriculum_courses = [c for c in courses if c.curriculum_id == curriculum_id]
-        if not curriculum_courses:
-            continue
-            
-        first_course = min(curriculum_courses, key=lambda x: x.start_date)
-        batch_start = first_course.start_date
-        
-        # Format batch name with more details
-        semester = "WS" if batch_start.month > 6 else "SS"
-        year = batch_start.year
-        batches[curriculum_id] = {
-            'start_date': batch_start,
-            'name': f"Batch {batch_counter} ({semester} {year}, Start: {batch_start.strftime('%d.%m.%Y')})",
-            'courses': []
-        }
-        batch_counter += 1
-        
-        for course in curriculum_courses:
-            lecturer_name = course.lecturer.name if course.lecturer else 'Nicht zugewiesen'
-            if course.lecturer:
-                color_map[lecturer_name] = course.lecturer.color or '#808080'
-            
-            # Calculate course duration in days
-            duration_days = (course.end_date - course.start_date).days + 1
-            
-            batches[curriculum_id]['courses'].append({
-                'Batch': batches[curriculum_id]['name'],
-                'Thema': course.topic,
-                'Start': course.start_date,
-                'End': course.end_date,
-                'Dozent': lecturer_name,
-                'Dauer': f"{duration_days} Tage",
-                'ID': course.id  # Add course ID for linking
-            })
-
-    # Erstelle DataFrame
-    timeline_data = []
-    sorted_batches = sorted(batches.values(), key=lambda x: x['start_date'])
-    for batch in sorted_batches:
-        timeline_data.extend(batch['courses'])
-    
-    if not timeline_data:
-        # Create empty figure with message if no data is available
-        empty_fig = px.scatter(title="Keine Kurse gefunden - Bitte passen Sie die Filter an")
-        empty_fig.update_layout(
-            height=400,
-            annotations=[{
-                'text': "Keine Kurse für die aktuellen Filtereinstellungen gefunden",
-                'showarrow': False,
-                'font': {'size': 16},
-                'xref': 'paper',
-                'yref': 'paper',
-                'x': 0.5,
-                'y': 0.5
-            }]
-        )
-        return empty_fig
-    
-    df = pd.DataFrame(timeline_data)
-
-    # Adaptive height based on number of batches
-    min_height = max(600, len(batches) * 120)
-    if len(batches) <= 2:
-        min_height = 400  # Kompaktere Darstellung für wenige Batches
-    
-    fig = px.timeline(df,
-                     x_start='Start',
-                     x_end='End',
-                     y='Batch',
-                     color='Dozent',
-                     hover_name='Thema',
-                     color_discrete_map=color_map,
-                     category_orders={'Batch': [b['name'] for b in sorted_batches]},
-                     height=min_height,
-                     custom_data=['ID', 'Dauer'])  # Add custom data for JavaScript interaction
-
-    # Verbesserte Lesbarkeit der Zeitachse mit Wochenenden markiert
-    fig.update_xaxes(
-        tickangle=45,
-        tickfont=dict(size=11),
-        gridcolor='rgba(0,0,0,0.05)',
-        minor_gridcolor='rgba(0,0,0,0.02)'
-    )
-
-    # Berechne Zeitbereiche
-    tick_start = df['Start'].min().normalize() - pd.Timedelta(days=df['Start'].min().weekday())
-    tick_end = df['End'].max().normalize() + pd.Timedelta(days=(7 - df['End'].max().weekday() - 1))
-    months = pd.date_range(start=tick_start, end=tick_end, freq='MS')
-    
-    # Erstelle Shapes für Monatsmarkierungen und heute-Linie
-    shapes = []
-    
-    # Monthly rectangles
-    for i, month_start in enumerate(months):
-        month_end = (month_start + pd.offsets.MonthEnd(1))
-        month_name = month_start.strftime('%b %Y')
-        shapes.append({
-            'type': 'rect',
-            'x0': month_start,
-            'x1': month_end,
-            'y0': -0.5,
-            'y1': len(batches) - 0.5,
-            'xref': 'x',
-            'yref': 'y',
-            'fillcolor': 'rgba(240,240,250,0.5)' if i % 2 == 0 else 'rgba(255,255,255,0.8)',
-            'line': {'width': 0},
-            'layer': 'below'
-        })
-        
-        # Add month name annotation
-        fig.add_annotation(
-            x=month_start + (month_end - month_start) / 2,
-            y=len(batches) - 0.2,
-            text=month_name,
-            showarrow=False,
-            font=dict(size=10, color="rgba(0,0,0,0.6)"),
-            bgcolor="rgba(255,255,255,0.7)",
-            borderpad=2
-        )
-    
-    # Add weekend highlights
-    weekends = pd.date_range(start=tick_start, end=tick_end, freq='D')
-    for weekend in weekends:
-        if weekend.weekday() >= 5:  # 5 = Saturday, 6 = Sunday
-            shapes.append({
-                'type': 'rect',
-                'x0': weekend,
-                'x1': weekend + pd.Timedelta(days=1),
-                'y0': -0.5,
-                'y1': len(batches) - 0.5,
-                'xref': 'x',
-                'yref': 'y',
-                'fillcolor': 'rgba(255,235,235,0.5)',
-                'line': {'width': 0},
-                'layer': 'below'
-            })
-
-    # Today marker with enhanced visibility
-    today = datetime.now()
-    shapes.append({
-        'type': 'line',
-        'x0': today,
-        'x1': today,
-        'y0': -0.5,
-        'y1': len(batches) - 0.5,
-        'xref': 'x',
-        'yref': 'y',
-        'line': {
-            'color': 'rgba(220,53,69,0.8)',
-            'width': 2,
-            'dash': 'solid'
-        },
-        'layer': 'above'
-    })
-    
-    # Add "Today" label
-    fig.add_annotation(
-        x=today,
-        y=-0.4,
-        text="Heute",
-        showarrow=True,
-        arrowhead=1,
-        arrowsize=1,
-        arrowwidth=2,
-        arrowcolor="rgba(220,53,69,0.8)",
-        font=dict(size=10, color="rgba(220,53,69,1)"),
-        bgcolor="white",
-        bordercolor="rgba(220,53,69,0.8)",
-        borderwidth=1,
-        borderpad=4
-    )
-
-    # Füge Verfügbarkeiten hinzu mit verbesserter Lesbarkeit
-    availabilities = Availability.query.all()
-    for availability in availabilities:
-        # Skip if outside visible range
-        if availability.end_date < tick_start or availability.start_date > tick_end:
-            continue
-            
-        availability_type = 'Urlaub' if availability.type == 'vacation' else 'Nicht verfügbar'
-        fill_color = 'rgba(255,165,0,0.15)' if availability.type == 'vacation' else 'rgba(255,0,0,0.15)'
-        line_color = 'rgba(255,165,0,0.6)' if availability.type == 'vacation' else 'rgba(255,0,0,0.6)'
-        
-        shapes.append({
-            'type': 'rect',
-            'x0': availability.start_date,
-            'x1': availability.end_date,
-            'y0': -0.5,
-            'y1': len(batches) - 0.5,
-            'xref': 'x',
-            'yref': 'y',
-            'fillcolor': fill_color,
-            'line': {'width': 1, 'color': line_color},
-            'layer': 'below',
-            'name': f"{availability.lecturer.name}: {availability_type}"
-        })
-        
-        # Add label for longer availability periods
-        if (availability.end_date - availability.start_date).days >= 3:
-            mid_point = availability.start_date + (availability.end_date - availability.start_date) / 2
-            fig.add_annotation(
-                x=mid_point,
-                y=len(batches) - 0.5,
-                text=f"{availability.lecturer.name}: {availability_type}",
-                showarrow=False,
-                font=dict(size=9, color="rgba(0,0,0,0.6)"),
-                bgcolor="rgba(255,255,255,0.7)",
-                borderpad=2,
-                opacity=0.7
-            )
-
-    # Update Layout
-    fig.update_layout(
-        shapes=shapes,
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        showlegend=True,
-        legend_title_text='<b>Dozenten</b>',
-        title={
-            'text': '<b>Lehrplan Timeline</b>',
-            'y': 0.95,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-            'font': dict(size=20, family="Arial, sans-serif")
-        },
-        margin=dict(l=200, r=150, t=100, b=50),
-        hovermode='closest'
-    )
-
-    # Optimiere Hover-Info
-    fig.update_traces(
-        hovertemplate="<b>%{hovertext}</b><br>" +
-                     "<span style='color:rgba(0,0,0,0.6)'>Zeitraum:</span> %{base|%d.%m.%Y} - %{x|%d.%m.%Y}<br>" +
-                     "<span style='color:rgba(0,0,0,0.6)'>Dauer:</span> %{customdata[1]}<br>" +
-                     "<span style='color:rgba(0,0,0,0.6)'>Dozent:</span> %{color}<extra></extra>",
-        marker=dict(line=dict(width=1, color='rgba(0,0,0,0.1)')),
-        opacity=0.9
-    )
-
-    return fig
+    """Cache für häufig abgefragte Kurssequenzen (losgelöste Snapshots, siehe cache.py)"""
+    return get_curriculum_snapshot(curriculum_id)
 
 @main.route('/')
 def index():
@@ -347,63 +70,50 @@ def upload_file():
         flash('Keine Datei ausgewählt', 'error')
         return redirect(url_for('main.index'))
 
+    if not allowed_file(file.filename):
+        flash(f"Ungültiger Dateityp. Erlaubt: {', '.join(sorted(current_app.config['ALLOWED_EXTENSIONS']))}", 'error')
+        return redirect(url_for('main.index'))
+
     try:
-        # Lese CSV ein
-        df = pd.read_csv(file)
-        
-        # Überprüfe erforderliche Spalten
-        required_columns = ['Startdatum', 'Enddatum', 'Thema']
-        if not all(col in df.columns for col in required_columns):
-            raise Exception(f"CSV muss die Spalten {', '.join(required_columns)} enthalten")
-        
         start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d')
         duplicate_count = int(request.form.get('duplicate_count', 0))
 
-        # Berechne Lehrplandauer
-        first_start = pd.to_datetime(df['Startdatum'].iloc[0], format='%d.%m.%Y')
-        last_end = pd.to_datetime(df['Enddatum'].iloc[-1], format='%d.%m.%Y')
-        duration = (last_end - first_start).days
+        # Datei auf Platte speichern, der Import läuft im Hintergrund
+        upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+        os.makedirs(upload_folder, exist_ok=True)
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        file_path = os.path.join(upload_folder, f"{uuid.uuid4()}.{extension}")
+        file.save(file_path)
 
-        # Speichere Original und Duplikate
-        save_curriculum(df, start_date)
-        for i in range(duplicate_count):
-            new_start = start_date + timedelta(days=(duration + 1) * (i + 1))
-            save_curriculum(df, new_start)
+        job_id = start_import_job(current_app._get_current_object(), file_path,
+                                  file.filename, start_date, duplicate_count)
 
-        flash('Lehrplan erfolgreich hochgeladen!', 'success')
-        return redirect(url_for('main.show_timeline'))
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({
+                'job_id': job_id,
+                'status_url': url_for('main.import_status_api', job_id=job_id)
+            }), 202
+
+        flash('Lehrplan wird importiert...', 'info')
+        return redirect(url_for('main.import_status', job_id=job_id))
 
     except Exception as e:
         flash(f'Fehler beim Upload: {str(e)}', 'error')
         return redirect(url_for('main.index'))
 
-def save_curriculum(df, start_date):
-    """Hilfsfunktion zum Speichern eines Lehrplans mit angepasstem Startdatum"""
-    # Generiere eine eindeutige ID für diesen Lehrplan
-    curriculum_id = str(uuid.uuid4())
-    
-    original_start = pd.to_datetime(df['Startdatum'].iloc[0], format='%d.%m.%Y')
-    date_diff = start_date - original_start
+@main.route('/import/<job_id>')
+def import_status(job_id):
+    """Fortschrittsanzeige für einen Lehrplan-Import"""
+    job = ImportJob.query.get_or_404(job_id)
+    return render_template('import_status.html', job=job.to_dict())
 
-    for _, row in df.iterrows():
-        new_start = pd.to_datetime(row['Startdatum'], format='%d.%m.%Y') + date_diff
-        new_end = pd.to_datetime(row['Enddatum'], format='%d.%m.%Y') + date_diff
-        
-        course = Course(
-            topic=row['Thema'],
-            start_date=new_start,
-            end_date=new_end,
-            curriculum_id=curriculum_id,
-            active=True  # Neue Kurse sind standardmäßig aktiv
-        )
-        db.session.add(course)
-    
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error saving curriculum: {str(e)}")
-        raise
+@main.route('/api/import/<job_id>')
+def import_status_api(job_id):
+    """Status eines Imports: verarbeitete Zeilen, Fehler, angelegte Lehrpläne"""
+    job = db.session.query(ImportJob).get(job_id)
+    if not job:
+        return jsonify({'error': 'Import nicht gefunden'}), 404
+    return jsonify(job.to_dict())
 
 @main.route('/add_lecturer', methods=['GET', 'POST'])
 def add_lecturer():
@@ -444,32 +154,13 @@ def assign():
     if request.method == 'POST':
         try:
             assignments = request.form.getlist('assignments[]')  # Format: "course_id:lecturer_id"
+            results = bulk_assign(parse_assignment_pairs(assignments))
             
-            for assignment in assignments:
-                if not assignment:  # Überspringe leere Zuweisungen
-                    continue
-                    
-                course_id, lecturer_id = assignment.split(':')
-                course = db.session.query(Course).get(course_id)
-                
-                if lecturer_id == "0":  # Dozent entfernen
-                    course.lecturer_id = None
-                else:
-                    # Prüfe auf Konflikte
-                    conflicting_course = db.session.query(Course).filter(
-                        Course.lecturer_id == lecturer_id,
-                        Course.id != course.id,
-                        Course.start_date < course.end_date,
-                        Course.end_date > course.start_date
-                    ).first()
-                    
-                    if conflicting_course:
-                        flash(f'Konflikt: {course.topic} überschneidet sich mit {conflicting_course.topic}', 'error')
-                        continue
-                        
-                    course.lecturer_id = lecturer_id
+            for result in results:
+                if result['status'] == 'conflict':
+                    conflict_topics = ', '.join(c['topic'] for c in result['conflicts'])
+                    flash(f'Konflikt: {result["topic"]} überschneidet sich mit {conflict_topics}', 'error')
             
-            db.session.commit()
             flash('Zuweisungen erfolgreich aktualisiert!', 'success')
             
         except Exception as e:
@@ -478,94 +169,212 @@ def assign():
             
         return redirect(url_for('main.assign'))
 
-    # Gruppiere Kurse nach curriculum_id für bessere Übersicht
-    curricula = db.session.query(
-        Course.curriculum_id,
-        db.func.min(Course.start_date).label('start_date'),
-        db.func.count(Course.id).label('course_count')
-    ).group_by(Course.curriculum_id)\
-     .order_by('start_date')\
-     .all()
+    # Lehrpläne für die Gruppierung der Kurse
+    curricula = list_curricula()
      
     courses = db.session.query(Course).order_by(Course.start_date).all()
     lecturers = db.session.query(Lecturer).all()
     
-    # Erstelle ein Dict mit allen Konflikten
-    conflicts = {}
+    # Kurse einmal vorgruppieren statt pro Lehrplan alle Kurse zu filtern
+    courses_by_curriculum = {}
     for course in courses:
-        if course.lecturer_id:
-            conflicts[course.id] = []
-            for other_course in courses:
-                if (other_course.id != course.id and 
-                    other_course.lecturer_id == course.lecturer_id and
-                    other_course.start_date < course.end_date and
-                    other_course.end_date > course.start_date):
-                    conflicts[course.id].append(other_course)
+        courses_by_curriculum.setdefault(course.curriculum_id, []).append(course)
+    
+    # Erstelle ein Dict mit allen Konflikten (Sweep-Line pro Dozent)
+    conflicts = dict(IntervalIndex.from_courses(courses).conflict_map())
     
     return render_template('assign.html', 
                          curricula=curricula,
                          courses=courses,
+                         courses_by_curriculum=courses_by_curriculum,
                          lecturers=lecturers,
                          conflicts=conflicts)
 
+@main.route('/api/assignments', methods=['POST'])
+def api_bulk_assign():
+    """Sammelzuweisung als JSON: {"assignments": [{"course_id": 1, "lecturer_id": 2}, ...]}"""
+    payload = request.get_json(silent=True) or {}
+    try:
+        pairs = parse_assignment_pairs(payload.get('assignments', []))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Ungültige Zuweisung: {str(e)}'}), 400
+    
+    try:
+        results = bulk_assign(pairs)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'accepted': sum(1 for r in results if r['status'] == 'accepted'),
+        'conflicts': sum(1 for r in results if r['status'] == 'conflict'),
+        'results': results
+    })
+
 @main.route('/timeline')
 def show_timeline():
-    courses = db.session.query(Course)\
+    has_active_courses = db.session.query(Course.id)\
         .filter(Course.active == True)\
-        .order_by(Course.curriculum_id, Course.start_date)\
-        .all()
+        .first()
 
-    if not courses:
+    if not has_active_courses:
         flash('Keine aktiven Kurse in der Timeline.', 'info')
         return redirect(url_for('main.manage_curriculum'))
 
-    # Get filter options
-    filter_options = {}
-    if request.args.get('lecturer_id'):
-        filter_options['lecturer_id'] = int(request.args.get('lecturer_id'))
-    if request.args.get('curriculum_id'):
-        filter_options['curriculum_id'] = request.args.get('curriculum_id')
-    if request.args.get('start_date') and request.args.get('end_date'):
-        start_date = datetime.strptime(request.args.get('start_date'), '%Y-%m-%d')
-        end_date = datetime.strptime(request.args.get('end_date'), '%Y-%m-%d')
-        filter_options['date_range'] = [start_date, end_date]
+    filter_options = parse_filter_options(request.args)
 
     # Get all lecturers and curricula for filter form
     lecturers = Lecturer.query.all()
-    curricula = db.session.query(
-        Course.curriculum_id,
-        db.func.min(Course.start_date).label('start_date')
-    ).filter(Course.active == True).group_by(Course.curriculum_id).all()
-
-    fig = create_timeline_figure(courses, filter_options)
+    curricula = list_curricula(active_only=True)
+
+    # Gerenderte Timeline aus dem Cache; die Version wird vor dem Laden gelesen,
+    # damit ein parallel geschriebener Stand nie unter der neuen Version landet.
+    # Das Datum gehört zum Schlüssel, weil die Figur die Heute-Linie enthält.
+    version = data_version()
+    cache_key = (filter_cache_key(filter_options), version, datetime.now().date())
+    timeline_html = timeline_cache.get(cache_key)
+
+    if timeline_html is None:
+        fig = go.Figure(figure_dict(get_timeline_model(filter_options, version)))
+        timeline_html = fig.to_html(
+            full_html=False,
+            include_plotlyjs=False,
+            config={
+                'displayModeBar': True,
+                'scrollZoom': True,
+                'modeBarButtonsToAdd': [
+                    'resetScale2d',
+                    'zoomIn2d',
+                    'zoomOut2d',
+                    'pan2d',
+                    'toImage'
+                ],
+                'displaylogo': False,
+                'toImageButtonOptions': {
+                    'format': 'svg',
+                    'filename': 'Lehrplan_Timeline',
+                    'height': 1080,
+                    'width': 1920,
+                    'scale': 2
+                }
+            }
+        )
+        if not has_uncommitted_changes():
+            timeline_cache.set(cache_key, timeline_html)
 
     return render_template('timeline.html',
-                         timeline=fig.to_html(
-                             full_html=False,
-                             include_plotlyjs=True,
-                             config={
-                                 'displayModeBar': True,
-                                 'scrollZoom': True,
-                                 'modeBarButtonsToAdd': [
-                                     'resetScale2d',
-                                     'zoomIn2d',
-                                     'zoomOut2d',
-                                     'pan2d',
-                                     'toImage'
-                                 ],
-                                 'displaylogo': False,
-                                 'toImageButtonOptions': {
-                                     'format': 'svg',
-                                     'filename': 'Lehrplan_Timeline',
-                                     'height': 1080,
-                                     'width': 1920,
-                                     'scale': 2
-                                 }
-                             }
-                         ),
+                         timeline=timeline_html,
+                         timeline_version=version,
                          lecturers=lecturers,
                          curricula=curricula)
 
+@main.route('/api/timeline')
+def api_timeline():
+    """Timeline-Figur als kompaktes JSON für ``Plotly.react``
+
+    Filter wie ``/timeline``. Mit ``view_start``/``view_end`` (sichtbarer
+    Bereich beim Zoomen) kommen die Balken dieses Bereichs in der passenden
+    Detailstufe. Mit ``since=<version>`` kommen nur die seit dieser
+    Datenversion hinzugekommenen, geänderten und entfernten Kursbalken und
+    Shapes (``full: false``); ist der alte Stand nicht mehr im Cache, die
+    ganze Figur (``full: true``).
+    """
+    try:
+        filter_options = parse_filter_options(request.args)
+        view = parse_view_range(request.args)
+        since = request.args.get('since')
+        since = int(since) if since else None
+    except ValueError as e:
+        return jsonify({'error': f'Ungültige Parameter: {str(e)}'}), 400
+
+    version = data_version()
+    etag = make_etag(version, filter_cache_key(filter_options), view, since, datetime.now().date())
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    model = get_timeline_model(filter_options, version, view)
+    previous = cached_timeline_model(filter_options, since, view) if since is not None else None
+    if previous is None:
+        result = {'version': version, 'full': True, 'figure': figure_dict(model)}
+    else:
+        result = dict(timeline_delta(previous, model), version=version, since=since, full=False)
+    return json_response(result, etag)
+
+@main.route('/api/auto-assign', methods=['POST'])
+def api_auto_assign():
+    """Vorschlag für die automatische Zuweisung (wird nicht gespeichert)
+
+    JSON: {"curriculum_id": "...", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD",
+    "lecturer_ids": [1, 2]}. Übernommen wird der Vorschlag über ``/api/assignments``
+    bzw. das Formular der Zuweisungsseite.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        start_date = payload.get('start_date')
+        end_date = payload.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
+        lecturer_ids = payload.get('lecturer_ids')
+        lecturer_ids = [int(value) for value in lecturer_ids] if lecturer_ids else None
+        result = propose_assignments(payload.get('curriculum_id') or None, start_date, end_date, lecturer_ids)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@main.route('/api/free-lecturers')
+def api_free_lecturers():
+    """Dozenten für einen Zeitraum: freie zuerst, darunter nach aktueller Last
+
+    Parameter ``course_id`` (Zeitraum des Kurses; die eigene Buchung zählt
+    nicht als belegt) und/oder ``start``/``end`` (ISO-Datum). Beantwortet aus
+    dem Frei/Belegt-Index (siehe freebusy.py), der pro Datenversion einmal
+    aufgebaut wird.
+    """
+    try:
+        course_id = request.args.get('course_id', type=int)
+        start_date = datetime.strptime(request.args['start'][:10], '%Y-%m-%d') if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'][:10], '%Y-%m-%d') if request.args.get('end') else None
+        if course_id is None and (start_date is None or end_date is None):
+            raise ValueError('course_id oder start und end angeben')
+    except ValueError as e:
+        return jsonify({'error': f'Ungültige Parameter: {str(e)}'}), 400
+
+    if start_date is None or end_date is None:
+        course = db.session.query(Course.start_date, Course.end_date).filter(Course.id == course_id).first()
+        if course is None:
+            return jsonify({'error': 'Kurs nicht gefunden'}), 404
+        start_date = start_date or course.start_date
+        end_date = end_date or course.end_date
+    if end_date < start_date:
+        return jsonify({'error': 'Ungültige Parameter: end liegt vor start'}), 400
+
+    version = data_version()
+    etag = make_etag(version, start_date.date(), end_date.date(), course_id)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    return json_response({
+        'start': start_date.strftime('%Y-%m-%d'),
+        'end': end_date.strftime('%Y-%m-%d'),
+        'course_id': course_id,
+        'lecturers': free_lecturers(start_date, end_date, course_id, version=version)
+    }, etag)
+
+@main.route('/api/cache-stats')
+def cache_stats():
+    """Treffer/Fehlzugriffe der serverseitigen Caches"""
+    return jsonify({
+        'data_version': data_version(),
+        'timeline': timeline_cache.stats(),
+        'curriculum': curriculum_cache.stats(),
+        'report': report_cache.stats(),
+        'png': png_cache.stats(),
+        'utilization': utilization_cache.stats(),
+        'freebusy': freebusy_cache.stats(),
+        'timeline_model': timeline_model_cache.stats()
+    })
+
 @main.route('/download-template')
 def download_template():
     template_content = "Thema,Startdatum,Enddatum\n" \
@@ -629,14 +438,8 @@ def duplicate_curriculum():
             flash(f'Fehler beim Duplizieren: {str(e)}', 'error')
             return redirect(url_for('main.duplicate_curriculum'))
     
-    # Hole alle unterschiedlichen Lehrpläne für die Auswahl
-    curricula = db.session.query(
-        Course.curriculum_id,
-        db.func.min(Course.start_date).label('start_date'),
-        db.func.count(Course.id).label('course_count')
-    ).group_by(Course.curriculum_id)\
-     .order_by('start_date')\
-     .all()
+    # Hole alle Lehrpläne für die Auswahl
+    curricula = list_curricula()
     
     return render_template('duplicate.html', curricula=curricula)
 
@@ -651,9 +454,7 @@ def manage_curriculum():
                 show_in_timeline = request.form.get('show_in_timeline') == 'true'
                 
                 # Aktualisiere alle Kurse des Lehrplans
-                db.session.query(Course)\
-                    .filter(Course.curriculum_id == curriculum_id)\
-                    .update({Course.active: show_in_timeline})
+                set_curriculum_active(db.session, curriculum_id, show_in_timeline)
                 
                 db.session.commit()
                 flash('Timeline-Ansicht aktualisiert!', 'success')
@@ -687,19 +488,12 @@ def manage_curriculum():
             return redirect(url_for('main.manage_curriculum'))
     
     # Gruppiere Kurse nach Lehrplan statt nach Datum
-    curricula = {}
-    courses = db.session.query(Course).order_by(Course.start_date).all()
+    curricula = batch_overview(list_curricula())
+    courses = courses_with_lecturer().order_by(Course.start_date).all()
     
     for course in courses:
-        if course.curriculum_id not in curricula:
-            start_date = course.start_date
-            curricula[course.curriculum_id] = {
-                'start_date': start_date,
-                'courses': [],
-                'active': course.active,
-                'batch_name': f"Batch {len(curricula) + 1}"
-            }
-        curricula[course.curriculum_id]['courses'].append(course)
+        if course.curriculum_id in curricula:
+            curricula[course.curriculum_id]['courses'].append(course)
     
     return render_template('manage.html', curricula=curricula)
 
@@ -738,32 +532,14 @@ def settings():
 @main.route('/export-report', methods=['GET', 'POST'])
 def export_report():
     try:
-        # Get filter parameters
-        filter_options = {}
-        if request.method == 'POST':
-            if request.form.get('lecturer_id'):
-                filter_options['lecturer_id'] = int(request.form.get('lecturer_id'))
-            if request.form.get('curriculum_id'):
-                filter_options['curriculum_id'] = request.form.get('curriculum_id')
-            if request.form.get('start_date') and request.form.get('end_date'):
-                start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d')
-                end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d')
-                filter_options['date_range'] = [start_date, end_date]
-            
-            report_type = request.form.get('report_type', 'standard')
-            include_statistics = request.form.get('include_statistics') == 'on'
-            include_availabilities = request.form.get('include_availabilities') == 'on'
-        else:
-            report_type = request.args.get('report_type', 'standard')
-            include_statistics = request.args.get('include_statistics') == 'true'
-            include_availabilities = request.args.get('include_availabilities') == 'true'
+        options = parse_report_options(request)
         
         # Debug logging
-        current_app.logger.info(f"Export report requested - Type: {report_type}, Stats: {include_statistics}, Avail: {include_availabilities}")
-        current_app.logger.info(f"Filter options: {filter_options}")
+        current_app.logger.info(f"Export report requested - Type: {options.report_type}, Stats: {options.include_statistics}, Avail: {options.include_availabilities}")
+        current_app.logger.info(f"Filter options: {options.filter_options}")
         
         # Check for wkhtmltopdf
-        wkhtmltopdf_path = os.environ.get('WKHTMLTOPDF_PATH', r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe')
+        wkhtmltopdf_path = reports.wkhtmltopdf_path()
         current_app.logger.info(f"Using wkhtmltopdf path: {wkhtmltopdf_path}")
         
         if not os.path.exists(wkhtmltopdf_path):
@@ -772,8 +548,8 @@ def export_report():
             flash(error_msg, 'error')
             return redirect(url_for('main.show_timeline'))
             
-        try:    
-        config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
+        try:
+            config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
             current_app.logger.info("PDF configuration created successfully")
         except Exception as config_error:
             error_msg = f"Fehler bei der Konfiguration von pdfkit: {str(config_error)}"
@@ -781,182 +557,25 @@ def export_report():
             flash(error_msg, 'error')
             return redirect(url_for('main.show_timeline'))
         
-        # Hole aktive Kurse basierend auf den Filteroptionen
-        query = db.session.query(Course).filter(Course.active == True)
-        
-        if filter_options.get('lecturer_id'):
-            query = query.filter(Course.lecturer_id == filter_options['lecturer_id'])
-        
-        if filter_options.get('curriculum_id'):
-            query = query.filter(Course.curriculum_id == filter_options['curriculum_id'])
-            
-        if filter_options.get('date_range'):
-            start_date, end_date = filter_options['date_range']
-            query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
-            
-        courses = query.order_by(Course.curriculum_id, Course.start_date).all()
-        current_app.logger.info(f"Found {len(courses)} courses matching filter criteria")
-        
-        if not courses:
-            flash('Keine Kurse gefunden, die den Filterkriterien entsprechen.', 'warning')
-            return redirect(url_for('main.show_timeline'))
-
-        # Statistikdaten sammeln, wenn gewünscht
-        statistics_data = {}
-        if include_statistics:
-            # Kursstatistiken
-            total_days = 0
-            course_count = len(courses)
-            for course in courses:
-                delta = (course.end_date - course.start_date).days
-                total_days += delta if delta > 0 else 1
-            
-            avg_duration = round(total_days / course_count, 1) if course_count > 0 else 0
-            
-            # Dozentenstatistiken
-            lecturer_stats = {}
-            for course in courses:
-                if course.lecturer_id and course.lecturer:
-                    lecturer_id = course.lecturer_id
-                    if lecturer_id not in lecturer_stats:
-                        lecturer_stats[lecturer_id] = {
-                            'name': course.lecturer.name,
-                            'color': course.lecturer.color or '#808080',
-                            'course_count': 0,
-                            'total_days': 0
-                        }
-                    
-                    lecturer_stats[lecturer_id]['course_count'] += 1
-                    lecturer_stats[lecturer_id]['total_days'] += (course.end_date - course.start_date).days + 1
-            
-            # Sortiere nach Gesamttagen (absteigend)
-            top_lecturers = sorted(
-                lecturer_stats.values(), 
-                key=lambda x: x['total_days'], 
-                reverse=True
-            )[:5]  # Top 5 Dozenten
-            
-            # Kursthemenstatistiken
-            topic_stats = {}
-            for course in courses:
-                if course.topic not in topic_stats:
-                    topic_stats[course.topic] = 0
-                topic_stats[course.topic] += 1
-            
-            # Sortiere nach Häufigkeit (absteigend)
-            top_topics = sorted(
-                [{'topic': topic, 'count': count} for topic, count in topic_stats.items()],
-                key=lambda x: x['count'],
-                reverse=True
-            )[:5]  # Top 5 Themen
-            
-            statistics_data = {
-                'course_count': course_count,
-                'avg_duration': avg_duration,
-                'total_days': total_days,
-                'top_lecturers': top_lecturers,
-                'top_topics': top_topics
-            }
-        
-        # Verfügbarkeiten
-        availabilities = []
-        if include_availabilities:
-            # Alle relevanten Verfügbarkeiten finden
-            all_lecturers = set()
-            for course in courses:
-                if course.lecturer_id:
-                    all_lecturers.add(course.lecturer_id)
-            
-            # Zeitbereich bestimmen
-            min_date = min([course.start_date for course in courses])
-            max_date = max([course.end_date for course in courses])
-            
-            # Verfügbarkeiten abfragen
-            availabilities = db.session.query(Availability)\
-                .filter(Availability.lecturer_id.in_(all_lecturers))\
-                .filter(Availability.end_date >= min_date, Availability.start_date <= max_date)\
-                .order_by(Availability.start_date)\
-                .all()
-
-        # Erstelle Timeline-Bild
+        # Kurse, Statistiken, Verfügbarkeiten und Timeline-Bild (gecacht)
         try:
-        fig = create_timeline_figure(courses, filter_options)
-            # Reduce image quality to avoid rendering issues with wkhtmltopdf
-            timeline_img = fig.to_image(format="png", width=1000, height=500, scale=1.5)
-        import base64
-        timeline_image = base64.b64encode(timeline_img).decode('utf-8')
-            current_app.logger.info("Timeline image created successfully")
-        except Exception as img_error:
-            error_msg = f"Fehler beim Erstellen des Timeline-Bildes: {str(img_error)}"
+            data = get_report_data(options.filter_options)
+        except Exception as data_error:
+            error_msg = f"Fehler beim Erstellen der Berichtsdaten: {str(data_error)}"
             current_app.logger.error(error_msg)
             flash(error_msg, 'error')
             return redirect(url_for('main.show_timeline'))
-
-        # Organisiere Kurse nach Batches
-        batches = []
-        current_batch = None
         
-        # Zuerst nach curriculum_id gruppieren
-        curriculum_courses = {}
-        for course in courses:
-            if course.curriculum_id not in curriculum_courses:
-                curriculum_courses[course.curriculum_id] = []
-            curriculum_courses[course.curriculum_id].append(course)
+        current_app.logger.info(f"Found {len(data.courses)} courses matching filter criteria")
         
-        # Dann nach Startdatum des ersten Kurses sortieren
-        sorted_curriculum_ids = sorted(
-            curriculum_courses.keys(),
-            key=lambda cid: min([c.start_date for c in curriculum_courses[cid]])
-        )
-        
-        # Batches erstellen
-        for i, curriculum_id in enumerate(sorted_curriculum_ids):
-            first_course = min(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            
-            # Batch-Name formatieren
-            semester = "SoSe" if first_course.start_date.month >= 3 and first_course.start_date.month <= 8 else "WiSe"
-            year = first_course.start_date.year
-            
-            batches.append({
-                'curriculum_id': curriculum_id,
-                'name': f"Batch {i + 1} ({semester} {year})",
-                'start_date': first_course.start_date,
-                'courses': sorted(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            })
-
-        # Wähle das richtige Template basierend auf dem Berichtstyp
-        try:
-        if report_type == 'lecturer':
-            report_template_path = 'pdf_templates/lecturer_report.html'
-        elif report_type == 'curriculum':
-            report_template_path = 'pdf_templates/curriculum_report.html'
-        else:
-            report_template_path = 'pdf_templates/standard_report.html'
-
-        # Stelle sicher, dass die Verzeichnisse existieren
-        pdf_template_dir = os.path.join(current_app.root_path, 'templates', 'pdf_templates')
-        os.makedirs(pdf_template_dir, exist_ok=True)
-            current_app.logger.info(f"Template directory created at: {pdf_template_dir}")
+        if not data.courses:
+            flash('Keine Kurse gefunden, die den Filterkriterien entsprechen.', 'warning')
+            return redirect(url_for('main.show_timeline'))
 
-        # Wähle das Standard-Template, wenn die spezielle Vorlage nicht existiert
-        report_template_path = os.path.join(current_app.root_path, 'templates', report_template_path)
-            current_app.logger.info(f"Attempting to load template from: {report_template_path}")
-            
-        if not os.path.exists(report_template_path):
-            report_template_path = os.path.join(current_app.root_path, 'templates', 'pdf_templates/standard_report.html')
-                current_app.logger.info(f"Falling back to standard template: {report_template_path}")
-                
-            if not os.path.exists(report_template_path):
-                # Erstelle das Standard-Template, wenn es nicht existiert
-                    current_app.logger.info("Standard template not found, creating it")
-                    os.makedirs(os.path.dirname(report_template_path), exist_ok=True)
-                with open(report_template_path, 'w', encoding='utf-8') as f:
-                    f.write(get_standard_report_template())
-
-            # Lese Template-Inhalt
-        with open(report_template_path, 'r', encoding='utf-8') as f:
-            report_template = f.read()
-                current_app.logger.info(f"Template loaded, size: {len(report_template)} bytes")
+        # Lade das Template passend zum Berichtstyp
+        try:
+            report_template = load_report_template(options.report_type)
+            current_app.logger.info(f"Template loaded, size: {len(report_template)} bytes")
         except Exception as template_error:
             error_msg = f"Fehler beim Laden des Templates: {str(template_error)}"
             current_app.logger.error(error_msg)
@@ -965,22 +584,8 @@ def export_report():
 
         # Rendere Template
         try:
-        template = Template(report_template)
-            current_app.logger.info("Template object created")
-            
-            render_context = {
-                'current_date': datetime.now().strftime('%d.%m.%Y'),
-                'timeline_image': timeline_image,
-                'batches': batches,
-                'statistics': statistics_data,
-                'availabilities': availabilities,
-                'include_statistics': include_statistics,
-                'include_availabilities': include_availabilities,
-                'report_type': report_type
-            }
-            current_app.logger.info(f"Rendering template with context (image size: {len(timeline_image)} bytes)")
-            
-            html_content = template.render(**render_context)
+            template = Template(report_template)
+            html_content = template.render(**report_context(data, options))
             current_app.logger.info(f"Template rendered, HTML size: {len(html_content)} bytes")
         except Exception as render_error:
             error_msg = f"Fehler beim Rendern des Templates: {str(render_error)}"
@@ -989,23 +594,7 @@ def export_report():
             return redirect(url_for('main.show_timeline'))
 
         # PDF-Optionen
-        pdf_options = {
-            'page-size': 'A4',
-            'margin-top': '20mm',
-            'margin-right': '20mm',
-            'margin-bottom': '20mm',
-            'margin-left': '20mm',
-            'encoding': 'UTF-8',
-            'title': 'Lehrplan Bericht',
-            'footer-right': '[page]/[topage]',
-            'footer-left': f'Erstellt am {datetime.now().strftime("%d.%m.%Y")}',
-            'footer-font-size': '8',
-            'header-html': '',
-            'footer-line': '',
-            'disable-smart-shrinking': '',  # This helps with image rendering
-            'no-stop-slow-scripts': '',     # Prevent timeout on complex scripts
-            'quiet': ''
-        }
+        pdf_options = reports.wkhtmltopdf_options()
 
         # Convert to PDF with configuration
         try:
@@ -1026,13 +615,13 @@ def export_report():
             except Exception as file_error:
                 current_app.logger.warning(f"File-based PDF generation failed: {str(file_error)}. Trying string method...")
                 # Fall back to string-based conversion
-        pdf = pdfkit.from_string(html_content, False, options=pdf_options, configuration=config)
+                pdf = pdfkit.from_string(html_content, False, options=pdf_options, configuration=config)
                 current_app.logger.info("PDF generated successfully from string")
             
             # Clean up temporary file
             try:
                 os.unlink(temp_html_path)
-            except:
+            except OSError:
                 pass
                 
         except Exception as pdf_error:
@@ -1043,31 +632,17 @@ def export_report():
 
         # Send PDF
         try:
-        pdf_io = BytesIO(pdf)
-        pdf_io.seek(0)
-        
-            # Generate filename based on filter options
-        filename_parts = ['Lehrplan_Bericht']
-        if filter_options.get('lecturer_id'):
-            lecturer = Lecturer.query.get(filter_options['lecturer_id'])
-            if lecturer:
-                filename_parts.append(f"Dozent_{lecturer.name.replace(' ', '_')}")
-        
-        if filter_options.get('curriculum_id'):
-            filename_parts.append(f"Batch_{filter_options['curriculum_id'][:8]}")
+            pdf_io = BytesIO(pdf)
+            pdf_io.seek(0)
             
-        if filter_options.get('date_range'):
-            start, end = filter_options['date_range']
-            filename_parts.append(f"{start.strftime('%Y%m%d')}-{end.strftime('%Y%m%d')}")
-            
-        filename = '_'.join(filename_parts) + '.pdf'
+            filename = data.filename_stem + '.pdf'
             current_app.logger.info(f"Sending PDF with filename: {filename}")
-        
-        return send_file(
-            pdf_io,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
+            
+            return send_file(
+                pdf_io,
+                download_name=filename,
+                mimetype='application/pdf'
+            )
         except Exception as send_error:
             error_msg = f"Fehler beim Senden des PDFs: {str(send_error)}"
             current_app.logger.error(error_msg)
@@ -1087,185 +662,16 @@ def export_report_html():
     This can help diagnose if the issue is with pdfkit or with the template rendering.
     """
     try:
-        # Get filter parameters
-        filter_options = {}
-        if request.method == 'POST':
-            if request.form.get('lecturer_id'):
-                filter_options['lecturer_id'] = int(request.form.get('lecturer_id'))
-            if request.form.get('curriculum_id'):
-                filter_options['curriculum_id'] = request.form.get('curriculum_id')
-            if request.form.get('start_date') and request.form.get('end_date'):
-                start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d')
-                end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d')
-                filter_options['date_range'] = [start_date, end_date]
-            
-            report_type = request.form.get('report_type', 'standard')
-            include_statistics = request.form.get('include_statistics') == 'on'
-            include_availabilities = request.form.get('include_availabilities') == 'on'
-        else:
-            report_type = request.args.get('report_type', 'standard')
-            include_statistics = request.args.get('include_statistics') == 'true'
-            include_availabilities = request.args.get('include_availabilities') == 'true'
+        options = parse_report_options(request)
+        data = get_report_data(options.filter_options)
         
-        # Hole aktive Kurse basierend auf den Filteroptionen
-        query = db.session.query(Course).filter(Course.active == True)
-        
-        if filter_options.get('lecturer_id'):
-            query = query.filter(Course.lecturer_id == filter_options['lecturer_id'])
-        
-        if filter_options.get('curriculum_id'):
-            query = query.filter(Course.curriculum_id == filter_options['curriculum_id'])
-            
-        if filter_options.get('date_range'):
-            start_date, end_date = filter_options['date_range']
-            query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
-            
-        courses = query.order_by(Course.curriculum_id, Course.start_date).all()
-        
-        if not courses:
+        if not data.courses:
             flash('Keine Kurse gefunden, die den Filterkriterien entsprechen.', 'warning')
             return redirect(url_for('main.show_timeline'))
 
-        # Statistikdaten sammeln, wenn gewünscht
-        statistics_data = {}
-        if include_statistics:
-            # Kursstatistiken
-            total_days = sum([(course.end_date - course.start_date).days + 1 for course in courses])
-            avg_duration = round(total_days / len(courses), 1) if courses else 0
-            statistics_data = {
-                'course_count': len(courses),
-                'total_days': total_days,
-                'avg_duration': avg_duration
-            }
-            
-            # Top-Dozenten
-            lecturer_stats = {}
-            for course in courses:
-                if course.lecturer:
-                    if course.lecturer.id not in lecturer_stats:
-                        lecturer_stats[course.lecturer.id] = {
-                            'name': course.lecturer.name,
-                            'color': course.lecturer.color or '#808080',
-                            'course_count': 0,
-                            'total_days': 0
-                        }
-                    lecturer_stats[course.lecturer.id]['course_count'] += 1
-                    lecturer_stats[course.lecturer.id]['total_days'] += (course.end_date - course.start_date).days + 1
-            
-            statistics_data['top_lecturers'] = sorted(
-                lecturer_stats.values(),
-                key=lambda x: x['total_days'],
-                reverse=True
-            )[:5]  # Top 5 Dozenten
-            
-            # Häufigste Themen
-            topic_counts = {}
-            for course in courses:
-                topic = course.topic
-                if topic not in topic_counts:
-                    topic_counts[topic] = 0
-                topic_counts[topic] += 1
-            
-            statistics_data['top_topics'] = [
-                {'topic': topic, 'count': count}
-                for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)
-            ][:5]  # Top 5 Themen
-        
-        # Verfügbarkeiten sammeln, wenn gewünscht
-        availabilities = []
-        if include_availabilities:
-            # Finde alle beteiligten Dozenten
-            all_lecturers = set()
-            for course in courses:
-                if course.lecturer_id:
-                    all_lecturers.add(course.lecturer_id)
-            
-            # Finde den Gesamtzeitraum
-            min_date = min([course.start_date for course in courses])
-            max_date = max([course.end_date for course in courses])
-            
-            # Verfügbarkeiten abfragen
-            availabilities = db.session.query(Availability)\
-                .filter(Availability.lecturer_id.in_(all_lecturers))\
-                .filter(Availability.end_date >= min_date, Availability.start_date <= max_date)\
-                .order_by(Availability.start_date)\
-                .all()
-
-        # Create timeline image
-        fig = create_timeline_figure(courses, filter_options)
-        timeline_img = fig.to_image(format="png", width=1200, height=600, scale=2)
-        import base64
-        timeline_image = base64.b64encode(timeline_img).decode('utf-8')
-
-        # Organize courses by batches
-        batches = []
-        current_batch = None
-        
-        # First group by curriculum_id
-        curriculum_courses = {}
-        for course in courses:
-            if course.curriculum_id not in curriculum_courses:
-                curriculum_courses[course.curriculum_id] = []
-            curriculum_courses[course.curriculum_id].append(course)
-        
-        # Then sort by start date of first course
-        sorted_curriculum_ids = sorted(
-            curriculum_courses.keys(),
-            key=lambda cid: min([c.start_date for c in curriculum_courses[cid]])
-        )
-        
-        # Create batches
-        for i, curriculum_id in enumerate(sorted_curriculum_ids):
-            first_course = min(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            
-            # Format batch name
-            semester = "SoSe" if first_course.start_date.month >= 3 and first_course.start_date.month <= 8 else "WiSe"
-            year = first_course.start_date.year
-            
-            batches.append({
-                'curriculum_id': curriculum_id,
-                'name': f"Batch {i + 1} ({semester} {year})",
-                'start_date': first_course.start_date,
-                'courses': sorted(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            })
-
-        # Select the correct template based on report type
-        if report_type == 'lecturer':
-            report_template_path = 'pdf_templates/lecturer_report.html'
-        elif report_type == 'curriculum':
-            report_template_path = 'pdf_templates/curriculum_report.html'
-        else:
-            report_template_path = 'pdf_templates/standard_report.html'
-
-        # Ensure directories exist
-        pdf_template_dir = os.path.join(current_app.root_path, 'templates', 'pdf_templates')
-        os.makedirs(pdf_template_dir, exist_ok=True)
-
-        # Use standard template if special one doesn't exist
-        report_template_path = os.path.join(current_app.root_path, 'templates', report_template_path)
-        if not os.path.exists(report_template_path):
-            report_template_path = os.path.join(current_app.root_path, 'templates', 'pdf_templates/standard_report.html')
-            if not os.path.exists(report_template_path):
-                # Create standard template if it doesn't exist
-                with open(report_template_path, 'w', encoding='utf-8') as f:
-                    f.write(get_standard_report_template())
-
-        # Read template
-        with open(report_template_path, 'r', encoding='utf-8') as f:
-            report_template = f.read()
-
         # Render template
-        template = Template(report_template)
-        html_content = template.render(
-            current_date=datetime.now().strftime('%d.%m.%Y'),
-            timeline_image=timeline_image,
-            batches=batches,
-            statistics=statistics_data,
-            availabilities=availabilities,
-            include_statistics=include_statistics,
-            include_availabilities=include_availabilities,
-            report_type=report_type
-        )
+        template = Template(load_report_template(options.report_type))
+        html_content = template.render(**report_context(data, options))
 
         # Return HTML directly instead of converting to PDF
         return html_content
@@ -1576,6 +982,18 @@ def get_standard_report_template():
     </html>
     """
 
+def batch_overview(curricula):
+    """Dict ``curriculum_id -> Anzeigedaten`` in der Reihenfolge der Lehrpläne"""
+    overview = {}
+    for i, curriculum in enumerate(curricula):
+        overview[curriculum.id] = {
+            'start_date': curriculum.start_date,
+            'courses': [],
+            'active': curriculum.active,
+            'batch_name': curriculum.name or f"Batch {i + 1}"
+        }
+    return overview
+
 def format_batch_name(counter, start_date):
     """Konsistente Batch-Namensgebung"""
     semester = "SoSe" if start_date.month >= 3 and start_date.month <= 8 else "WiSe"
@@ -1639,12 +1057,12 @@ def manage_lecturers():
                     return redirect(url_for('main.manage_lecturers'))
                 
                 # Prüfe auf Konflikte, falls gewünscht
-                if check_conflicts:
+                if check_conflicts and lecturer_id:
                     conflicts = Course.query.filter(
                         Course.lecturer_id == lecturer_id,
                         Course.start_date <= end_date,
                         Course.end_date >= start_date
-                    ).all()
+                    ).order_by(Course.start_date).all()
                     
                     if conflicts:
                         conflict_info = ', '.join([f'"{c.topic}" ({c.start_date.strftime("%d.%m.%Y")})' for c in conflicts[:3]])
@@ -1702,82 +1120,34 @@ def manage_lecturers():
 
 @main.route('/calendar')
 def calendar_view():
-    """Kalenderansicht für Kurse und Dozentenverfügbarkeiten"""
-    # Hole aktive Kurse
-    courses = db.session.query(Course)\
-        .filter(Course.active == True)\
-        .all()
-    
-    # Hole Verfügbarkeiten
-    availabilities = Availability.query.all()
-    
+    """Kalenderansicht für Kurse und Dozentenverfügbarkeiten
+
+    Die Ereignisse lädt FullCalendar pro sichtbarem Zeitraum über ``/api/events``.
+    """
     # Dozenten für Filterung
     lecturers = Lecturer.query.all()
-    
-    # Konvertiere zu JSON für Kalender
-    events = []
-    
-    # Füge Kurse hinzu
-    for course in courses:
-        lecturer_name = course.lecturer.name if course.lecturer else 'Nicht zugewiesen'
-        lecturer_color = course.lecturer.color if course.lecturer else '#808080'
-        
-        events.append({
-            'id': f'course_{course.id}',
-            'title': f'{course.topic} ({lecturer_name})',
-            'start': course.start_date.strftime('%Y-%m-%d'),
-            'end': (course.end_date + timedelta(days=1)).strftime('%Y-%m-%d'),  # FullCalendar verwendet nicht-inklusive Enddaten
-            'color': lecturer_color,
-            'textColor': '#fff',
-            'type': 'course',
-            'url': f'/manage#course-{course.id}',
-            'extendedProps': {
-                'course_id': course.id,
-                'lecturer_id': course.lecturer_id,
-                'lecturer_name': lecturer_name,
-                'topic': course.topic
-            }
-        })
-    
-    # Füge Verfügbarkeiten hinzu
-    for availability in availabilities:
-        if availability.type == 'vacation':
-            color = 'rgba(255,165,0,0.5)'
-            title = f'{availability.lecturer.name}: Urlaub'
-            icon = 'fas fa-umbrella-beach'
-        else:
-            color = 'rgba(255,0,0,0.5)'
-            title = f'{availability.lecturer.name}: Nicht verfügbar'
-            icon = 'fas fa-ban'
-            
-        if availability.note:
-            title += f' - {availability.note}'
-            
-        events.append({
-            'id': f'availability_{availability.id}',
-            'title': title,
-            'start': availability.start_date.strftime('%Y-%m-%d'),
-            'end': (availability.end_date + timedelta(days=1)).strftime('%Y-%m-%d'),
-            'color': color,
-            'textColor': '#000',
-            'type': 'availability',
-            'classNames': ['availability-event'],
-            'extendedProps': {
-                'availability_id': availability.id,
-                'lecturer_id': availability.lecturer_id,
-                'lecturer_name': availability.lecturer.name,
-                'icon': icon,
-                'note': availability.note
-            }
-        })
-        
-    return render_template('calendar.html', 
-                          events=events, 
-                          lecturers=lecturers)
+    return render_template('calendar.html', lecturers=lecturers)
+
+@main.route('/api/events')
+def api_events():
+    """Ereignisse im Fenster ``start``..``end`` (exklusiv) als FullCalendar-Eventquelle"""
+    lecturer_id = request.args.get('lecturer_id', type=int)
+    types = request.args.get('types')
+    types = tuple(t for t in types.split(',') if t in EVENT_TYPES) if types else EVENT_TYPES
+    try:
+        start_date, end_date = parse_window(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': f'Ungültiger Zeitraum: {str(e)}'}), 400
+
+    etag = make_etag(data_version(), start_date, end_date, lecturer_id, types)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    return json_response(calendar_events(start_date, end_date, lecturer_id, types), etag)
 
 @main.route('/calendar/ical')
 def calendar_ical():
-    """Export des Kalenders als iCalendar-Datei"""
+    """Export des Kalenders als iCalendar-Datei (gestreamt, mit ETag/Last-Modified)"""
     # Filter options
     lecturer_id = request.args.get('lecturer_id', type=int)
     event_type = request.args.get('event_type')  # 'course' oder 'availability'
@@ -1791,101 +1161,26 @@ def calendar_ical():
     if end_date:
         end_date = datetime.strptime(end_date, '%Y-%m-%d')
     
-    # Erstelle iCalendar
-    cal = Calendar()
-    cal.add('prodid', '-//Lehrplan-Timeline-System//DE')
-    cal.add('version', '2.0')
-    cal.add('calscale', 'GREGORIAN')
-    cal.add('method', 'PUBLISH')
-    cal.add('X-WR-CALNAME', 'Lehrplan-Kalender')
-    cal.add('X-WR-TIMEZONE', 'Europe/Berlin')
-    
-    # Hole Kurse und Verfügbarkeiten basierend auf den Filtern
-    courses_query = db.session.query(Course).filter(Course.active == True)
-    availabilities_query = db.session.query(Availability)
-    
-    if lecturer_id:
-        courses_query = courses_query.filter(Course.lecturer_id == lecturer_id)
-        availabilities_query = availabilities_query.filter(Availability.lecturer_id == lecturer_id)
-    
-    if curriculum_id:
-        courses_query = courses_query.filter(Course.curriculum_id == curriculum_id)
-    
-    if start_date and end_date:
-        courses_query = courses_query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
-        availabilities_query = availabilities_query.filter(Availability.end_date >= start_date, Availability.start_date <= end_date)
+    # Abonnement eines Dozenten: vorberechneten Feed ausliefern
+    if lecturer_id and not (event_type or curriculum_id or start_date or end_date):
+        return lecturer_feed(lecturer_id)
+    
+    # Unveränderte Daten: Client-Kopie ist aktuell
+    version, modified = data_version_modified()
+    etag = make_etag(version, lecturer_id, event_type, curriculum_id, start_date, end_date)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.last_modified = modified
+        return response
     
-    # Füge Kurse zum Kalender hinzu
+    # Kurse und Verfügbarkeiten werden erst beim Streamen gelesen
+    courses = ()
+    availabilities = ()
     if event_type is None or event_type == 'course':
-        courses = courses_query.all()
-        
-        for course in courses:
-            event = Event()
-            
-            lecturer_name = course.lecturer.name if course.lecturer else 'Nicht zugewiesen'
-            
-            event.add('summary', f'{course.topic} ({lecturer_name})')
-            event.add('dtstart', course.start_date.date())
-            # iCalendar end date ist exklusiv, daher +1 Tag
-            event.add('dtend', (course.end_date + timedelta(days=1)).date())
-            event.add('dtstamp', datetime.now())
-            event.add('uid', f'course-{course.id}@lehrplan-timeline.de')
-            
-            # Füge Beschreibung mit Details hinzu
-            description = f'Kurs: {course.topic}\n'
-            description += f'Dozent: {lecturer_name}\n'
-            description += f'Zeitraum: {course.start_date.strftime("%d.%m.%Y")} bis {course.end_date.strftime("%d.%m.%Y")}\n'
-            description += f'Dauer: {(course.end_date - course.start_date).days + 1} Tage\n'
-            event.add('description', description)
-            
-            # Kategorie
-            event.add('categories', 'Kurs')
-            
-            # Farbe basierend auf Dozent (wird nicht von allen Kalendern unterstützt)
-            if course.lecturer and course.lecturer.color:
-                event['X-APPLE-CALENDAR-COLOR'] = course.lecturer.color
-                event['X-MICROSOFT-CDO-BUSYSTATUS'] = 'BUSY'
-            
-            cal.add_component(event)
-    
-    # Füge Verfügbarkeiten zum Kalender hinzu
+        courses = course_rows(lecturer_id, curriculum_id, start_date, end_date)
     if event_type is None or event_type == 'availability':
-        availabilities = availabilities_query.all()
-        
-        for availability in availabilities:
-            event = Event()
-            
-            if availability.type == 'vacation':
-                title = f'{availability.lecturer.name}: Urlaub'
-                categories = 'Urlaub'
-                transp = 'TRANSPARENT'  # Zeigt als "frei" an
-            else:
-                title = f'{availability.lecturer.name}: Nicht verfügbar'
-                categories = 'Nicht verfügbar'
-                transp = 'OPAQUE'  # Zeigt als "beschäftigt" an
-            
-            if availability.note:
-                title += f' - {availability.note}'
-            
-            event.add('summary', title)
-            event.add('dtstart', availability.start_date.date())
-            # iCalendar end date ist exklusiv, daher +1 Tag
-            event.add('dtend', (availability.end_date + timedelta(days=1)).date())
-            event.add('dtstamp', datetime.now())
-            event.add('uid', f'availability-{availability.id}@lehrplan-timeline.de')
-            
-            # Beschreibung
-            description = f'Typ: {categories}\n'
-            description += f'Dozent: {availability.lecturer.name}\n'
-            if availability.note:
-                description += f'Notiz: {availability.note}\n'
-            event.add('description', description)
-            
-            # Kategorie
-            event.add('categories', categories)
-            event.add('transp', transp)
-            
-            cal.add_component(event)
+        availabilities = availability_rows(lecturer_id, start_date, end_date)
     
     # Generiere Dateinamen basierend auf Filtern
     filename_parts = ['lehrplan_kalender']
@@ -1905,10 +1200,37 @@ def calendar_ical():
     
     filename = '_'.join(filename_parts) + '.ics'
     
-    response = Response(cal.to_ical(), mimetype='text/calendar')
+    # Der Request-Kontext (und damit die Session) bleibt bis zum letzten Block erhalten
+    response = Response(
+        stream_with_context(iter_calendar(courses, availabilities, modified)),
+        mimetype='text/calendar'
+    )
     response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.set_etag(etag)
+    response.last_modified = modified
     return response
 
+def _send_feed(kind, feed_id, filename):
+    feed = get_feed(current_app._get_current_object(), kind, feed_id)
+    if feed is None:
+        return jsonify({'error': 'Kalender nicht gefunden'}), 404
+    path, etag = feed
+    response = send_file(path, mimetype='text/calendar', conditional=True, etag=etag,
+                         as_attachment=True, download_name=filename)
+    # Clients sollen bei jedem Abruf nachfragen, bekommen aber meist ein 304
+    response.cache_control.no_cache = True
+    return response
+
+@main.route('/calendar/feeds/lecturer/<int:lecturer_id>.ics')
+def lecturer_feed(lecturer_id):
+    """Abonnierbarer Feed eines Dozenten (Kurse und Verfügbarkeiten)"""
+    return _send_feed('lecturer', lecturer_id, f'lehrplan_kalender_dozent_{lecturer_id}.ics')
+
+@main.route('/calendar/feeds/curriculum/<curriculum_id>.ics')
+def curriculum_feed(curriculum_id):
+    """Abonnierbarer Feed eines Lehrplans (aktive Kurse)"""
+    return _send_feed('curriculum', curriculum_id, f'lehrplan_{curriculum_id[:8]}.ics')
+
 @main.route('/calendar/event/<int:event_id>/ical')
 def event_ical(event_id):
     """Export eines einzelnen Kurses als iCalendar-Datei"""
@@ -1988,132 +1310,38 @@ def event_ical(event_id):
 @main.route('/statistics')
 def statistics_dashboard():
     """Statistik-Dashboard mit Analysen zu Dozenten, Kursen und Zeitplanung"""
-    # Basisstatistiken
-    active_courses = Course.query.filter(Course.active == True).all()
-    course_count = len(active_courses)
-    lecturer_count = Lecturer.query.count()
-    curriculum_count = db.session.query(Course.curriculum_id).distinct().count()
-    
-    # Durchschnittliche Kursdauer berechnen
-    total_days = 0
-    for course in active_courses:
-        if course.start_date and course.end_date:
-            delta = (course.end_date - course.start_date).days
-            total_days += delta if delta > 0 else 1
-    
-    avg_duration = round(total_days / course_count, 1) if course_count > 0 else 0
-    
-    # Dozenten-Auslastung (Top 10)
-    lecturer_workload = db.session.query(
-        Lecturer.id, 
-        Lecturer.name,
-        Lecturer.color,
-        func.count(Course.id).label('course_count'),
-        func.sum(
-            func.julianday(Course.end_date) - func.julianday(Course.start_date)
-        ).label('total_days')
-    ).outerjoin(Course, Course.lecturer_id == Lecturer.id)\
-     .filter(Course.active == True)\
-     .group_by(Lecturer.id)\
-     .order_by(db.desc('total_days'))\
-     .limit(10)\
-     .all()
-    
-    # Kursthemen-Verteilung (Top 10)
-    topics = db.session.query(
-        Course.topic,
-        func.count(Course.id).label('count')
-    ).filter(Course.active == True)\
-     .group_by(Course.topic)\
-     .order_by(db.desc('count'))\
-     .limit(10)\
-     .all()
-    
-    # Zeitliche Verteilung der Kurse (Kurse pro Monat)
-    now = datetime.now()
-    six_months_ago = now - timedelta(days=180)
-    six_months_future = now + timedelta(days=180)
-    
-    # Kurse nach Monat gruppieren
-    monthly_courses = db.session.query(
-        func.strftime('%Y-%m', Course.start_date).label('month'),
-        func.count().label('count')
-    ).filter(Course.active == True)\
-     .filter(Course.start_date.between(six_months_ago, six_months_future))\
-     .group_by('month')\
-     .order_by('month')\
-     .all()
-    
-    months = []
-    course_counts = []
-    for month, count in monthly_courses:
-        if month:
-            year, month_num = month.split('-')
-            month_name = datetime(int(year), int(month_num), 1).strftime('%b %Y')
-            months.append(month_name)
-            course_counts.append(count)
-    
-    # Kursverteilung nach Wochentagen
-    weekday_counts = db.session.query(
-        func.strftime('%w', Course.start_date).label('weekday'),
-        func.count().label('count')
-    ).filter(Course.active == True)\
-     .group_by('weekday')\
-     .all()
-    
-    weekdays = ['Sonntag', 'Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag']
-    weekday_data = [0] * 7  # Initialize with zeros for all weekdays
-    
-    for weekday, count in weekday_counts:
-        if weekday:
-            day_index = int(weekday)
-            weekday_data[day_index] = count
-    
-    # Kursdauer-Verteilung
-    duration_bins = [1, 3, 5, 7, 14, 30, 60, 90, 180]
-    durations = ['1-2', '3-4', '5-6', '7-13', '14-29', '30-59', '60-89', '90+']
-    duration_counts = [0] * len(durations)
-    
-    for course in active_courses:
-        if course.start_date and course.end_date:
-            days = (course.end_date - course.start_date).days
-            days = max(1, days)  # Ensure minimum of 1 day
-            
-            for i, bin_value in enumerate(duration_bins):
-                if i == len(duration_bins) - 1:  # Last bin
-                    if days >= bin_value:
-                        duration_counts[i] += 1
-                elif days < duration_bins[i + 1]:
-                    duration_counts[i] += 1
-                    break
-    
-    # Dozenten mit den meisten Verfügbarkeitseinträgen
-    lecturers_with_availabilities = db.session.query(
-        Lecturer.id,
-        Lecturer.name,
-        func.count(Availability.id).label('availability_count')
-    ).join(Availability, Availability.lecturer_id == Lecturer.id)\
-     .group_by(Lecturer.id)\
-     .order_by(db.desc('availability_count'))\
-     .limit(5)\
-     .all()
-    
-    return render_template(
-        'statistics.html',
-        course_count=course_count,
-        lecturer_count=lecturer_count,
-        curriculum_count=curriculum_count,
-        avg_duration=avg_duration,
-        lecturer_workload=lecturer_workload,
-        topics=topics,
-        months=months,
-        course_counts=course_counts,
-        weekdays=weekdays,
-        weekday_data=weekday_data,
-        durations=durations,
-        duration_counts=duration_counts,
-        lecturers_with_availabilities=lecturers_with_availabilities
-    ) 
+    return render_template('statistics.html', **dashboard_statistics())
+
+@main.route('/api/utilization')
+def api_utilization():
+    """Auslastung pro Dozent und Woche (Tagesraster, siehe utilization.py)
+
+    Parameter ``start``/``end`` (ISO-Datum, Standard: aktuelle Woche plus
+    ``DEFAULT_WEEKS`` Wochen) und optional ``lecturer_id`` (kommagetrennt).
+    """
+    try:
+        today = datetime.now()
+        start_date = datetime.strptime(request.args['start'][:10], '%Y-%m-%d') if request.args.get('start') else today
+        end_date = datetime.strptime(request.args['end'][:10], '%Y-%m-%d') if request.args.get('end') \
+            else start_date + timedelta(weeks=DEFAULT_WEEKS) - timedelta(days=1)
+        if end_date < start_date:
+            raise ValueError('end liegt vor start')
+        lecturer_ids = request.args.get('lecturer_id')
+        lecturer_ids = [int(value) for value in lecturer_ids.split(',') if value] if lecturer_ids else None
+    except ValueError as e:
+        return jsonify({'error': f'Ungültige Parameter: {str(e)}'}), 400
+
+    working_days = working_day_numbers()
+    version = data_version()
+    etag = make_etag(version, start_date.date(), end_date.date(), lecturer_ids, working_days)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    try:
+        result = utilization(start_date, end_date, lecturer_ids, working_days=working_days, version=version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return json_response(result, etag)
 
 @main.route('/create_curriculum', methods=['GET', 'POST'])
 def create_curriculum():
@@ -2148,16 +1376,11 @@ def create_curriculum():
                 )
                 db.session.add(course)
             
-            db.session.commit()
-            
-            # Speichere den Namen als Einstellung
-            setting_key = f"curriculum_name_{curriculum_id}"
-            setting = Settings.query.filter_by(key=setting_key).first()
-            if setting:
-                setting.value = curriculum_name
-            else:
-                setting = Settings(key=setting_key, value=curriculum_name)
-                db.session.add(setting)
+            # Der Flush legt den Lehrplan an, danach den Namen setzen
+            db.session.flush()
+            curriculum = db.session.query(Curriculum).get(curriculum_id)
+            if curriculum:
+                curriculum.name = curriculum_name
             
             db.session.commit()
             
@@ -2212,19 +1435,8 @@ def add_course():
             flash(f'Fehler beim Hinzufügen des Kurses: {str(e)}', 'error')
             return redirect(url_for('main.add_course'))
     
-    # Hole alle unterschiedlichen Lehrpläne für die Auswahl
-    curricula = {}
-    courses = db.session.query(Course).order_by(Course.start_date).all()
-    
-    for course in courses:
-        if course.curriculum_id not in curricula:
-            curricula[course.curriculum_id] = {
-                'start_date': course.start_date,
-                'courses': [],
-                'active': course.active,
-                'batch_name': f"Batch {len(curricula) + 1}"
-            }
-        curricula[course.curriculum_id]['courses'].append(course)
+    # Hole alle Lehrpläne für die Auswahl
+    curricula = batch_overview(list_curricula())
     
     # Hole alle Dozenten
     lecturers = Lecturer.query.all()
@@ -2238,161 +1450,14 @@ def export_report_download():
     This bypasses wkhtmltopdf completely.
     """
     try:
-        # Get filter parameters
-        filter_options = {}
-        if request.method == 'POST':
-            if request.form.get('lecturer_id'):
-                filter_options['lecturer_id'] = int(request.form.get('lecturer_id'))
-            if request.form.get('curriculum_id'):
-                filter_options['curriculum_id'] = request.form.get('curriculum_id')
-            if request.form.get('start_date') and request.form.get('end_date'):
-                start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d')
-                end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d')
-                filter_options['date_range'] = [start_date, end_date]
-            
-            report_type = request.form.get('report_type', 'standard')
-            include_statistics = request.form.get('include_statistics') == 'on'
-            include_availabilities = request.form.get('include_availabilities') == 'on'
-        else:
-            report_type = request.args.get('report_type', 'standard')
-            include_statistics = request.args.get('include_statistics') == 'true'
-            include_availabilities = request.args.get('include_availabilities') == 'true'
-        
-        # Hole aktive Kurse basierend auf den Filteroptionen
-        query = db.session.query(Course).filter(Course.active == True)
-        
-        if filter_options.get('lecturer_id'):
-            query = query.filter(Course.lecturer_id == filter_options['lecturer_id'])
-        
-        if filter_options.get('curriculum_id'):
-            query = query.filter(Course.curriculum_id == filter_options['curriculum_id'])
-            
-        if filter_options.get('date_range'):
-            start_date, end_date = filter_options['date_range']
-            query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
-            
-        courses = query.order_by(Course.curriculum_id, Course.start_date).all()
+        options = parse_report_options(request)
+        data = get_report_data(options.filter_options)
         
-        if not courses:
+        if not data.courses:
             flash('Keine Kurse gefunden, die den Filterkriterien entsprechen.', 'warning')
             return redirect(url_for('main.show_timeline'))
 
-        # Similar preparation as in export_report_html
-        statistics_data = {}
-        if include_statistics:
-            # Compute statistics...
-            total_days = sum([(course.end_date - course.start_date).days + 1 for course in courses])
-            avg_duration = round(total_days / len(courses), 1) if courses else 0
-            statistics_data = {
-                'course_count': len(courses),
-                'total_days': total_days,
-                'avg_duration': avg_duration
-            }
-            
-            # Additional statistics calculation...
-            lecturer_stats = {}
-            for course in courses:
-                if course.lecturer:
-                    if course.lecturer.id not in lecturer_stats:
-                        lecturer_stats[course.lecturer.id] = {
-                            'name': course.lecturer.name,
-                            'color': course.lecturer.color or '#808080',
-                            'course_count': 0,
-                            'total_days': 0
-                        }
-                    lecturer_stats[course.lecturer.id]['course_count'] += 1
-                    lecturer_stats[course.lecturer.id]['total_days'] += (course.end_date - course.start_date).days + 1
-            
-            statistics_data['top_lecturers'] = sorted(
-                lecturer_stats.values(),
-                key=lambda x: x['total_days'],
-                reverse=True
-            )[:5]  # Top 5 Dozenten
-            
-            # Häufigste Themen
-            topic_counts = {}
-            for course in courses:
-                topic = course.topic
-                if topic not in topic_counts:
-                    topic_counts[topic] = 0
-                topic_counts[topic] += 1
-            
-            statistics_data['top_topics'] = [
-                {'topic': topic, 'count': count}
-                for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)
-            ][:5]  # Top 5 Themen
-        
-        # Get availabilities
-        availabilities = []
-        if include_availabilities:
-            # Find all lecturers
-            all_lecturers = set()
-            for course in courses:
-                if course.lecturer_id:
-                    all_lecturers.add(course.lecturer_id)
-            
-            # Find date range
-            min_date = min([course.start_date for course in courses])
-            max_date = max([course.end_date for course in courses])
-            
-            # Query availabilities
-            availabilities = db.session.query(Availability)\
-                .filter(Availability.lecturer_id.in_(all_lecturers))\
-                .filter(Availability.end_date >= min_date, Availability.start_date <= max_date)\
-                .order_by(Availability.start_date)\
-                .all()
-
-        # Create timeline image
-        fig = create_timeline_figure(courses, filter_options)
-        timeline_img = fig.to_image(format="png", width=1000, height=500, scale=1.5)
-        import base64
-        timeline_image = base64.b64encode(timeline_img).decode('utf-8')
-
-        # Group courses by batch
-        batches = []
-        curriculum_courses = {}
-        for course in courses:
-            if course.curriculum_id not in curriculum_courses:
-                curriculum_courses[course.curriculum_id] = []
-            curriculum_courses[course.curriculum_id].append(course)
-        
-        sorted_curriculum_ids = sorted(
-            curriculum_courses.keys(),
-            key=lambda cid: min([c.start_date for c in curriculum_courses[cid]])
-        )
-        
-        for i, curriculum_id in enumerate(sorted_curriculum_ids):
-            first_course = min(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            semester = "SoSe" if first_course.start_date.month >= 3 and first_course.start_date.month <= 8 else "WiSe"
-            year = first_course.start_date.year
-            
-            batches.append({
-                'curriculum_id': curriculum_id,
-                'name': f"Batch {i + 1} ({semester} {year})",
-                'start_date': first_course.start_date,
-                'courses': sorted(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            })
-
-        # Get template
-        if report_type == 'lecturer':
-            report_template_path = 'pdf_templates/lecturer_report.html'
-        elif report_type == 'curriculum':
-            report_template_path = 'pdf_templates/curriculum_report.html'
-        else:
-            report_template_path = 'pdf_templates/standard_report.html'
-
-        pdf_template_dir = os.path.join(current_app.root_path, 'templates', 'pdf_templates')
-        os.makedirs(pdf_template_dir, exist_ok=True)
-
-        report_template_path = os.path.join(current_app.root_path, 'templates', report_template_path)
-        if not os.path.exists(report_template_path):
-            report_template_path = os.path.join(current_app.root_path, 'templates', 'pdf_templates/standard_report.html')
-            if not os.path.exists(report_template_path):
-                with open(report_template_path, 'w', encoding='utf-8') as f:
-                    f.write(get_standard_report_template())
-
-        with open(report_template_path, 'r', encoding='utf-8') as f:
-            report_template = f.read()
+        report_template = load_report_template(options.report_type)
 
         # Add print-specific CSS for browser printing
         print_css = """
@@ -2460,32 +1525,9 @@ def export_report_download():
 
         # Render template
         template = Template(report_template)
-        html_content = template.render(
-            current_date=datetime.now().strftime('%d.%m.%Y'),
-            timeline_image=timeline_image,
-            batches=batches,
-            statistics=statistics_data,
-            availabilities=availabilities,
-            include_statistics=include_statistics,
-            include_availabilities=include_availabilities,
-            report_type=report_type
-        )
+        html_content = template.render(**report_context(data, options))
 
-        # Generate filename
-        filename_parts = ['Lehrplan_Bericht']
-        if filter_options.get('lecturer_id'):
-            lecturer = Lecturer.query.get(filter_options['lecturer_id'])
-            if lecturer:
-                filename_parts.append(f"Dozent_{lecturer.name.replace(' ', '_')}")
-        
-        if filter_options.get('curriculum_id'):
-            filename_parts.append(f"Batch_{filter_options['curriculum_id'][:8]}")
-            
-        if filter_options.get('date_range'):
-            start, end = filter_options['date_range']
-            filename_parts.append(f"{start.strftime('%Y%m%d')}-{end.strftime('%Y%m%d')}")
-            
-        filename = '_'.join(filename_parts) + '.html'
+        filename = data.filename_stem + '.html'
 
         # Return as attachment
         response = Response(html_content, mimetype='text/html')
@@ -2503,329 +1545,18 @@ def export_report_direct():
     This avoids the QPaintDevice error that occurs with wkhtmltopdf.
     """
     try:
-        # Get filter parameters - same as export_report
-        filter_options = {}
-        if request.method == 'POST':
-            if request.form.get('lecturer_id'):
-                filter_options['lecturer_id'] = int(request.form.get('lecturer_id'))
-            if request.form.get('curriculum_id'):
-                filter_options['curriculum_id'] = request.form.get('curriculum_id')
-            if request.form.get('start_date') and request.form.get('end_date'):
-                start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%d')
-                end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%d')
-                filter_options['date_range'] = [start_date, end_date]
-            
-            report_type = request.form.get('report_type', 'standard')
-            include_statistics = request.form.get('include_statistics') == 'on'
-            include_availabilities = request.form.get('include_availabilities') == 'on'
-        else:
-            report_type = request.args.get('report_type', 'standard')
-            include_statistics = request.args.get('include_statistics') == 'true'
-            include_availabilities = request.args.get('include_availabilities') == 'true'
-        
-        # Get courses based on filter options
-        query = db.session.query(Course).filter(Course.active == True)
+        options = parse_report_options(request)
+        data = get_report_data(options.filter_options)
         
-        if filter_options.get('lecturer_id'):
-            query = query.filter(Course.lecturer_id == filter_options['lecturer_id'])
-        
-        if filter_options.get('curriculum_id'):
-            query = query.filter(Course.curriculum_id == filter_options['curriculum_id'])
-            
-        if filter_options.get('date_range'):
-            start_date, end_date = filter_options['date_range']
-            query = query.filter(Course.end_date >= start_date, Course.start_date <= end_date)
-            
-        courses = query.order_by(Course.curriculum_id, Course.start_date).all()
-        
-        if not courses:
+        if not data.courses:
             flash('Keine Kurse gefunden, die den Filterkriterien entsprechen.', 'warning')
             return redirect(url_for('main.show_timeline'))
 
-        # Create statistics data
-        statistics_data = {}
-        if include_statistics:
-            total_days = sum([(course.end_date - course.start_date).days + 1 for course in courses])
-            avg_duration = round(total_days / len(courses), 1) if courses else 0
-            statistics_data = {
-                'course_count': len(courses),
-                'total_days': total_days,
-                'avg_duration': avg_duration
-            }
-            
-            # Get lecturer statistics
-            lecturer_stats = {}
-            for course in courses:
-                if course.lecturer:
-                    if course.lecturer.id not in lecturer_stats:
-                        lecturer_stats[course.lecturer.id] = {
-                            'name': course.lecturer.name,
-                            'course_count': 0,
-                            'total_days': 0
-                        }
-                    lecturer_stats[course.lecturer.id]['course_count'] += 1
-                    lecturer_stats[course.lecturer.id]['total_days'] += (course.end_date - course.start_date).days + 1
-            
-            statistics_data['top_lecturers'] = sorted(
-                lecturer_stats.values(),
-                key=lambda x: x['total_days'],
-                reverse=True
-            )[:5]
-            
-            # Get topic statistics
-            topic_counts = {}
-            for course in courses:
-                topic = course.topic
-                if topic not in topic_counts:
-                    topic_counts[topic] = 0
-                topic_counts[topic] += 1
-            
-            statistics_data['top_topics'] = [
-                {'topic': topic, 'count': count}
-                for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)
-            ][:5]
-
-        # Get availabilities if needed
-        availabilities = []
-        if include_availabilities:
-            all_lecturers = set()
-            for course in courses:
-                if course.lecturer_id:
-                    all_lecturers.add(course.lecturer_id)
-            
-            min_date = min([course.start_date for course in courses])
-            max_date = max([course.end_date for course in courses])
-            
-            availabilities = db.session.query(Availability)\
-                .filter(Availability.lecturer_id.in_(all_lecturers))\
-                .filter(Availability.end_date >= min_date, Availability.start_date <= max_date)\
-                .order_by(Availability.start_date)\
-                .all()
-
-        # Create timeline image
-        fig = create_timeline_figure(courses, filter_options)
-        timeline_img = fig.to_image(format="png", width=1000, height=500, scale=1.5)
-        
-        # Organize courses by batch
-        batches = []
-        curriculum_courses = {}
-        
-        for course in courses:
-            if course.curriculum_id not in curriculum_courses:
-                curriculum_courses[course.curriculum_id] = []
-            curriculum_courses[course.curriculum_id].append(course)
-        
-        sorted_curriculum_ids = sorted(
-            curriculum_courses.keys(),
-            key=lambda cid: min([c.start_date for c in curriculum_courses[cid]])
-        )
-        
-        for i, curriculum_id in enumerate(sorted_curriculum_ids):
-            first_course = min(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            semester = "SoSe" if first_course.start_date.month >= 3 and first_course.start_date.month <= 8 else "WiSe"
-            year = first_course.start_date.year
-            
-            batches.append({
-                'curriculum_id': curriculum_id,
-                'name': f"Batch {i + 1} ({semester} {year})",
-                'start_date': first_course.start_date,
-                'courses': sorted(curriculum_courses[curriculum_id], key=lambda c: c.start_date)
-            })
-
-        # Now use reportlab to generate PDF
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import mm
-        from io import BytesIO
-        
-        # Set up the document
+        # PDF mit ReportLab im Speicher erzeugen
         buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                               rightMargin=20*mm, leftMargin=20*mm,
-                               topMargin=20*mm, bottomMargin=20*mm)
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='Title', 
-                                 fontName='Helvetica-Bold', 
-                                 fontSize=18, 
-                                 alignment=1,  # 0=left, 1=center, 2=right
-                                 spaceAfter=6))
-        styles.add(ParagraphStyle(name='Heading2', 
-                                 fontName='Helvetica-Bold', 
-                                 fontSize=14,
-                                 spaceAfter=6))
-        styles.add(ParagraphStyle(name='Heading3', 
-                                 fontName='Helvetica-Bold', 
-                                 fontSize=12,
-                                 spaceAfter=6))
-        styles.add(ParagraphStyle(name='Normal', 
-                                 fontName='Helvetica', 
-                                 fontSize=10,
-                                 spaceAfter=6))
-        
-        # Content elements
-        elements = []
-        
-        # Title
-        elements.append(Paragraph('Lehrplan Übersicht', styles['Title']))
-        elements.append(Paragraph(f'Erstellt am {datetime.now().strftime("%d.%m.%Y")}', styles['Normal']))
-        elements.append(Spacer(1, 10*mm))
-        
-        # Timeline image
-        img_data = BytesIO(timeline_img)
-        img = Image(img_data, width=160*mm, height=80*mm)
-        elements.append(Paragraph('Timeline Übersicht', styles['Heading2']))
-        elements.append(img)
-        elements.append(Spacer(1, 5*mm))
-        
-        # Statistics if included
-        if include_statistics and statistics_data:
-            elements.append(Paragraph('Statistische Übersicht', styles['Heading2']))
-            
-            # Basic statistics
-            data = [
-                ['Anzahl Kurse', str(statistics_data['course_count'])],
-                ['Durchschnittliche Kursdauer', f"{statistics_data['avg_duration']} Tage"],
-                ['Gesamtzahl Kurstage', f"{statistics_data['total_days']} Tage"]
-            ]
-            
-            table = Table(data, colWidths=[100*mm, 50*mm])
-            table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 5*mm))
-            
-            # Top lecturers if available
-            if statistics_data.get('top_lecturers'):
-                elements.append(Paragraph('Top Dozenten', styles['Heading3']))
-                
-                lecturer_data = [['Dozent', 'Anzahl Kurse', 'Gesamttage', 'Tage/Kurs']]
-                for lecturer in statistics_data['top_lecturers']:
-                    avg = round(lecturer['total_days'] / lecturer['course_count'], 1) if lecturer['course_count'] > 0 else 0
-                    lecturer_data.append([
-                        lecturer['name'],
-                        str(lecturer['course_count']),
-                        str(lecturer['total_days']),
-                        str(avg)
-                    ])
-                
-                table = Table(lecturer_data, colWidths=[70*mm, 30*mm, 30*mm, 30*mm])
-                table.setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                elements.append(table)
-                elements.append(Spacer(1, 5*mm))
-            
-            # Top topics if available
-            if statistics_data.get('top_topics'):
-                elements.append(Paragraph('Häufigste Kursthemen', styles['Heading3']))
-                
-                topic_data = [['Thema', 'Anzahl']]
-                for topic in statistics_data['top_topics']:
-                    topic_data.append([topic['topic'], str(topic['count'])])
-                
-                table = Table(topic_data, colWidths=[130*mm, 30*mm])
-                table.setStyle(TableStyle([
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                elements.append(table)
-                elements.append(Spacer(1, 5*mm))
-        
-        # Page break before courses
-        elements.append(PageBreak())
+        write_direct_pdf(data, options, buffer)
         
-        # Course details by batch
-        elements.append(Paragraph('Detaillierte Lehrplan Informationen', styles['Heading2']))
-        
-        for batch in batches:
-            elements.append(Paragraph(f"{batch['name']} (Start: {batch['start_date'].strftime('%d.%m.%Y')})", styles['Heading3']))
-            
-            course_data = [['Thema', 'Zeitraum', 'Dauer', 'Dozent']]
-            for course in batch['courses']:
-                duration = (course.end_date - course.start_date).days + 1
-                lecturer_name = course.lecturer.name if course.lecturer else 'Nicht zugewiesen'
-                
-                course_data.append([
-                    course.topic,
-                    f"{course.start_date.strftime('%d.%m.%Y')} - {course.end_date.strftime('%d.%m.%Y')}",
-                    f"{duration} Tage",
-                    lecturer_name
-                ])
-            
-            table = Table(course_data, colWidths=[70*mm, 50*mm, 20*mm, 30*mm])
-            table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 5*mm))
-        
-        # Availabilities if included
-        if include_availabilities and availabilities:
-            # Add page break before availabilities
-            elements.append(PageBreak())
-            elements.append(Paragraph('Dozenten-Verfügbarkeiten', styles['Heading2']))
-            
-            avail_data = [['Dozent', 'Typ', 'Zeitraum', 'Dauer', 'Notiz']]
-            for avail in availabilities:
-                duration = (avail.end_date - avail.start_date).days + 1
-                avail_type = 'Urlaub' if avail.type == 'vacation' else 'Nicht verfügbar'
-                
-                avail_data.append([
-                    avail.lecturer.name,
-                    avail_type,
-                    f"{avail.start_date.strftime('%d.%m.%Y')} - {avail.end_date.strftime('%d.%m.%Y')}",
-                    f"{duration} Tage",
-                    avail.note or ''
-                ])
-            
-            table = Table(avail_data, colWidths=[40*mm, 25*mm, 45*mm, 20*mm, 40*mm])
-            table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            elements.append(table)
-        
-        # Build the PDF
-        doc.build(elements)
-        
-        # Generate filename
-        filename_parts = ['Lehrplan_Bericht']
-        if filter_options.get('lecturer_id'):
-            lecturer = Lecturer.query.get(filter_options['lecturer_id'])
-            if lecturer:
-                filename_parts.append(f"Dozent_{lecturer.name.replace(' ', '_')}")
-        
-        if filter_options.get('curriculum_id'):
-            filename_parts.append(f"Batch_{filter_options['curriculum_id'][:8]}")
-            
-        if filter_options.get('date_range'):
-            start, end = filter_options['date_range']
-            filename_parts.append(f"{start.strftime('%Y%m%d')}-{end.strftime('%Y%m%d')}")
-            
-        filename = '_'.join(filename_parts) + '.pdf'
+        filename = data.filename_stem + '.pdf'
         
         # Return the PDF
         buffer.seek(0)
@@ -2839,4 +1570,70 @@ def export_report_direct():
         error_msg = f'Fehler beim Erstellen des direkten PDF-Berichts: {str(e)}'
         current_app.logger.error(error_msg)
         flash(error_msg, 'error')
-        return redirect(url_for('main.show_timeline'))
\ No newline at end of file
+        return redirect(url_for('main.show_timeline'))
+
+@main.route('/reports', methods=['POST'])
+def create_report_job():
+    """Startet die PDF-Erzeugung im Hintergrund statt im Request"""
+    try:
+        job_id = start_report_job(current_app._get_current_object(),
+                                  report_values(request),
+                                  request.form.get('engine', 'direct'))
+    except ValueError as e:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': str(e)}), 400
+        flash(f'Ungültige Berichtsoptionen: {str(e)}', 'error')
+        return redirect(url_for('main.show_timeline'))
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('main.report_status_api', job_id=job_id),
+            'download_url': url_for('main.report_download', job_id=job_id)
+        }), 202
+
+    return redirect(url_for('main.report_status', job_id=job_id))
+
+@main.route('/reports/<job_id>')
+def report_status(job_id):
+    """Wartet auf einen Bericht und startet den Download, sobald er fertig ist"""
+    job = ReportJob.query.get_or_404(job_id)
+    return render_template('report_status.html', job=job.to_dict())
+
+@main.route('/api/reports/<job_id>')
+def report_status_api(job_id):
+    """Status eines Berichts; fertige Jobs enthalten die Download-URL"""
+    job = db.session.query(ReportJob).get(job_id)
+    if not job:
+        return jsonify({'error': 'Bericht nicht gefunden'}), 404
+    result = job.to_dict()
+    if job.status == 'done':
+        result['download_url'] = url_for('main.report_download', job_id=job_id)
+    return jsonify(result)
+
+@main.route('/reports/<job_id>/download')
+def report_download(job_id):
+    """Liefert ein fertiges PDF; die Datei ändert sich nicht mehr und ist daher cachebar"""
+    job = db.session.query(ReportJob).get(job_id)
+    if not job:
+        return jsonify({'error': 'Bericht nicht gefunden'}), 404
+    if job.status in ('queued', 'running'):
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers['Retry-After'] = '2'
+        return response
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({'error': job.error or 'Bericht nicht mehr verfügbar'}), 410
+
+    response = send_file(
+        job.file_path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=job.filename,
+        conditional=True,
+        etag=job.id,
+        max_age=current_app.config.get('REPORT_RETENTION_HOURS', 24) * 3600
+    )
+    response.cache_control.private = True
+    response.cache_control.public = False
+    return response
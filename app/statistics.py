@@ -0,0 +1,174 @@
+"""Kennzahlen für das Statistik-Dashboard und die Export-Statistik
+
+Alle Werte kommen aus den vorab verdichteten Tabellen ``lecturer_month_rollup``,
+``course_month_rollup`` und ``topic_rollup``, die ``rollups.py`` bei jedem
+Schreiben von Kursen und Abwesenheiten nachführt. Jede Abfrage liest damit
+höchstens einige hundert Zeilen, unabhängig von der Zahl der Kurse.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from . import db
+from .models import Lecturer, Curriculum, LecturerMonthRollup, CourseMonthRollup, TopicRollup
+
+# Untergrenzen der Dauer-Buckets in Tagen und ihre Beschriftung
+DURATION_BINS = [1, 3, 5, 7, 14, 30, 60, 90]
+DURATION_LABELS = ['1-2', '3-4', '5-6', '7-13', '14-29', '30-59', '60-89', '90+']
+
+WEEKDAYS = ['Sonntag', 'Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag']
+
+
+def _course_summary():
+    """Anzahl, Gesamtdauer, Dauer-Buckets und Wochentage (höchstens 8 x 7 Zeilen)"""
+    groups = db.session.query(
+        CourseMonthRollup.duration_bucket,
+        CourseMonthRollup.weekday,
+        func.sum(CourseMonthRollup.course_count),
+        func.sum(CourseMonthRollup.total_days)
+    ).group_by(CourseMonthRollup.duration_bucket, CourseMonthRollup.weekday)\
+     .all()
+
+    duration_counts = [0] * len(DURATION_BINS)
+    weekday_data = [0] * 7
+    course_count = 0
+    total_days = 0
+    for bucket_index, weekday, count, days in groups:
+        duration_counts[bucket_index] += count
+        weekday_data[weekday] += count
+        course_count += count
+        total_days += days or 0
+
+    lecturer_count, curriculum_count = db.session.query(
+        db.session.query(func.count(Lecturer.id)).scalar_subquery(),
+        db.session.query(func.count(Curriculum.id)).scalar_subquery()
+    ).one()
+
+    return {
+        'course_count': course_count,
+        'total_days': total_days,
+        'lecturer_count': lecturer_count,
+        'curriculum_count': curriculum_count,
+        'duration_counts': duration_counts,
+        'weekday_data': weekday_data,
+    }
+
+
+def lecturer_workload(limit=10, days_column=LecturerMonthRollup.booked_days, lecturer_id=None):
+    """Dozenten mit den meisten gebuchten Tagen
+
+    Parameters:
+    -----------
+    days_column : Column
+        ``booked_days`` (Dashboard, Differenz end - start) oder ``course_days``
+        (Export, Kurstage inklusive Start- und Endtag)
+    lecturer_id : int, optional
+        Nur diesen Dozenten auswerten
+    """
+    query = db.session.query(
+        Lecturer.id,
+        Lecturer.name,
+        Lecturer.color,
+        func.sum(LecturerMonthRollup.course_count).label('course_count'),
+        func.sum(days_column).label('total_days')
+    ).join(LecturerMonthRollup, LecturerMonthRollup.lecturer_id == Lecturer.id)
+    if lecturer_id is not None:
+        query = query.filter(Lecturer.id == lecturer_id)
+    return query.group_by(Lecturer.id)\
+        .having(func.sum(LecturerMonthRollup.course_count) > 0)\
+        .order_by(db.desc('total_days'), Lecturer.name)\
+        .limit(limit)\
+        .all()
+
+
+def topic_counts(limit=10, lecturer_id=None):
+    """Häufigste Kursthemen, optional nur die eines Dozenten"""
+    query = db.session.query(
+        TopicRollup.topic,
+        func.sum(TopicRollup.course_count).label('count')
+    )
+    if lecturer_id is not None:
+        query = query.filter(TopicRollup.lecturer_id == lecturer_id)
+    return query.group_by(TopicRollup.topic)\
+        .order_by(db.desc('count'), TopicRollup.topic)\
+        .limit(limit)\
+        .all()
+
+
+def monthly_course_starts(now=None, days=180):
+    """Kursstarts pro Monat für die Monate von ``now - days`` bis ``now + days``
+
+    Returns:
+    --------
+    tuple
+        ``(monatsnamen, anzahlen)``, z.B. (['Jan 2024', ...], [3, ...])
+    """
+    now = now or datetime.now()
+    first_month = (now - timedelta(days=days)).strftime('%Y-%m')
+    last_month = (now + timedelta(days=days)).strftime('%Y-%m')
+    rows = db.session.query(
+        CourseMonthRollup.month,
+        func.sum(CourseMonthRollup.course_count)
+    ).filter(CourseMonthRollup.month.between(first_month, last_month))\
+     .group_by(CourseMonthRollup.month)\
+     .order_by(CourseMonthRollup.month)\
+     .all()
+
+    months = []
+    course_counts = []
+    for month, count in rows:
+        year, month_num = month.split('-')
+        months.append(datetime(int(year), int(month_num), 1).strftime('%b %Y'))
+        course_counts.append(count)
+    return months, course_counts
+
+
+def lecturers_with_availabilities(limit=5):
+    """Dozenten mit den meisten Verfügbarkeitseinträgen"""
+    return db.session.query(
+        Lecturer.id,
+        Lecturer.name,
+        func.sum(LecturerMonthRollup.availability_count).label('availability_count')
+    ).join(LecturerMonthRollup, LecturerMonthRollup.lecturer_id == Lecturer.id)\
+     .group_by(Lecturer.id)\
+     .having(func.sum(LecturerMonthRollup.availability_count) > 0)\
+     .order_by(db.desc('availability_count'), Lecturer.name)\
+     .limit(limit)\
+     .all()
+
+
+def course_totals(lecturer_id=None):
+    """Anzahl aktiver Kurse und Kurstage (inklusive Start- und Endtag)
+
+    ``lecturer_id`` None zählt alle Kurse, auch die ohne Dozent.
+    """
+    query = db.session.query(
+        func.coalesce(func.sum(LecturerMonthRollup.course_count), 0),
+        func.coalesce(func.sum(LecturerMonthRollup.course_days), 0)
+    )
+    if lecturer_id is not None:
+        query = query.filter(LecturerMonthRollup.lecturer_id == lecturer_id)
+    return query.one()
+
+
+def dashboard_statistics():
+    """Alle Werte für ``statistics.html`` als Template-Kontext"""
+    summary = _course_summary()
+    course_count = summary['course_count']
+    months, course_counts = monthly_course_starts()
+
+    return {
+        'course_count': course_count,
+        'lecturer_count': summary['lecturer_count'],
+        'curriculum_count': summary['curriculum_count'],
+        'avg_duration': round(summary['total_days'] / course_count, 1) if course_count > 0 else 0,
+        'lecturer_workload': lecturer_workload(),
+        'topics': topic_counts(),
+        'months': months,
+        'course_counts': course_counts,
+        'weekdays': WEEKDAYS,
+        'weekday_data': summary['weekday_data'],
+        'durations': DURATION_LABELS,
+        'duration_counts': summary['duration_counts'],
+        'lecturers_with_availabilities': lecturers_with_availabilities(),
+    }
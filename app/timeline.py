@@ -0,0 +1,652 @@
+"""Timeline-Figur als kompaktes, schlüsselbasiertes Modell
+
+Die Figur wird nicht mehr direkt mit ``px.timeline`` gebaut, sondern aus
+einem Modell mit stabilen Schlüsseln:
+
+* ``bars``: ein Eintrag pro Kurs (Schlüssel: Kurs-ID) als kurze Liste
+  ``[id, dozent, start, dauer_ms, batch, thema, dauer_text]``
+* ``shapes``: Hintergrund (Monatsbänder und Wochenenden als je eine
+  Pfad-Shape) und Heute-Linie, Schlüssel im ``name`` der Shape
+  (z.B. ``'weekends'``)
+* ``traces``: Vorlagen der Balken-Traces (eine pro Dozent) ohne Datenpunkte
+* ``lanes``: Abwesenheiten als fertige Traces (eine pro Art) auf einer
+  eigenen y-Achse unter den Batches, eine Zeile pro Dozent
+* ``layout``: restliches Layout ohne Shapes
+
+``figure_dict()`` setzt daraus die Plotly-Figur zusammen (Seite, API und
+Berichte), ``timeline_delta()`` vergleicht zwei Modelle und liefert nur
+hinzugekommene, geänderte und entfernte Balken und Shapes.
+
+Detailstufen: Umfasst der sichtbare Zeitraum mehr als ``DETAIL_DAYS`` oder
+wären es mehr als ``MAX_BARS`` Balken, werden die Kurse zusammengefasst
+(``'week'``: ein Balken pro Batch, Dozent und Woche; ``'batch'``: ein Balken
+pro Batch). Beim Zoomen lädt die Seite über ``/api/timeline?view_start=&view_end=``
+die Kurse des sichtbaren Bereichs nach (per SQL auf den Bereich beschränkt,
+unbeschränkt nur eine Zeile pro Lehrplan für die Batches); ``layout.meta``
+nennt Detailstufe und geladenen Bereich.
+"""
+from datetime import datetime, timedelta
+
+import plotly.graph_objects as go
+
+from .queries import active_courses, active_course_extents, availability_rows
+from .cache import LRUCache, data_version, filter_cache_key, has_uncommitted_changes
+
+UNASSIGNED = 'Nicht zugewiesen'
+
+HOVER_TEMPLATE = "<b>%{hovertext}</b><br>" + \
+                 "<span style='color:rgba(0,0,0,0.6)'>Zeitraum:</span> %{base|%d.%m.%Y} - %{x|%d.%m.%Y}<br>" + \
+                 "<span style='color:rgba(0,0,0,0.6)'>Dauer:</span> %{customdata[1]}<br>" + \
+                 "<span style='color:rgba(0,0,0,0.6)'>Dozent:</span> %{fullData.name}<extra></extra>"
+
+# Abwesenheiten: Art -> (Bezeichnung, Farbe); Höhe einer Dozentenzeile in px
+AVAILABILITY_TYPES = {
+    'vacation': ('Urlaub', 'rgba(255,165,0,0.6)'),
+    'unavailable': ('Nicht verfügbar', 'rgba(255,0,0,0.6)'),
+}
+LANE_HEIGHT = 16
+
+# Einzelne Kurse bis etwa sechs Monate sichtbarem Zeitraum, darüber zusammengefasst
+DETAIL_DAYS = 6 * 31
+# Obergrenze für Balken pro Figur, unabhängig von der Datenmenge
+MAX_BARS = 1000
+LEVELS = ('course', 'week', 'batch')
+COLLAPSED = 'Mehrere Dozenten'
+
+# Timeline-Modelle, Schlüssel: (Filter, Bereich, Datenversion, Tag); ältere Versionen
+# bleiben für Deltas (``/api/timeline?since=``) eine Weile erhalten
+timeline_model_cache = LRUCache(maxsize=32)
+
+
+def _iso(value):
+    """Datum kompakt für Plotly (ohne Uhrzeit, wenn Mitternacht)"""
+    if value.hour or value.minute or value.second:
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value.strftime('%Y-%m-%d')
+
+
+def _milliseconds(delta):
+    return int(delta.total_seconds() * 1000)
+
+
+def parse_filter_options(args):
+    """Filteroptionen aus den Query-Parametern der Timeline
+
+    Raises:
+    -------
+    ValueError
+        Bei ungültigen Zahlen oder Datumsangaben
+    """
+    filter_options = {}
+    if args.get('lecturer_id'):
+        filter_options['lecturer_id'] = int(args.get('lecturer_id'))
+    if args.get('curriculum_id'):
+        filter_options['curriculum_id'] = args.get('curriculum_id')
+    if args.get('start_date') and args.get('end_date'):
+        start_date = datetime.strptime(args.get('start_date'), '%Y-%m-%d')
+        end_date = datetime.strptime(args.get('end_date'), '%Y-%m-%d')
+        filter_options['date_range'] = [start_date, end_date]
+    return filter_options
+
+
+def parse_view_range(args):
+    """Sichtbarer Bereich aus ``view_start``/``view_end``, auf ganze Wochen erweitert
+
+    Returns:
+    --------
+    tuple or None
+        ``(montag, montag)``, Ende exklusiv; None ohne Angabe
+
+    Raises:
+    -------
+    ValueError
+        Bei ungültigen Datumsangaben oder leerem Bereich
+    """
+    if not (args.get('view_start') and args.get('view_end')):
+        return None
+    start = datetime.strptime(args.get('view_start'), '%Y-%m-%d')
+    end = datetime.strptime(args.get('view_end'), '%Y-%m-%d')
+    if end < start:
+        raise ValueError('view_end liegt vor view_start')
+    start -= timedelta(days=start.weekday())
+    end += timedelta(days=7 - end.weekday())
+    return start, end
+
+
+def filter_courses(courses, filter_options):
+    """Wendet die Filteroptionen auf bereits geladene Kurse an"""
+    if not filter_options:
+        return list(courses)
+    filtered_courses = []
+    for course in courses:
+        if filter_options.get('lecturer_id') and course.lecturer_id != filter_options['lecturer_id']:
+            continue
+        if filter_options.get('date_range'):
+            start_date, end_date = filter_options['date_range']
+            if course.end_date < start_date or course.start_date > end_date:
+                continue
+        if filter_options.get('curriculum_id') and course.curriculum_id != filter_options['curriculum_id']:
+            continue
+        filtered_courses.append(course)
+    return filtered_courses
+
+
+def course_extents(courses):
+    """Erster Start und letztes Ende pro Lehrplan aus geladenen Kursen
+
+    Gleiche Form wie ``active_course_extents()`` für Kurslisten ohne Abfrage.
+    """
+    extents = {}
+    for course in courses:
+        start, end = extents.get(course.curriculum_id, (course.start_date, course.end_date))
+        extents[course.curriculum_id] = (min(start, course.start_date), max(end, course.end_date))
+    return extents
+
+
+def _batches(extents):
+    """Lehrpläne nach erstem Kursstart mit Batch-Namen
+
+    Returns:
+    --------
+    list
+        ``(curriculum_id, batch_name)`` in Anzeigereihenfolge
+    """
+    batches = []
+    ordered = sorted(extents.items(), key=lambda item: item[1][0])
+    for batch_counter, (curriculum_id, (batch_start, _)) in enumerate(ordered, start=1):
+        semester = "WS" if batch_start.month > 6 else "SS"
+        name = f"Batch {batch_counter} ({semester} {batch_start.year}, Start: {batch_start.strftime('%d.%m.%Y')})"
+        batches.append((curriculum_id, name))
+    return batches
+
+
+def timeline_ranges(extents, filter_options=None, view=None):
+    """Sichtbarer und geladener Bereich der Timeline
+
+    Der Zeitraum der Daten wird auf ganze Wochen und den Datumsfilter
+    beschnitten. Geladen wird der sichtbare Bereich mit Rand, damit kleines
+    Verschieben nichts nachladen muss.
+
+    Returns:
+    --------
+    tuple
+        ``(visible_start, visible_end, view_start, view_end)``, geladen wird
+        ``[view_start, view_end)``
+    """
+    first_start = min(start for start, _ in extents.values())
+    last_end = max(end for _, end in extents.values())
+    window_start = _day(first_start) - timedelta(days=first_start.weekday())
+    window_end = _day(last_end) + timedelta(days=7 - last_end.weekday())
+    date_range = (filter_options or {}).get('date_range')
+    if date_range:
+        window_start = max(window_start, _day(date_range[0]))
+        window_end = min(window_end, _day(date_range[1]) + timedelta(days=1))
+
+    visible_start, visible_end = window_start, window_end
+    if view and max(view[0], window_start) < min(view[1], window_end):
+        visible_start, visible_end = max(view[0], window_start), min(view[1], window_end)
+    span_days = (visible_end - visible_start).days
+    margin = timedelta(days=7 * (span_days // 14)) if view else timedelta(0)
+    view_start = max(visible_start - margin, window_start)
+    view_end = min(visible_end + margin, window_end)
+    return visible_start, visible_end, view_start, view_end
+
+
+def _empty_model():
+    return {
+        'layout': {
+            'title': {'text': "Keine Kurse gefunden - Bitte passen Sie die Filter an"},
+            'height': 400,
+            'annotations': [{
+                'text': "Keine Kurse für die aktuellen Filtereinstellungen gefunden",
+                'showarrow': False,
+                'font': {'size': 16},
+                'xref': 'paper',
+                'yref': 'paper',
+                'x': 0.5,
+                'y': 0.5
+            }]
+        },
+        'traces': [],
+        'bars': {},
+        'shapes': {},
+        'lanes': [],
+    }
+
+
+def _trace_template(name, color):
+    return {
+        'type': 'bar',
+        'orientation': 'h',
+        'name': name,
+        'legendgroup': name,
+        'showlegend': True,
+        'marker': {'color': color, 'line': {'width': 1, 'color': 'rgba(0,0,0,0.1)'}},
+        'opacity': 0.9,
+        'hovertemplate': HOVER_TEMPLATE,
+    }
+
+
+def _lecturer_trace(traces, course):
+    """Name des Dozenten-Traces, legt die Vorlage bei Bedarf an"""
+    lecturer_name = course.lecturer.name if course.lecturer else UNASSIGNED
+    if lecturer_name not in traces:
+        color = (course.lecturer.color if course.lecturer else None) or '#808080'
+        traces[lecturer_name] = _trace_template(lecturer_name, color)
+    return lecturer_name
+
+
+def _bar(key, trace_name, start_date, end_date, batch_name, text):
+    duration_days = (end_date - start_date).days + 1
+    return [key, trace_name, _iso(start_date), _milliseconds(end_date - start_date),
+            batch_name, text, f"{duration_days} Tage"]
+
+
+def _summary_text(group):
+    topics = [course.topic for course in group[:3]]
+    if len(group) > 3:
+        topics.append('…')
+    return f"{len(group)} Kurse: {', '.join(topics)}"
+
+
+def _course_bars(batches, traces):
+    bars = {}
+    for batch_name, curriculum_courses in batches:
+        for course in curriculum_courses:
+            lecturer_name = _lecturer_trace(traces, course)
+            bars[course.id] = _bar(course.id, lecturer_name, course.start_date, course.end_date,
+                                   batch_name, course.topic)
+    return bars
+
+
+def _week_bars(batches, traces):
+    """Ein Balken pro Batch, Dozent und Startwoche; Einzelkurse bleiben Kurse"""
+    bars = {}
+    for batch_name, curriculum_courses in batches:
+        groups = {}
+        for course in curriculum_courses:
+            week = _day(course.start_date) - timedelta(days=course.start_date.weekday())
+            groups.setdefault((course.lecturer_id, week), []).append(course)
+        for (lecturer_id, week), group in groups.items():
+            if len(group) == 1:
+                bars.update(_course_bars([(batch_name, group)], traces))
+                continue
+            lecturer_name = _lecturer_trace(traces, group[0])
+            key = f"week:{group[0].curriculum_id}:{lecturer_id or 0}:{week.strftime('%Y-%m-%d')}"
+            bars[key] = _bar(key, lecturer_name, min(course.start_date for course in group),
+                             max(course.end_date for course in group), batch_name, _summary_text(group))
+    return bars
+
+
+def _batch_bars(batches, traces):
+    """Ein Balken pro Batch, in der Farbe des Dozenten, wenn es nur einen gibt"""
+    bars = {}
+    for batch_name, curriculum_courses in batches:
+        lecturer_ids = {course.lecturer_id for course in curriculum_courses}
+        if len(lecturer_ids) == 1:
+            trace_name = _lecturer_trace(traces, curriculum_courses[0])
+        else:
+            trace_name = COLLAPSED
+            traces.setdefault(COLLAPSED, _trace_template(COLLAPSED, '#6c757d'))
+        key = f"batch:{curriculum_courses[0].curriculum_id}"
+        bars[key] = _bar(key, trace_name, min(course.start_date for course in curriculum_courses),
+                         max(course.end_date for course in curriculum_courses), batch_name,
+                         f"{_summary_text(curriculum_courses)} ({len(lecturer_ids)} Dozenten)")
+    return bars
+
+
+BAR_BUILDERS = {'course': _course_bars, 'week': _week_bars, 'batch': _batch_bars}
+
+
+def _day(value):
+    return datetime(value.year, value.month, value.day)
+
+
+def _add_bands(shapes, key, bands, fillcolor):
+    """Viele ganzhohe Rechtecke ``[(start, ende), ...]`` als eine Pfad-Shape"""
+    if not bands:
+        return
+    shapes[key] = {
+        'type': 'path',
+        'name': key,
+        'path': ''.join(f'M{_iso(start)},0H{_iso(end)}V1H{_iso(start)}Z' for start, end in bands),
+        'xref': 'x',
+        'yref': 'paper',
+        'fillcolor': fillcolor,
+        'line': {'width': 0},
+        'layer': 'below'
+    }
+
+
+def availability_lanes(availabilities):
+    """Abwesenheiten als Balken-Traces auf ``y2``, eine Zeile pro Dozent
+
+    Parameters:
+    -----------
+    availabilities : iterable
+        Zeilen wie aus ``queries.availability_rows()`` (mit ``lecturer_name``)
+
+    Returns:
+    --------
+    tuple
+        ``(traces, dozentennamen)``; Balken bis einschließlich Enddatum
+    """
+    lanes = {}
+    names = set()
+    for availability in availabilities:
+        label, color = AVAILABILITY_TYPES.get(availability.type, AVAILABILITY_TYPES['unavailable'])
+        lane = lanes.get(label)
+        if lane is None:
+            lane = lanes[label] = {
+                'type': 'bar',
+                'orientation': 'h',
+                'name': label,
+                'legendgroup': 'availability',
+                'yaxis': 'y2',
+                'marker': {'color': color},
+                'hovertemplate': "<b>%{y}</b>: " + label +
+                                 "<br>%{base|%d.%m.%Y}, %{customdata} Tage<extra></extra>",
+                'base': [], 'x': [], 'y': [], 'customdata': [],
+            }
+        days = (availability.end_date - availability.start_date).days + 1
+        lane['base'].append(_iso(availability.start_date))
+        lane['x'].append(days * 86400000)
+        lane['y'].append(availability.lecturer_name)
+        lane['customdata'].append(days)
+        names.add(availability.lecturer_name)
+    return [lanes[label] for label in sorted(lanes)], sorted(names)
+
+
+def timeline_model(courses, filter_options=None, availabilities=None, today=None, view=None, level=None,
+                   extents=None):
+    """Baut das Timeline-Modell aus Kursen (mit geladenem ``lecturer``)
+
+    Parameters:
+    -----------
+    courses : list
+        Kursobjekte; werden zusätzlich mit ``filter_options`` gefiltert
+    filter_options : dict, optional
+        Filteroptionen, z.B. {'lecturer_id': 1, 'date_range': [start_date, end_date]}
+    availabilities : list, optional
+        Abwesenheiten wie aus ``availability_rows()`` (Standard: die der
+        Dozenten sichtbarer Kurse im geladenen Bereich)
+    today : datetime, optional
+        Position der Heute-Linie
+    view : tuple, optional
+        Sichtbarer Bereich ``(start, ende)`` (siehe ``parse_view_range()``);
+        geladen wird er mit einem Rand von einer halben Breite je Seite
+    level : str, optional
+        Feste Detailstufe aus ``LEVELS`` (Standard: nach Zeitraum und Anzahl)
+    extents : dict, optional
+        Erster Start und letztes Ende pro Lehrplan wie aus
+        ``active_course_extents()``, wenn ``courses`` nur den geladenen Bereich
+        enthält (Standard: aus ``courses``)
+    """
+    courses = filter_courses(courses, filter_options)
+    if extents is None:
+        extents = course_extents(courses)
+    if not extents:
+        return _empty_model()
+
+    # Batches (Zeilen) immer aus allen gefilterten Lehrplänen, damit Namen und
+    # Reihenfolge beim Zoomen gleich bleiben
+    batches = _batches(extents)
+
+    # Adaptive height based on number of batches
+    min_height = max(600, len(batches) * 120)
+    if len(batches) <= 2:
+        min_height = 400  # Kompaktere Darstellung für wenige Batches
+
+    # Shapes, Beschriftungen und Balken außerhalb des geladenen Bereichs entfallen
+    visible_start, visible_end, view_start, view_end = timeline_ranges(extents, filter_options, view)
+    span_days = (visible_end - visible_start).days
+    date_range = (filter_options or {}).get('date_range')
+
+    by_curriculum = {}
+    for course in courses:
+        if course.end_date >= view_start and course.start_date < view_end:
+            by_curriculum.setdefault(course.curriculum_id, []).append(course)
+    visible_batches = [(batch_name, by_curriculum[curriculum_id])
+                       for curriculum_id, batch_name in batches if curriculum_id in by_curriculum]
+
+    # Feinste Detailstufe, die zum Zeitraum passt und unter MAX_BARS bleibt
+    levels = [level] if level else LEVELS[0 if span_days <= DETAIL_DAYS else 1:]
+    for level in levels:
+        traces = {}
+        bars = BAR_BUILDERS[level](visible_batches, traces)
+        if len(bars) <= MAX_BARS:
+            break
+
+    shapes = {}
+    annotations = []
+
+    # Monatsbänder im Wechsel als je ein Pfad (statt einer Shape pro Monat)
+    month_bands = ([], [])
+    month_start = datetime(view_start.year, view_start.month, 1)
+    while month_start < view_end:
+        month_end = datetime(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+        month_bands[month_start.month % 2].append((max(month_start, view_start), min(month_end, view_end)))
+        annotations.append({
+            'x': _iso(month_start + (month_end - month_start) / 2),
+            'y': 1,
+            'xref': 'x',
+            'yref': 'paper',
+            'yanchor': 'top',
+            'text': month_start.strftime('%b %Y'),
+            'showarrow': False,
+            'font': {'size': 10, 'color': "rgba(0,0,0,0.6)"},
+            'bgcolor': "rgba(255,255,255,0.7)",
+            'borderpad': 2
+        })
+        month_start = month_end
+    _add_bands(shapes, 'months-odd', month_bands[1], 'rgba(240,240,250,0.5)')
+    _add_bands(shapes, 'months-even', month_bands[0], 'rgba(255,255,255,0.8)')
+
+    # Wochenenden: Samstag und Sonntag als ein Rechteck, alle in einem Pfad
+    weekend_bands = []
+    saturday = view_start - timedelta(days=(view_start.weekday() - 5) % 7)
+    while saturday < view_end:
+        start, end = max(saturday, view_start), min(saturday + timedelta(days=2), view_end)
+        if start < end:
+            weekend_bands.append((start, end))
+        saturday += timedelta(days=7)
+    _add_bands(shapes, 'weekends', weekend_bands, 'rgba(255,235,235,0.5)')
+
+    # Abwesenheiten der Dozenten sichtbarer Kurse im geladenen Bereich, als
+    # eigene Zeilen unter den Batches
+    if availabilities is None:
+        lecturer_ids = {course.lecturer_id for _, group in visible_batches for course in group}
+        lecturer_ids.discard(None)
+        availabilities = availability_rows(
+            start_date=view_start, end_date=view_end, lecturer_ids=sorted(lecturer_ids)
+        ) if lecturer_ids else []
+    else:
+        availabilities = [availability for availability in availabilities
+                          if availability.end_date >= view_start and availability.start_date < view_end]
+    lanes, lane_names = availability_lanes(availabilities)
+    lane_height = LANE_HEIGHT * len(lane_names) + 30 if lane_names else 0
+
+    # Today marker with enhanced visibility
+    today = today or datetime.now()
+    if view_start <= today < view_end:
+        shapes['today'] = {
+            'type': 'line',
+            'name': 'today',
+            'x0': _iso(today),
+            'x1': _iso(today),
+            'y0': 0,
+            'y1': 1,
+            'xref': 'x',
+            'yref': 'paper',
+            'line': {'color': 'rgba(220,53,69,0.8)', 'width': 2, 'dash': 'solid'},
+            'layer': 'above'
+        }
+        annotations.append({
+            'x': _iso(today),
+            'y': 0,
+            'xref': 'x',
+            'yref': 'paper',
+            'text': "Heute",
+            'showarrow': True,
+            'arrowhead': 1,
+            'arrowsize': 1,
+            'arrowwidth': 2,
+            'arrowcolor': "rgba(220,53,69,0.8)",
+            'font': {'size': 10, 'color': "rgba(220,53,69,1)"},
+            'bgcolor': "white",
+            'bordercolor': "rgba(220,53,69,0.8)",
+            'borderwidth': 1,
+            'borderpad': 4
+        })
+
+    layout = {
+        'height': min_height + lane_height,
+        'barmode': 'overlay',
+        'meta': {
+            'detail': level,
+            'range': [_iso(view_start), _iso(view_end)],
+            # Unterhalb dieser Breite (Tage) liefert Nachladen feinere Balken
+            'refine_below': None if level == 'course' else (
+                DETAIL_DAYS if span_days > DETAIL_DAYS else span_days // 2)
+        },
+        'xaxis': {
+            'type': 'date',
+            'range': [_iso(visible_start), _iso(visible_end)] if view or date_range else None,
+            'tickangle': 45,
+            'tickfont': {'size': 11},
+            'gridcolor': 'rgba(0,0,0,0.05)',
+            'minor': {'gridcolor': 'rgba(0,0,0,0.02)'}
+        },
+        'yaxis': {
+            'title': {'text': 'Batch'},
+            'categoryorder': 'array',
+            'categoryarray': [batch_name for _, batch_name in batches]
+        },
+        'plot_bgcolor': 'white',
+        'paper_bgcolor': 'white',
+        'showlegend': True,
+        'legend': {'title': {'text': '<b>Dozenten</b>'}, 'tracegroupgap': 0},
+        'title': {
+            'text': '<b>Lehrplan Timeline</b>' if level == 'course' else
+                    '<b>Lehrplan Timeline</b><br><sup>Kurse zusammengefasst - für einzelne Kurse hineinzoomen</sup>',
+            'y': 0.95,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': {'size': 20, 'family': "Arial, sans-serif"}
+        },
+        'margin': {'l': 200, 'r': 150, 't': 100, 'b': 50},
+        'hovermode': 'closest',
+        'annotations': annotations
+    }
+    if lanes:
+        # Plotfläche ohne Ränder (t + b): oben die Batches, unten die Dozentenzeilen
+        lane_share = lane_height / (min_height + lane_height - 150)
+        layout['xaxis']['anchor'] = 'y2'
+        layout['yaxis']['domain'] = [lane_share, 1]
+        layout['yaxis2'] = {
+            'domain': [0, lane_share * 0.85],
+            'categoryorder': 'array',
+            'categoryarray': lane_names,
+            'tickfont': {'size': 10},
+            'fixedrange': True
+        }
+
+    return {
+        'layout': layout,
+        'traces': list(traces.values()),
+        'bars': bars,
+        'shapes': shapes,
+        'lanes': lanes,
+    }
+
+
+def figure_dict(model):
+    """Plotly-Figur (``data`` und ``layout``) aus einem Timeline-Modell"""
+    data = []
+    by_trace = {}
+    for template in model['traces']:
+        trace = dict(template, base=[], x=[], y=[], hovertext=[], customdata=[])
+        by_trace[template['name']] = trace
+        data.append(trace)
+    for course_id, lecturer_name, start, duration, batch_name, topic, duration_text in model['bars'].values():
+        trace = by_trace[lecturer_name]
+        trace['base'].append(start)
+        trace['x'].append(duration)
+        trace['y'].append(batch_name)
+        trace['hovertext'].append(topic)
+        trace['customdata'].append([course_id, duration_text])
+    return {
+        'data': data + model['lanes'],
+        'layout': dict(model['layout'], shapes=list(model['shapes'].values())),
+    }
+
+
+def timeline_delta(old, new):
+    """Unterschied zweier Modelle
+
+    Returns:
+    --------
+    dict
+        ``traces`` vollständig (klein), ``layout`` und ``lanes`` nur wenn
+        geändert (sonst None), dazu ``bars`` und ``shapes`` jeweils mit
+        ``upsert`` (neu oder geändert) und ``remove`` (Schlüssel)
+    """
+    def diff(old_items, new_items):
+        return {
+            'upsert': [value for key, value in new_items.items() if old_items.get(key) != value],
+            'remove': [key for key in old_items if key not in new_items],
+        }
+
+    return {
+        'layout': new['layout'] if new['layout'] != old['layout'] else None,
+        'lanes': new['lanes'] if new['lanes'] != old['lanes'] else None,
+        'traces': new['traces'],
+        'bars': diff(old['bars'], new['bars']),
+        'shapes': diff(old['shapes'], new['shapes']),
+    }
+
+
+def _model_key(filter_options, version, view):
+    return (filter_cache_key(filter_options), view, version, datetime.now().date())
+
+
+def get_timeline_model(filter_options, version=None, view=None):
+    """Timeline-Modell für die aktiven Kurse, pro Filter, Bereich und Datenversion gecacht"""
+    if version is None:
+        version = data_version()
+    key = _model_key(filter_options, version, view)
+    model = timeline_model_cache.get(key)
+    if model is None:
+        # Unbeschränkt nur die Zeile pro Lehrplan für Batches und Zeitraum,
+        # Kurse nur für den geladenen Bereich
+        extents = active_course_extents(filter_options)
+        courses = []
+        if extents:
+            _, _, view_start, view_end = timeline_ranges(extents, filter_options, view)
+            courses = active_courses(filter_options, within=(view_start, view_end)).all()
+        model = timeline_model(courses, filter_options, view=view, extents=extents)
+        if not has_uncommitted_changes():
+            timeline_model_cache.set(key, model)
+    return model
+
+
+def cached_timeline_model(filter_options, version, view=None):
+    """Früher gebautes Modell einer Version (oder None, wenn nicht mehr im Cache)"""
+    return timeline_model_cache.get(_model_key(filter_options, version, view))
+
+
+def create_timeline_figure(courses, filter_options=None, availabilities=None):
+    """Erstellt die Timeline-Figur basierend auf den Kursen
+
+    Parameters:
+    -----------
+    courses : list
+        Liste der Kursobjekte
+    filter_options : dict, optional
+        Filteroptionen, z.B. {'lecturer_id': 1, 'date_range': [start_date, end_date]}
+    availabilities : list, optional
+        Bereits geladene Abwesenheiten mit ``lecturer_name`` (sonst abgefragt)
+    """
+    # Berichte sind statisch (kein Nachladen beim Zoomen), daher alle Kurse
+    return go.Figure(figure_dict(timeline_model(courses, filter_options, availabilities, level='course')))
@@ -0,0 +1,102 @@
+"""Messung der Timeline-Figur mit synthetischen Daten (``flask benchmark-timeline``)
+
+Kurse und Abwesenheiten werden mit festem Seed ohne Datenbank erzeugt, damit
+die Zahlen auf jedem Rechner und Stand vergleichbar sind. Gemessen werden pro
+Szenario Aufbauzeit von Modell und Figur, Shapes, Annotationen, Traces,
+Balken und die Größe des Figure-JSON.
+"""
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from .timeline import timeline_model, figure_dict, parse_view_range
+
+DATA_START = datetime(2025, 1, 6)
+TODAY = datetime(2025, 6, 15)
+
+# Kurse über ``days`` Tage, reihum auf ``batches`` Lehrpläne verteilt;
+# ``date_range`` filtert, ``view`` ist der sichtbare Bereich wie beim Zoomen
+SCENARIOS = [
+    {'name': '400 Kurse, 2 Jahre', 'courses': 400, 'days': 730, 'batches': 12,
+     'lecturers': 60, 'availabilities': 600},
+    {'name': '400 Kurse, Filter 3 Monate', 'courses': 400, 'days': 730, 'batches': 12,
+     'lecturers': 60, 'availabilities': 600, 'date_range': ('2025-06-01', '2025-08-31')},
+    {'name': '5 000 Kurse, 6 Jahre', 'courses': 5000, 'days': 6 * 365, 'batches': 60,
+     'lecturers': 40, 'availabilities': 0},
+    {'name': '5 000 Kurse, Ausschnitt 2 Monate', 'courses': 5000, 'days': 6 * 365, 'batches': 60,
+     'lecturers': 40, 'availabilities': 0, 'view': ('2026-03-01', '2026-05-01')},
+    {'name': '50 000 Kurse, 8 Jahre', 'courses': 50000, 'days': 8 * 365, 'batches': 200,
+     'lecturers': 40, 'availabilities': 0},
+]
+
+
+def synthetic_data(courses, days, batches, lecturers, availabilities, seed=1):
+    """Kurse und Abwesenheiten mit den Attributen, die ``timeline_model()`` liest
+
+    Returns:
+    --------
+    tuple
+        ``(kurse, abwesenheiten)``
+    """
+    rng = random.Random(seed)
+    people = [SimpleNamespace(id=i, name=f"Dozent {i}", color='#1f77b4') for i in range(1, lecturers + 1)]
+
+    course_list = []
+    for i in range(courses):
+        start = DATA_START + timedelta(days=rng.randint(0, days))
+        lecturer = rng.choice(people)
+        course_list.append(SimpleNamespace(
+            id=i + 1, topic=f"Thema {i + 1}", start_date=start,
+            end_date=start + timedelta(days=rng.randint(0, 10)),
+            lecturer=lecturer, lecturer_id=lecturer.id, curriculum_id=f"lehrplan-{i % batches}"))
+    course_list.sort(key=lambda course: (course.curriculum_id, course.start_date))
+
+    availability_list = []
+    for i in range(availabilities):
+        start = DATA_START + timedelta(days=rng.randint(0, days))
+        lecturer = rng.choice(people)
+        availability_list.append(SimpleNamespace(
+            id=i + 1, start_date=start, end_date=start + timedelta(days=rng.randint(0, 14)),
+            type=rng.choice(['vacation', 'unavailable']), note=None,
+            lecturer=lecturer, lecturer_id=lecturer.id, lecturer_name=lecturer.name))
+    return course_list, availability_list
+
+
+def run_scenario(scenario, repeat=3):
+    """Misst ein Szenario aus ``SCENARIOS`` (beste von ``repeat`` Laufzeiten)"""
+    courses, availabilities = synthetic_data(
+        scenario['courses'], scenario['days'], scenario['batches'],
+        scenario['lecturers'], scenario['availabilities'])
+
+    filter_options = None
+    if scenario.get('date_range'):
+        filter_options = {'date_range': [datetime.fromisoformat(day) for day in scenario['date_range']]}
+    options = {}
+    if scenario.get('view'):
+        view_start, view_end = scenario['view']
+        options['view'] = parse_view_range({'view_start': view_start, 'view_end': view_end})
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        model = timeline_model(courses, filter_options, availabilities, today=TODAY, **options)
+        figure = figure_dict(model)
+        timings.append(time.perf_counter() - started)
+
+    layout = figure['layout']
+    return {
+        'name': scenario['name'],
+        'ms': min(timings) * 1000,
+        'shapes': len(layout.get('shapes') or []),
+        'annotations': len(layout.get('annotations') or []),
+        'traces': len(figure['data']),
+        'bars': len(model['bars']),
+        'json_kb': len(json.dumps(figure, separators=(',', ':'))) / 1024,
+    }
+
+
+def benchmark_timeline(repeat=3):
+    """Ergebnisse aller Szenarien aus ``SCENARIOS``"""
+    return [run_scenario(scenario, repeat) for scenario in SCENARIOS]
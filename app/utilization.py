@@ -0,0 +1,285 @@
+"""Auslastung der Dozenten als Tagesraster (NumPy)
+
+Buchungen und Abwesenheiten aller Dozenten werden über einen Planungshorizont
+in zwei kompakte Matrizen (Dozent x Tag) übertragen:
+
+* ``bookings`` (int8): Anzahl der Kurse pro Tag, ab 2 eine Doppelbuchung
+* ``blocked`` (bool): Urlaub oder nicht verfügbar
+
+Das Befüllen läuft ohne Python-Schleife über die Einträge: Start- und
+Endtage werden per ``np.add.at`` als +1/-1 in ein Differenzraster geschrieben
+und mit ``cumsum`` aufsummiert. Belegung, freie Kapazität, Überschneidungen,
+Leerlauf-Lücken und die Wochenwerte für die Heatmap sind danach reine
+Array-Operationen. Als Buchung zählt wie bei der Konfliktprüfung jeder Kurs mit
+Dozent, auch in ausgeblendeten Lehrplänen.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from . import db
+from .models import Course, Availability, Lecturer, Settings
+from .cache import LRUCache, data_version, has_uncommitted_changes
+
+DEFAULT_WEEKS = 26
+MAX_DAYS = 3 * 371  # gut drei Jahre in ganzen Wochen
+
+# Berechnete Auslastung pro (Datenversion, Horizont, Dozenten, Arbeitstage)
+utilization_cache = LRUCache(maxsize=16)
+
+
+def working_day_numbers():
+    """Arbeitstage aus den Einstellungen als ISO-Wochentage (1 = Montag)"""
+    value = Settings.get('working_days', '1,2,3,4,5')
+    return tuple(sorted(int(day) for day in value.split(',') if day.strip().isdigit()))
+
+
+def week_bounds(start, end):
+    """Erweitert ``[start, end]`` auf ganze Wochen (Montag bis Sonntag)
+
+    Returns:
+    --------
+    tuple
+        ``(montag, tage)`` mit ``tage`` als Vielfaches von 7
+    """
+    monday = datetime(start.year, start.month, start.day) - timedelta(days=start.weekday())
+    sunday = datetime(end.year, end.month, end.day) + timedelta(days=6 - end.weekday())
+    return monday, (sunday - monday).days + 1
+
+
+def _day_index(values, origin):
+    """Datumswerte als Tagesindex relativ zu ``origin`` (int64-Array)"""
+    ordinals = np.fromiter((value.toordinal() for value in values), dtype=np.int64, count=len(values))
+    return ordinals - origin.toordinal()
+
+
+def day_counts(rows, starts, ends, shape):
+    """Anzahl der Zeiträume pro Zeile und Tag
+
+    Parameters:
+    -----------
+    rows, starts, ends : ndarray
+        Zeilenindex sowie erster und letzter Tag (inklusive) je Zeitraum;
+        Tage außerhalb von ``shape`` werden abgeschnitten
+    shape : tuple
+        ``(zeilen, tage)`` des Ergebnisses
+    """
+    row_count, day_count = shape
+    starts = np.clip(starts, 0, day_count)
+    ends = np.clip(ends + 1, 0, day_count)
+    keep = starts < ends
+    diff = np.zeros((row_count, day_count + 1), dtype=np.int32)
+    np.add.at(diff, (rows[keep], starts[keep]), 1)
+    np.add.at(diff, (rows[keep], ends[keep]), -1)
+    return np.cumsum(diff[:, :-1], axis=1)
+
+
+def _runs(mask):
+    """Zusammenhängende True-Folgen pro Zeile als ``(zeile, start, länge)``"""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends - starts
+
+
+class UtilizationGrid:
+    """Buchungen und Abwesenheiten der Dozenten als Tagesraster
+
+    Parameters:
+    -----------
+    start : datetime
+        Erster Tag (ein Montag, siehe ``week_bounds()``)
+    lecturers : list
+        ``(id, name, color)`` pro Zeile
+    bookings : ndarray
+        int8, Kurse pro Dozent und Tag
+    blocked : ndarray
+        bool, Abwesenheit pro Dozent und Tag
+    workdays : ndarray
+        bool, Arbeitstag pro Tag
+    """
+
+    def __init__(self, start, lecturers, bookings, blocked, workdays):
+        self.start = start
+        self.lecturers = lecturers
+        self.bookings = bookings
+        self.blocked = blocked
+        self.workdays = workdays
+
+    @classmethod
+    def build(cls, start, days, lecturers, courses, availabilities, working_days=(1, 2, 3, 4, 5)):
+        """Baut das Raster aus ``(lecturer_id, start_date, end_date)``-Zeilen"""
+        lecturer_ids = np.array([lecturer[0] for lecturer in lecturers], dtype=np.int64)
+        order = np.argsort(lecturer_ids)
+        shape = (len(lecturers), days)
+
+        def fill(rows):
+            if not rows or not len(lecturer_ids):
+                return np.zeros(shape, dtype=np.int32)
+            owners, starts, ends = zip(*rows)
+            owners = np.array(owners, dtype=np.int64)
+            # Dozenten-ID -> Zeile; Einträge fremder Dozenten fallen heraus
+            positions = np.clip(np.searchsorted(lecturer_ids, owners, sorter=order), 0, len(order) - 1)
+            line = order[positions]
+            known = lecturer_ids[line] == owners
+            return day_counts(line[known],
+                              _day_index(starts, start)[known],
+                              _day_index(ends, start)[known],
+                              shape)
+
+        bookings = np.minimum(fill(courses), np.iinfo(np.int8).max).astype(np.int8)
+        blocked = fill(availabilities) > 0
+        iso_weekdays = (np.arange(days) + start.weekday()) % 7 + 1
+        workdays = np.isin(iso_weekdays, working_days)
+        return cls(start, lecturers, bookings, blocked, workdays)
+
+    @property
+    def days(self):
+        return self.bookings.shape[1]
+
+    @property
+    def booked(self):
+        return self.bookings > 0
+
+    @property
+    def capacity(self):
+        """Arbeitstage ohne Abwesenheit"""
+        return self.workdays & ~self.blocked
+
+    @property
+    def free(self):
+        return self.capacity & ~self.booked
+
+    @property
+    def overlap(self):
+        """Doppelbuchungen und Kurse während einer Abwesenheit"""
+        return (self.bookings > 1) | (self.booked & self.blocked)
+
+    def idle_gaps(self):
+        """Anzahl und längste Lücke freier Arbeitstage zwischen Belegungen
+
+        Wochenenden und andere freie Tage unterbrechen eine Lücke nicht;
+        Folgen am Rand des Horizonts zählen nicht als Lücke.
+        """
+        free = self.free[:, self.workdays]
+        rows, starts, lengths = _runs(free)
+        inner = (starts > 0) & (starts + lengths < free.shape[1])
+        rows, lengths = rows[inner], lengths[inner]
+        counts = np.bincount(rows, minlength=len(self.lecturers))
+        longest = np.zeros(len(self.lecturers), dtype=np.int64)
+        np.maximum.at(longest, rows, lengths)
+        return counts, longest
+
+    def weekly(self):
+        """Belegte Anteile der verfügbaren Arbeitstage pro Dozent und Woche
+
+        Returns:
+        --------
+        ndarray
+            float, Form (Dozenten, Wochen); NaN für Wochen ohne Kapazität
+        """
+        weeks = self.days // 7
+        capacity = self.capacity.reshape(len(self.lecturers), weeks, 7).sum(axis=2)
+        booked = (self.booked & self.capacity).reshape(len(self.lecturers), weeks, 7).sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(capacity > 0, booked / capacity, np.nan)
+
+    def summary(self):
+        """Kennzahlen pro Dozent über den ganzen Horizont (Liste von Dicts)"""
+        capacity = self.capacity.sum(axis=1)
+        booked = (self.booked & self.capacity).sum(axis=1)
+        booked_workdays = (self.booked & self.workdays).sum(axis=1)
+        blocked_workdays = (self.blocked & self.workdays).sum(axis=1)
+        overlap = self.overlap.sum(axis=1)
+        gap_counts, longest_gaps = self.idle_gaps()
+        result = []
+        for i, (lecturer_id, name, color) in enumerate(self.lecturers):
+            result.append({
+                'id': lecturer_id,
+                'name': name,
+                'color': color or '#808080',
+                'booked_days': int(booked_workdays[i]),
+                'capacity_days': int(capacity[i]),
+                'free_days': int(capacity[i] - booked[i]),
+                'blocked_days': int(blocked_workdays[i]),
+                'overlap_days': int(overlap[i]),
+                'occupancy': round(float(booked[i] / capacity[i]), 3) if capacity[i] else None,
+                'gap_count': int(gap_counts[i]),
+                'longest_gap': int(longest_gaps[i]),
+            })
+        return result
+
+    def to_dict(self):
+        """Kennzahlen und Wochen-Heatmap als JSON-fähiges Dict"""
+        weeks = [self.start + timedelta(days=7 * i) for i in range(self.days // 7)]
+        heatmap = np.round(self.weekly(), 3)
+        return {
+            'start': self.start.strftime('%Y-%m-%d'),
+            'end': (self.start + timedelta(days=self.days - 1)).strftime('%Y-%m-%d'),
+            'weeks': [week.strftime('%Y-%m-%d') for week in weeks],
+            'week_labels': [f'KW {week.isocalendar()[1]:02d}' for week in weeks],
+            'lecturers': self.summary(),
+            'heatmap': [[None if np.isnan(value) else float(value) for value in row] for row in heatmap],
+        }
+
+
+def load_grid(start, days, lecturer_ids=None, working_days=(1, 2, 3, 4, 5)):
+    """Lädt Dozenten, Buchungen und Abwesenheiten im Horizont (drei Abfragen)"""
+    end = start + timedelta(days=days - 1)
+    lecturers = db.session.query(Lecturer.id, Lecturer.name, Lecturer.color)
+    courses = db.session.query(Course.lecturer_id, Course.start_date, Course.end_date)\
+        .filter(Course.lecturer_id.isnot(None))\
+        .filter(Course.end_date >= start, Course.start_date < end + timedelta(days=1))
+    availabilities = db.session.query(Availability.lecturer_id, Availability.start_date, Availability.end_date)\
+        .filter(Availability.end_date >= start, Availability.start_date < end + timedelta(days=1))
+    if lecturer_ids is not None:
+        lecturers = lecturers.filter(Lecturer.id.in_(lecturer_ids))
+        courses = courses.filter(Course.lecturer_id.in_(lecturer_ids))
+        availabilities = availabilities.filter(Availability.lecturer_id.in_(lecturer_ids))
+
+    return UtilizationGrid.build(
+        start, days,
+        [tuple(row) for row in lecturers.order_by(Lecturer.name).all()],
+        [tuple(row) for row in courses.all()],
+        [tuple(row) for row in availabilities.all()],
+        working_days
+    )
+
+
+def utilization(start, end, lecturer_ids=None, working_days=None, version=None):
+    """Auslastung aller (bzw. der angegebenen) Dozenten in ganzen Wochen
+
+    Parameters:
+    -----------
+    working_days, version : optional
+        Bereits gelesene Arbeitstage bzw. Datenversion (z.B. für den ETag),
+        sonst werden sie hier abgefragt
+
+    Returns:
+    --------
+    dict
+        Siehe ``UtilizationGrid.to_dict()``; pro Datenversion gecacht
+
+    Raises:
+    -------
+    ValueError
+        Wenn der Horizont länger als ``MAX_DAYS`` ist
+    """
+    start, days = week_bounds(start, end)
+    if days > MAX_DAYS:
+        raise ValueError(f'Zeitraum zu lang (höchstens {MAX_DAYS // 7} Wochen)')
+
+    if working_days is None:
+        working_days = working_day_numbers()
+    if version is None:
+        version = data_version()
+    lecturer_key = tuple(sorted(lecturer_ids)) if lecturer_ids is not None else None
+    cache_key = (version, start, days, lecturer_key, working_days)
+    result = utilization_cache.get(cache_key)
+    if result is None:
+        result = load_grid(start, days, lecturer_ids, working_days).to_dict()
+        if not has_uncommitted_changes():
+            utilization_cache.set(cache_key, result)
+    return result
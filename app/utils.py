@@ -1,4 +1,6 @@
 from datetime import datetime
+from flask import current_app
+from . import db
 from .models import Assignment, Course
 
 def allowed_file(filename):
@@ -7,10 +9,12 @@ def allowed_file(filename):
 
 def check_conflicts(lecturer_id, course_id):
     course = Course.query.get(course_id)
-    existing_assignments = Assignment.query.filter_by(lecturer_id=lecturer_id).all()
-    
-    for assignment in existing_assignments:
-        if (course.start_date <= assignment.course.end_date and 
-            course.end_date >= assignment.course.start_date):
-            return True
-    return False 
\ No newline at end of file
+    # Eine einzelne Überschneidungsfrage: indizierter SQL-Filter auf das
+    # Zeitfenster statt der ganzen Kurshistorie des Dozenten
+    conflict = db.session.query(Course.id).filter(
+        Course.lecturer_id == lecturer_id,
+        Course.id != course.id,
+        Course.start_date <= course.end_date,
+        Course.end_date >= course.start_date
+    ).first()
+    return conflict is not None
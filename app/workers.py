@@ -0,0 +1,38 @@
+"""Kennung des Prozesses, der einen Hintergrund-Job ausführt
+
+Import- und Berichtsjobs laufen im Thread-Pool des Worker-Prozesses, der sie
+angelegt hat. Endet der Prozess (Neustart, Absturz), blieben sie sonst für
+immer 'queued' oder 'running'. Jeder Job speichert deshalb ``worker_id()``
+(PID und ein Zufallstoken pro Prozess), beim Start der App prüft
+``worker_alive()``, ob der Prozess noch läuft. Das Token unterscheidet einen
+neuen Prozess, der die PID eines beendeten wiederbekommen hat.
+"""
+import os
+import uuid
+
+_TOKEN = uuid.uuid4().hex[:12]
+
+
+def worker_id():
+    """Kennung des aktuellen Prozesses (``'<pid>:<token>'``)"""
+    return f'{os.getpid()}:{_TOKEN}'
+
+
+def worker_alive(worker):
+    """True, wenn der Prozess mit dieser Kennung noch läuft"""
+    pid, _, token = (worker or '').partition(':')
+    if not pid.isdigit():
+        return False
+    pid = int(pid)
+    if pid == os.getpid():
+        return token == _TOKEN
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Läuft, gehört aber einem anderen Benutzer
+        return True
+    except OSError:
+        return False
+    return True
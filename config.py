@@ -8,4 +8,47 @@ class Config:
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join('app', 'uploads')
-    ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'txt'} 
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'txt'}
+    # Lehrplan-Import: Zeilen pro Block und parallele Hintergrund-Jobs
+    IMPORT_CHUNK_SIZE = 1000
+    IMPORT_WORKERS = 2
+    # Anzahl gecachter Timeline-Darstellungen (LRU)
+    TIMELINE_CACHE_SIZE = 32
+    # Render-Pool für Timeline-Bilder (0 = im Request-Prozess rendern)
+    RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 2))
+    RENDER_TIMEOUT = 60  # Sekunden
+    # Inhaltsadressierter PNG-Cache, von allen Worker-Prozessen geteilt;
+    # die am längsten ungenutzten Bilder über dem Limit werden gelöscht
+    RENDER_CACHE_DIR = os.path.join(basedir, 'app', 'render_cache')
+    RENDER_CACHE_MAX_FILES = 200
+    # PDF-Berichte im Hintergrund: parallele Jobs, Ablage und Aufbewahrung
+    REPORT_WORKERS = 2
+    REPORT_OUTPUT_DIR = os.path.join(basedir, 'app', 'report_output')
+    REPORT_RETENTION_HOURS = 24
+    # Vorkomprimierte Frontend-Bibliotheken (flask build-assets)
+    ASSETS_BUILD_DIR = os.path.join(basedir, 'app', 'asset_build')
+    # Vorberechnete iCal-Feeds pro Dozent und Lehrplan
+    ICAL_FEED_DIR = os.path.join(basedir, 'app', 'ical_feeds')
+    # Testmodus: SQL-Statements pro View begrenzen (siehe app/querycount.py);
+    # mit app.testing immer aktiv
+    QUERY_BUDGET_CHECK = False
+    QUERY_BUDGETS = {
+        'main.show_timeline': 7,
+        'main.api_timeline': 4,
+        'main.calendar_view': 1,
+        'main.api_events': 3,
+        'main.statistics_dashboard': 6,
+        'main.api_utilization': 5,
+        'main.calendar_ical': 4,
+        'main.lecturer_feed': 4,
+        'main.curriculum_feed': 4,
+        'main.assign': 8,
+        'main.api_auto_assign': 6,
+        'main.api_free_lecturers': 5,
+        # POST: Kurs ändern inkl. Lehrplan-Kennzahlen und Statistik-Rollups
+        'main.manage_curriculum': 12,
+        'main.export_report': 6,
+        'main.export_report_html': 6,
+        'main.export_report_download': 6,
+        'main.export_report_direct': 6,
+    }
@@ -0,0 +1,17 @@
+"""add course active/dates index for the calendar events API
+
+Revision ID: a6d4c8e2f9b1
+Revises: f3b7d9e1a5c2
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = 'a6d4c8e2f9b1'
+down_revision = 'f3b7d9e1a5c2'
+
+def upgrade():
+    op.create_index('ix_course_active_dates', 'course', ['active', 'start_date', 'end_date'])
+
+def downgrade():
+    op.drop_index('ix_course_active_dates', table_name='course')
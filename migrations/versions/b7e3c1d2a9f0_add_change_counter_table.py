@@ -0,0 +1,22 @@
+"""add change_counter table
+
+Revision ID: b7e3c1d2a9f0
+Revises: xxx
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b7e3c1d2a9f0'
+down_revision = 'xxx'
+
+def upgrade():
+    op.create_table('change_counter',
+        sa.Column('name', sa.String(length=80), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade():
+    op.drop_table('change_counter')
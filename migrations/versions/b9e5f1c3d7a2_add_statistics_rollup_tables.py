@@ -0,0 +1,44 @@
+"""add statistics rollup tables
+
+Revision ID: b9e5f1c3d7a2
+Revises: a6d4c8e2f9b1
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'b9e5f1c3d7a2'
+down_revision = 'a6d4c8e2f9b1'
+
+def upgrade():
+    op.create_table('lecturer_month_rollup',
+        sa.Column('lecturer_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('course_count', sa.Integer(), nullable=False),
+        sa.Column('booked_days', sa.Float(), nullable=False),
+        sa.Column('course_days', sa.Integer(), nullable=False),
+        sa.Column('availability_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('lecturer_id', 'month')
+    )
+    op.create_table('course_month_rollup',
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('weekday', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('duration_bucket', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('course_count', sa.Integer(), nullable=False),
+        sa.Column('total_days', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('month', 'weekday', 'duration_bucket')
+    )
+    op.create_table('topic_rollup',
+        sa.Column('topic', sa.String(length=200), nullable=False),
+        sa.Column('lecturer_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('course_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('topic', 'lecturer_id')
+    )
+    op.create_index('ix_course_topic_active', 'course', ['topic', 'active', 'lecturer_id'])
+
+def downgrade():
+    op.drop_index('ix_course_topic_active', table_name='course')
+    op.drop_table('topic_rollup')
+    op.drop_table('course_month_rollup')
+    op.drop_table('lecturer_month_rollup')
@@ -0,0 +1,17 @@
+"""add course lecturer/active/dates index for lecturer-filtered timeline and iCal
+
+Revision ID: c2e8f4a6b0d3
+Revises: b9e5f1c3d7a2
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = 'c2e8f4a6b0d3'
+down_revision = 'b9e5f1c3d7a2'
+
+def upgrade():
+    op.create_index('ix_course_lecturer_active_dates', 'course', ['lecturer_id', 'active', 'start_date', 'end_date'])
+
+def downgrade():
+    op.drop_index('ix_course_lecturer_active_dates', table_name='course')
@@ -0,0 +1,30 @@
+"""add import_job table
+
+Revision ID: c4a9e6f1d2b3
+Revises: b7e3c1d2a9f0
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'c4a9e6f1d2b3'
+down_revision = 'b7e3c1d2a9f0'
+
+def upgrade():
+    op.create_table('import_job',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rows_total', sa.Integer(), nullable=True),
+        sa.Column('rows_processed', sa.Integer(), nullable=False),
+        sa.Column('rows_failed', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.Text(), nullable=True),
+        sa.Column('curriculum_ids', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+def downgrade():
+    op.drop_table('import_job')
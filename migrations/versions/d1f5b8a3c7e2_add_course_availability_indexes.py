@@ -0,0 +1,27 @@
+"""add composite indexes for course and availability
+
+Revision ID: d1f5b8a3c7e2
+Revises: c4a9e6f1d2b3
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = 'd1f5b8a3c7e2'
+down_revision = 'c4a9e6f1d2b3'
+
+def upgrade():
+    op.create_index('ix_course_lecturer_dates', 'course', ['lecturer_id', 'start_date', 'end_date'])
+    op.create_index('ix_course_active_curriculum_start', 'course', ['active', 'curriculum_id', 'start_date'])
+    op.create_index('ix_course_curriculum_start', 'course', ['curriculum_id', 'start_date'])
+    op.create_index('ix_course_dates', 'course', ['start_date', 'end_date'])
+    op.create_index('ix_availability_lecturer_dates', 'availability', ['lecturer_id', 'start_date', 'end_date'])
+    op.create_index('ix_availability_dates', 'availability', ['start_date', 'end_date'])
+
+def downgrade():
+    op.drop_index('ix_availability_dates', table_name='availability')
+    op.drop_index('ix_availability_lecturer_dates', table_name='availability')
+    op.drop_index('ix_course_dates', table_name='course')
+    op.drop_index('ix_course_curriculum_start', table_name='course')
+    op.drop_index('ix_course_active_curriculum_start', table_name='course')
+    op.drop_index('ix_course_lecturer_dates', table_name='course')
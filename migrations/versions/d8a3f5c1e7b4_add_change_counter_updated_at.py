@@ -0,0 +1,20 @@
+"""add updated_at to change_counter
+
+Revision ID: d8a3f5c1e7b4
+Revises: c2e8f4a6b0d3
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'd8a3f5c1e7b4'
+down_revision = 'c2e8f4a6b0d3'
+
+def upgrade():
+    op.add_column('change_counter', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE change_counter SET updated_at = CURRENT_TIMESTAMP")
+
+def downgrade():
+    with op.batch_alter_table('change_counter') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,32 @@
+"""add staged_course table and import_job.worker
+
+Revision ID: e5b9d2f7a4c8
+Revises: d8a3f5c1e7b4
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e5b9d2f7a4c8'
+down_revision = 'd8a3f5c1e7b4'
+
+def upgrade():
+    op.create_table('staged_course',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('import_job_id', sa.String(length=36), nullable=False),
+        sa.Column('topic', sa.String(length=200), nullable=False),
+        sa.Column('start_date', sa.DateTime(), nullable=False),
+        sa.Column('end_date', sa.DateTime(), nullable=False),
+        sa.Column('curriculum_id', sa.String(length=36), nullable=False),
+        sa.ForeignKeyConstraint(['import_job_id'], ['import_job.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_staged_course_import_job_id', 'staged_course', ['import_job_id'])
+    op.add_column('import_job', sa.Column('worker', sa.String(length=50), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('import_job') as batch_op:
+        batch_op.drop_column('worker')
+    op.drop_index('ix_staged_course_import_job_id', table_name='staged_course')
+    op.drop_table('staged_course')
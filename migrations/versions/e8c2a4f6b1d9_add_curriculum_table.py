@@ -0,0 +1,49 @@
+"""add curriculum table and backfill from course
+
+Revision ID: e8c2a4f6b1d9
+Revises: d1f5b8a3c7e2
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'e8c2a4f6b1d9'
+down_revision = 'd1f5b8a3c7e2'
+
+def upgrade():
+    op.create_table('curriculum',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=True),
+        sa.Column('start_date', sa.DateTime(), nullable=False),
+        sa.Column('end_date', sa.DateTime(), nullable=False),
+        sa.Column('course_count', sa.Integer(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_curriculum_start', 'curriculum', ['start_date'])
+    op.create_index('ix_curriculum_active_start', 'curriculum', ['active', 'start_date'])
+
+    # Kennzahlen aus den bestehenden Kursen übernehmen
+    op.execute("""
+        INSERT INTO curriculum (id, start_date, end_date, course_count, active, updated_at)
+        SELECT curriculum_id, MIN(start_date), MAX(end_date), COUNT(id),
+               COALESCE(MAX(active), 0), CURRENT_TIMESTAMP
+        FROM course
+        GROUP BY curriculum_id
+    """)
+
+    # Namen aus den Einstellungen 'curriculum_name_<uuid>' übernehmen
+    op.execute("""
+        UPDATE curriculum
+        SET name = (
+            SELECT value FROM settings
+            WHERE settings.key = 'curriculum_name_' || curriculum.id
+        )
+    """)
+
+def downgrade():
+    op.drop_index('ix_curriculum_active_start', table_name='curriculum')
+    op.drop_index('ix_curriculum_start', table_name='curriculum')
+    op.drop_table('curriculum')
@@ -0,0 +1,19 @@
+"""add report_job.worker
+
+Revision ID: f1c6a8e3b5d9
+Revises: e5b9d2f7a4c8
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f1c6a8e3b5d9'
+down_revision = 'e5b9d2f7a4c8'
+
+def upgrade():
+    op.add_column('report_job', sa.Column('worker', sa.String(length=50), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('report_job') as batch_op:
+        batch_op.drop_column('worker')
@@ -0,0 +1,33 @@
+"""add report_job table
+
+Revision ID: f3b7d9e1a5c2
+Revises: e8c2a4f6b1d9
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = 'f3b7d9e1a5c2'
+down_revision = 'e8c2a4f6b1d9'
+
+def upgrade():
+    op.create_table('report_job',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('engine', sa.String(length=20), nullable=False),
+        sa.Column('options', sa.Text(), nullable=True),
+        sa.Column('cache_key', sa.String(length=64), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('file_size', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_report_job_cache_key', 'report_job', ['cache_key'])
+
+def downgrade():
+    op.drop_index('ix_report_job_cache_key', table_name='report_job')
+    op.drop_table('report_job')
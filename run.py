@@ -11,5 +11,72 @@ def init_db():
         db.create_all()
         print("Datenbank wurde neu initialisiert!")
 
+@app.cli.command("check-query-plans")
+def check_query_plans_command():
+    """Prüft per EXPLAIN QUERY PLAN, dass die häufigsten Abfragen Indizes nutzen"""
+    from app.query_plans import check_query_plans
+
+    with app.app_context():
+        results = check_query_plans()
+        for result in results:
+            status = 'OK    ' if result['ok'] else 'FEHLER'
+            print(f"{status} {result['name']} (erwartet: {result['index']})")
+            for step in result['plan']:
+                print(f"         {step}")
+        if not all(result['ok'] for result in results):
+            raise SystemExit(1)
+
+@app.cli.command("rebuild-statistics")
+def rebuild_statistics_command():
+    """Baut die Statistik-Rollups aus Kursen und Abwesenheiten komplett neu auf"""
+    from app.rollups import rebuild_rollups
+    from app.models import LecturerMonthRollup, CourseMonthRollup, TopicRollup
+
+    with app.app_context():
+        rebuild_rollups(db.session)
+        db.session.commit()
+        for model in (LecturerMonthRollup, CourseMonthRollup, TopicRollup):
+            print(f"{model.__tablename__}: {db.session.query(model).count()} Zeilen")
+
+@app.cli.command("vendor-assets")
+def vendor_assets_command():
+    """Lädt fehlende Frontend-Bibliotheken vom CDN nach app/static/vendor"""
+    import os
+    import urllib.request
+    from app.assets import LIBRARIES
+
+    vendor_dir = os.path.join(app.static_folder, 'vendor')
+    for name, url in LIBRARIES.items():
+        path = os.path.join(vendor_dir, *name.split('/'))
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+        with open(path, 'wb') as f:
+            f.write(content)
+        print(f"{name}: {len(content)} Bytes")
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Schreibt gzip-/Brotli-Varianten der Frontend-Bibliotheken"""
+    from app.assets import AssetManifest
+
+    # Neu einlesen, damit gerade nachgeladene Bibliotheken dabei sind
+    manifest = AssetManifest.load(app.static_folder, app.config['ASSETS_BUILD_DIR'])
+    for hashed, size, gzip_size, brotli_size in manifest.build():
+        brotli_text = f", br {brotli_size}" if brotli_size is not None else ""
+        print(f"{hashed}: {size} -> gz {gzip_size}{brotli_text}")
+
+@app.cli.command("benchmark-timeline")
+def benchmark_timeline_command():
+    """Misst die Timeline-Figur mit synthetischen Kursen und Abwesenheiten"""
+    from app.timeline_benchmark import benchmark_timeline
+
+    for result in benchmark_timeline():
+        print(f"{result['name']}: {result['bars']} Balken, {result['traces']} Traces, "
+              f"{result['shapes']} Shapes, {result['annotations']} Annotationen, "
+              f"{result['json_kb']:.0f} KB JSON, {result['ms']:.1f} ms")
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file